@@ -13,6 +13,10 @@ if __package__ is None and not hasattr(sys, 'frozen'):
 def cert_issuer_main(args=None):
     from cert_issuer import config
     parsed_config = config.get_config()
+    if sys.argv[1:2] == ['serve']:
+        from cert_issuer import daemon
+        daemon.main(parsed_config)
+        return
     from cert_issuer import issue_certificates
     issue_certificates.main(parsed_config)
 
@@ -0,0 +1,173 @@
+"""
+ASGI application issuing certificates over HTTP: POST /issue with a JSON array of unsigned certificates returns the
+array of blockchain certificates, in the same order. GET /metrics returns the batching, HTTP client and provider
+circuit breaker metrics.
+
+Requests arriving within web_batch_window seconds of each other are coalesced into one batch, anchored by a single
+Merkle tree and transaction, and each caller gets back its own certificates. Batches are issued one at a time, off
+the event loop.
+
+Run it with any ASGI server, e.g. uvicorn --factory cert_issuer.asgi:create_app
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cert_issuer import issue_certificates
+from cert_issuer.circuit_breaker import get_circuit_breakers
+from cert_issuer.http_client import get_http_client
+from cert_issuer.micro_batcher import DEFAULT_BATCH_WINDOW, DEFAULT_MAX_BATCH_SIZE, BatchMetrics, get_web_batch_issuer, \
+    issue_requests, resolve_requests
+
+ISSUE_PATH = '/issue'
+METRICS_PATH = '/metrics'
+
+
+class BatchCoalescer(object):
+    def __init__(self, issue_batch, window=DEFAULT_BATCH_WINDOW, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        """
+        :param issue_batch: blocking function taking a list of certificates and returning them issued, in order
+        :param window: seconds requests wait for others to join their batch
+        :param max_batch_size: number of certificates that triggers issuing before the window is over
+        """
+        self.issue_batch = issue_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.metrics = BatchMetrics()
+        # (certificates, future, arrival time) of the requests waiting for the next batch
+        self.pending = []
+        self.pending_count = 0
+        self.flush_handle = None
+        # one transaction at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='web_issuance')
+
+    async def issue(self, certificates):
+        """
+        Adds certificates to the next batch
+        :return: the certificates issued
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((certificates, future, time.monotonic()))
+        self.pending_count += len(certificates)
+        if self.pending_count >= self.max_batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        """
+        Starts issuing the pending requests as one batch
+        """
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        pending, self.pending, self.pending_count = self.pending, [], 0
+        if pending:
+            asyncio.ensure_future(self._issue(pending))
+
+    async def _issue(self, pending):
+        loop = asyncio.get_running_loop()
+        outcomes = await loop.run_in_executor(self.executor, issue_requests, self.issue_batch, self.metrics, pending)
+        resolve_requests(outcomes)
+
+
+class IssuanceApp(object):
+    def __init__(self, app_config, certificate_batch_handler=None, transaction_handler=None):
+        if certificate_batch_handler is None:
+            certificate_batch_handler, transaction_handler, _ = issue_certificates.instantiate_blockchain_handlers(
+                app_config, file_mode=False)
+        self.certificate_batch_handler = certificate_batch_handler
+        self.coalescer = BatchCoalescer(
+            get_web_batch_issuer(app_config, certificate_batch_handler, transaction_handler),
+            window=getattr(app_config, 'web_batch_window', None) or DEFAULT_BATCH_WINDOW,
+            max_batch_size=getattr(app_config, 'web_max_batch_size', None) or DEFAULT_MAX_BATCH_SIZE)
+
+    def get_metrics(self):
+        return {
+            'batches': self.coalescer.metrics.to_dict(),
+            'http': get_http_client().get_metrics(),
+            'providers': get_circuit_breakers().get_metrics()
+        }
+
+    def validate_certificates(self, certificates):
+        for certificate in certificates:
+            self.certificate_batch_handler.certificate_handler.validate_certificate(certificate)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        if scope['path'] == METRICS_PATH and scope['method'] == 'GET':
+            await send_json(send, 200, self.get_metrics())
+            return
+        if scope['path'] != ISSUE_PATH:
+            await send_json(send, 404, {'error': 'Not found'})
+            return
+        if scope['method'] != 'POST':
+            await send_json(send, 405, {'error': 'Method not allowed'})
+            return
+
+        try:
+            certificates = json.loads(await read_body(receive))
+        except ValueError:
+            await send_json(send, 400, {'error': 'The body must be a JSON array of certificates'})
+            return
+        if not isinstance(certificates, list) or not certificates:
+            await send_json(send, 400, {'error': 'The body must be a JSON array of certificates'})
+            return
+
+        # an invalid certificate is refused here, rather than failing the batch of the other requests
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.validate_certificates, certificates)
+        except Exception as e:
+            await send_json(send, 400, {'error': str(e)})
+            return
+
+        try:
+            issued = await self.coalescer.issue(certificates)
+        except Exception as e:
+            await send_json(send, 500, {'error': str(e)})
+            return
+        await send_json(send, 200, issued)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.coalescer.flush()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def read_body(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+
+async def send_json(send, status, content):
+    body = json.dumps(content).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('ascii'))]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def create_app(app_config=None):
+    if app_config is None:
+        from cert_issuer import config
+        app_config = config.get_config()
+    return IssuanceApp(app_config)
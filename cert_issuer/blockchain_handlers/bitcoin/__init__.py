@@ -3,29 +3,37 @@ import os
 
 from cert_core import UnknownChainError
 
-from cert_issuer.blockchain_handlers.bitcoin.connectors import BitcoinServiceProviderConnector, MockServiceProviderConnector
-from cert_issuer.blockchain_handlers.bitcoin.signer import BitcoinSigner
-from cert_issuer.blockchain_handlers.bitcoin.transaction_handlers import BitcoinTransactionHandler
-from cert_issuer.certificate_handlers import CertificateBatchHandler, CertificateV3Handler, CertificateBatchWebHandler, CertificateWebV3Handler
+from cert_issuer.certificate_handlers import CertificateBatchHandler, CertificateV3Handler, CertificateBatchWebHandler, CertificateWebV3Handler, CertificateBatchJSONLHandler
 from cert_issuer.merkle_tree_generator import MerkleTreeGenerator
-from cert_issuer.models import MockTransactionHandler
+from cert_issuer.models import MockServiceProviderConnector, MockTransactionHandler
 from cert_issuer.signer import FileSecretManager
 
 COIN = 100000000  # satoshis in 1 btc
 
 
 class BitcoinTransactionCostConstants(object):
-    def __init__(self, recommended_tx_fee=0.0006, min_per_output=0.0000275, satoshi_per_byte=250):
+    def __init__(self, recommended_tx_fee=0.0006, min_per_output=0.0000275, satoshi_per_byte=250, fee_estimator=None):
+        """
+        :param fee_estimator: a FeeEstimator setting satoshi_per_byte on update_fee_rate, None to keep it fixed
+        """
         self.recommended_tx_fee = recommended_tx_fee
         self.min_per_output = min_per_output
         self.satoshi_per_byte = satoshi_per_byte
+        self.fee_estimator = fee_estimator
         logging.info('Set cost constants to recommended_tx_fee=%f,min_per_output=%f,satoshi_per_byte=%d',
                      self.recommended_tx_fee, self.min_per_output, self.satoshi_per_byte)
 
+    def update_fee_rate(self):
+        if self.fee_estimator is not None:
+            self.satoshi_per_byte = self.fee_estimator.get_satoshi_per_byte()
+
     def get_minimum_output_coin(self):
         return self.min_per_output * COIN
 
     def get_recommended_fee_coin(self):
+        # an estimated fee rate is enough for the transaction to confirm in time, a minimum fee would overpay
+        if self.fee_estimator is not None:
+            return 0
         return self.recommended_tx_fee * COIN
 
 
@@ -33,6 +41,8 @@ def initialize_signer(app_config):
     path_to_secret = os.path.join(app_config.usb_name, app_config.key_file)
 
     if app_config.chain.is_bitcoin_type():
+        # the bitcoin libraries are only imported for the bitcoin chains, the mock chain does without
+        from cert_issuer.blockchain_handlers.bitcoin.signer import BitcoinSigner
         signer = BitcoinSigner(bitcoin_chain=app_config.chain)
     elif app_config.chain.is_mock_type():
         signer = None
@@ -47,7 +57,12 @@ def instantiate_blockchain_handlers(app_config, file_mode=True):
     chain = app_config.chain
     secret_manager = initialize_signer(app_config)
 
-    if file_mode:
+    if file_mode and getattr(app_config, 'unsigned_certificates_file', None):
+        certificate_batch_handler = CertificateBatchJSONLHandler(secret_manager=secret_manager,
+                                                                 certificate_handler=CertificateWebV3Handler(app_config),
+                                                                 merkle_tree=MerkleTreeGenerator(),
+                                                                 config=app_config)
+    elif file_mode:
         certificate_batch_handler = CertificateBatchHandler(secret_manager=secret_manager,
                                                             certificate_handler=CertificateV3Handler(app_config),
                                                             merkle_tree=MerkleTreeGenerator(),
@@ -61,10 +76,37 @@ def instantiate_blockchain_handlers(app_config, file_mode=True):
         transaction_handler = MockTransactionHandler()
         connector = MockServiceProviderConnector()
     else:
+        from cert_issuer.blockchain_handlers.bitcoin.coin_selection import CoinSelector, DEFAULT_MAX_CONSOLIDATION_INPUTS
+        from cert_issuer.blockchain_handlers.bitcoin.connectors import BitcoinServiceProviderConnector
+        from cert_issuer.blockchain_handlers.bitcoin.transaction_handlers import BitcoinTransactionHandler
+        fee_estimator = None
+        if getattr(app_config, 'satoshi_per_byte_dynamic', False):
+            from cert_issuer.blockchain_handlers.bitcoin import fee_estimation
+            fee_estimator = fee_estimation.FeeEstimator(
+                fee_estimation.get_fee_providers(chain, app_config.bitcoind),
+                app_config.satoshi_per_byte,
+                target_blocks=getattr(app_config, 'fee_target_blocks', None) or fee_estimation.DEFAULT_TARGET_BLOCKS,
+                ttl=getattr(app_config, 'fee_estimate_ttl', None) or fee_estimation.DEFAULT_TTL,
+                max_satoshi_per_byte=getattr(app_config, 'max_satoshi_per_byte', None))
         cost_constants = BitcoinTransactionCostConstants(app_config.tx_fee, app_config.dust_threshold,
-                                                         app_config.satoshi_per_byte)
+                                                         app_config.satoshi_per_byte, fee_estimator=fee_estimator)
+        coin_selector = CoinSelector(
+            cost_constants,
+            seed=getattr(app_config, 'coin_selection_seed', None) or 0,
+            consolidation_satoshi_per_byte=getattr(app_config, 'consolidation_satoshi_per_byte', None),
+            max_consolidation_inputs=getattr(app_config, 'max_consolidation_inputs', None) or DEFAULT_MAX_CONSOLIDATION_INPUTS)
         connector = BitcoinServiceProviderConnector(chain, app_config.bitcoind)
+        fee_bump_method = getattr(app_config, 'fee_bump_method', None)
         transaction_handler = BitcoinTransactionHandler(connector, cost_constants, secret_manager,
-                                                        issuing_address=issuing_address)
+                                                        issuing_address=issuing_address, coin_selector=coin_selector)
+        if fee_bump_method:
+            from cert_issuer.blockchain_handlers.bitcoin import confirmation_tracker
+            transaction_handler.confirmation_tracker = confirmation_tracker.ConfirmationTracker(
+                transaction_handler,
+                method=fee_bump_method,
+                bump_after_blocks=getattr(app_config, 'fee_bump_after_blocks', None) or confirmation_tracker.DEFAULT_BUMP_AFTER_BLOCKS,
+                bump_factor=getattr(app_config, 'fee_bump_factor', None) or confirmation_tracker.DEFAULT_BUMP_FACTOR,
+                max_satoshi_per_byte=getattr(app_config, 'max_satoshi_per_byte', None),
+                poll_interval=getattr(app_config, 'confirmation_poll_interval', None) or confirmation_tracker.DEFAULT_POLL_INTERVAL)
 
     return certificate_batch_handler, transaction_handler, connector
@@ -0,0 +1,195 @@
+"""
+Coin selection: picks the unspent outputs funding an issuing transaction so that it pays the least in fees, for the
+number of inputs it actually has.
+
+ 1. Branch and bound looks for inputs paying the fee of a transaction without change, with at most the cost of a
+    change output over. The surplus goes to the miners rather than to a change output worth little more than it costs.
+ 2. A knapsack search looks for the fewest inputs leaving a change of at least the dust threshold, and the smallest
+    such change.
+ 3. The cheaper of the two is used. When fees are cheap (satoshi_per_byte at most consolidation_satoshi_per_byte), the
+    smallest remaining outputs are swept into the transaction too, rather than spent later at a higher rate.
+
+Outputs worth less than the fee of spending them are never selected. Spendables are ordered by value and outpoint, and
+the knapsack search draws from a random.Random seeded with seed: the same outputs and seed select the same inputs.
+"""
+import bisect
+import random
+
+from cert_issuer.blockchain_handlers.bitcoin import tx_utils
+from cert_issuer.config import V2_NUM_OUTPUTS
+
+BNB_MAX_TRIES = 100000
+KNAPSACK_ITERATIONS = 100
+DEFAULT_MAX_CONSOLIDATION_INPUTS = 10
+
+
+class CoinSelector(object):
+    def __init__(self, tx_cost_constants, seed=0, consolidation_satoshi_per_byte=None,
+                 max_consolidation_inputs=DEFAULT_MAX_CONSOLIDATION_INPUTS, num_outputs=V2_NUM_OUTPUTS):
+        """
+        :param tx_cost_constants: BitcoinTransactionCostConstants, read on each selection
+        :param seed: seed of the knapsack search
+        :param consolidation_satoshi_per_byte: fee rate at or below which small outputs are consolidated, None never to
+        :param max_consolidation_inputs: number of inputs consolidation fills a transaction up to
+        :param num_outputs: outputs of the transaction besides the OP_RETURN one, including the change
+        """
+        self.tx_cost_constants = tx_cost_constants
+        self.seed = seed
+        self.consolidation_satoshi_per_byte = consolidation_satoshi_per_byte
+        self.max_consolidation_inputs = max_consolidation_inputs
+        self.num_outputs = num_outputs
+
+    def fee(self, num_inputs, change=True):
+        num_outputs = self.num_outputs if change else self.num_outputs - 1
+        return tx_utils.calculate_tx_fee(self.tx_cost_constants, num_inputs, num_outputs)
+
+    def select(self, spendables):
+        """
+        :return: the spendables to use as inputs, or None if they cannot pay for the transaction
+        """
+        # calculate_raw_tx_size counts each input one byte over BYTES_PER_INPUT
+        input_fee = self.tx_cost_constants.satoshi_per_byte * (tx_utils.BYTES_PER_INPUT + 1)
+        coins = sorted((s for s in spendables if s.coin_value > input_fee),
+                       key=lambda s: (-s.coin_value, s.tx_hash, s.tx_out_index))
+        if not coins:
+            return None
+
+        selected = self.knapsack(coins)
+        # without change, all the inputs are paid as fee: it only pays off for less than the fee with change
+        max_total = self.fee(len(selected)) if selected is not None else None
+        without_change = self.branch_and_bound(coins, max_total)
+        if without_change is not None:
+            selected = without_change
+        if selected is None:
+            return None
+        if self.consolidation_satoshi_per_byte is not None and \
+                self.tx_cost_constants.satoshi_per_byte <= self.consolidation_satoshi_per_byte:
+            selected = self.consolidate(coins, selected)
+        return selected
+
+    def cost_of_change(self):
+        return self.tx_cost_constants.get_minimum_output_coin() + \
+            self.tx_cost_constants.satoshi_per_byte * tx_utils.BYTES_PER_OUTPUT
+
+    def branch_and_bound(self, coins, max_total=None):
+        """
+        Depth first search of the subsets of coins (by decreasing value) paying for a transaction without change with
+        at most cost_of_change over. Coins worth more than their input's fee only add to the surplus, so a branch
+        stops at the first subset paying the fee, once it pays more than the best subset (or max_total), or once the
+        remaining coins cannot make up for the fee.
+        :return: the subset worth the least, i.e. paying the least fee, or None
+        """
+        if max_total is not None:
+            # coins worth more than max_total alone are left out from the start
+            coins = coins[bisect.bisect_left([-coin.coin_value for coin in coins], -max_total):]
+        values = [coin.coin_value for coin in coins]
+        remaining = [0] * (len(values) + 1)
+        for index in range(len(values) - 1, -1, -1):
+            remaining[index] = remaining[index + 1] + values[index]
+        fees = [self.fee(count, change=False) for count in range(len(values) + 1)]
+        cost_of_change = self.cost_of_change()
+
+        best = None
+        best_total = max_total
+        selection = []
+        total = 0
+        index = 0
+        for _ in range(BNB_MAX_TRIES):
+            count = len(selection)
+            surplus = total - fees[count]
+            if best_total is not None and total > best_total:
+                backtrack = True
+            elif surplus >= 0:
+                if surplus <= cost_of_change and (best is None or total < best_total):
+                    best = list(selection)
+                    best_total = total
+                backtrack = True
+            else:
+                # a subset paying the fee needs another coin, and then pays at least the fee of one more input
+                backtrack = total + remaining[index] < fees[count + len(values) - index] or \
+                    (best_total is not None and fees[count + 1] > best_total)
+
+            if not backtrack:
+                selection.append(index)
+                total += values[index]
+                index += 1
+                continue
+            if not selection:
+                break
+            # leave the last coin out, along with the coins of the same value after it: including one of them instead
+            # gives the subsets already searched
+            last = selection.pop()
+            total -= values[last]
+            index = last + 1
+            while index < len(values) and values[index] == values[last]:
+                index += 1
+
+        if best is None:
+            return None
+        return [coins[index] for index in best]
+
+    def knapsack(self, coins):
+        """
+        The smallest single coin paying for the transaction with change of at least the dust threshold, or when there
+        is none, a randomized search of the fewest coins doing so, leaving the smallest change.
+        :return: the inputs, or None
+        """
+        min_change = self.tx_cost_constants.get_minimum_output_coin()
+        single_target = self.fee(1) + min_change
+
+        lowest_larger = None
+        smaller = []
+        for coin in coins:
+            if coin.coin_value >= single_target:
+                lowest_larger = coin
+            else:
+                smaller.append(coin)
+
+        if lowest_larger is not None:
+            return [lowest_larger]
+
+        best = None
+        best_change = None
+        values = [coin.coin_value for coin in smaller]
+        targets = [self.fee(count) + min_change for count in range(len(values) + 1)]
+        if sum(values) >= targets[len(values)]:
+            rng = random.Random(self.seed)
+            for _ in range(KNAPSACK_ITERATIONS):
+                included = [False] * len(values)
+                total = 0
+                count = 0
+                reached = False
+                for pass_number in range(2):
+                    if reached:
+                        break
+                    for index, value in enumerate(values):
+                        # the first pass draws coins at random, the second adds the others until the target is reached
+                        if included[index] or (pass_number == 0 and rng.random() < 0.5):
+                            continue
+                        total += value
+                        count += 1
+                        included[index] = True
+                        if total >= targets[count]:
+                            reached = True
+                            change = (count, total - targets[count])
+                            if best_change is None or change < best_change:
+                                best = [coin for coin, is_included in zip(smaller, included) if is_included]
+                                best_change = change
+                            # look for a smaller total without this coin
+                            total -= value
+                            count -= 1
+                            included[index] = False
+        return best
+
+    def consolidate(self, coins, selected):
+        """
+        Adds the smallest coins not selected, up to max_consolidation_inputs inputs
+        """
+        selected = list(selected)
+        outpoints = set((coin.tx_hash, coin.tx_out_index) for coin in selected)
+        for coin in reversed(coins):
+            if len(selected) >= self.max_consolidation_inputs:
+                break
+            if (coin.tx_hash, coin.tx_out_index) not in outpoints:
+                selected.append(coin)
+        return selected
@@ -0,0 +1,242 @@
+"""
+Fee bumping of stuck issuing transactions (--fee_bump_method): the transactions broadcast are watched until they
+confirm, and once one has waited fee_bump_after_blocks blocks unconfirmed, it is bumped to a higher fee rate: the
+current estimate, and at least fee_bump_factor times its rate so far. Transactions providers no longer know about are
+broadcast again.
+
+Fees are bumped with cpfp (child pays for parent): a child transaction spends the change of the stuck transaction back
+to the issuing address, paying the fee missing for the two of them (and their unconfirmed ancestors) at the higher
+rate. The stuck transaction is unchanged, and so is its txid, which the proofs already written name in their anchors.
+Replace by fee is not used, as the replacement would have another txid.
+
+Only the last transaction of a chain (the one whose change is unspent) is bumped: bumping it bumps its unconfirmed
+ancestors along, as miners take them together. Ancestors broadcast before the tracker started are not accounted for.
+
+Transactions are checked every confirmation_poll_interval seconds in a background thread, while the issuer runs: the
+tracker is for cert-issuer serve and web issuance, a single run exits without waiting for confirmations.
+"""
+import logging
+import math
+import threading
+
+from pycoin.encoding.hexbytes import b2h
+
+from cert_issuer.blockchain_handlers.bitcoin import tx_utils
+from cert_issuer.blockchain_handlers.bitcoin.utxo_cache import get_outpoint
+
+FEE_BUMP_METHODS = ('cpfp',)
+DEFAULT_BUMP_AFTER_BLOCKS = 3
+DEFAULT_BUMP_FACTOR = 1.5
+DEFAULT_POLL_INTERVAL = 60
+# minimum increase of a bump, as for a replacement (BIP 125)
+INCREMENTAL_RELAY_SATOSHI_PER_BYTE = 1
+
+
+class TrackedTransaction(object):
+    def __init__(self, tx_id, signed_tx, broadcast_height):
+        """
+        :param signed_tx: pycoin transaction, with its unspents set
+        :param broadcast_height: block height when it was broadcast (or last bumped), None if not known yet
+        """
+        self.tx_id = tx_id
+        self.signed_tx = signed_tx
+        self.fee = signed_tx.fee()
+        self.vsize = tx_utils.get_vsize(signed_tx)
+        self.broadcast_height = broadcast_height
+
+
+class ConfirmationTracker(object):
+    def __init__(self, transaction_handler, method='cpfp', bump_after_blocks=DEFAULT_BUMP_AFTER_BLOCKS,
+                 bump_factor=DEFAULT_BUMP_FACTOR, max_satoshi_per_byte=None, poll_interval=DEFAULT_POLL_INTERVAL):
+        """
+        :param transaction_handler: the BitcoinTransactionHandler issuing the transactions, bumps are signed,
+            broadcast and applied to its UTXO cache the same way
+        :param method: 'cpfp'
+        :param bump_after_blocks: blocks a transaction waits unconfirmed before its fee is bumped, and between bumps
+        :param bump_factor: minimum increase of the fee rate of a bump
+        :param max_satoshi_per_byte: cap on the fee rate of the bumps, None for no cap
+        :param poll_interval: seconds between checks
+        """
+        if method not in FEE_BUMP_METHODS:
+            raise ValueError('Unknown fee bump method {}'.format(method))
+        self.transaction_handler = transaction_handler
+        self.method = method
+        self.bump_after_blocks = bump_after_blocks
+        self.bump_factor = bump_factor
+        self.max_satoshi_per_byte = max_satoshi_per_byte
+        self.poll_interval = poll_interval
+        # txid -> TrackedTransaction, of the transactions not confirmed yet
+        self.tracked = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def track(self, tx_id, signed_tx, broadcast_height=None):
+        """
+        Watches a transaction just broadcast, the checks start with the first one
+        """
+        if broadcast_height is None:
+            broadcast_height = self.get_block_height()
+        with self.lock:
+            self.tracked[tx_id] = TrackedTransaction(tx_id, signed_tx, broadcast_height)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='confirmation_tracker', daemon=True)
+                self.thread.start()
+
+    def close(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logging.error('Failed checking the confirmation of the issuing transactions: %s', e, exc_info=True)
+
+    def get_block_height(self):
+        try:
+            return self.transaction_handler.connector.get_block_height()
+        except Exception as e:
+            logging.warning('Could not get the block height: %s', e)
+            return None
+
+    def check(self):
+        """
+        Forgets the transactions confirmed, broadcasts again those unknown, and bumps the fee of those waiting for
+        bump_after_blocks blocks
+        :return: the txids still unconfirmed
+        """
+        height = self.get_block_height()
+        if height is None:
+            return self.get_unconfirmed()
+        with self.lock:
+            tracked_transactions = list(self.tracked.values())
+        for tracked in tracked_transactions:
+            try:
+                confirmations = self.transaction_handler.connector.get_confirmations(tracked.tx_id)
+            except Exception as e:
+                logging.warning('Could not get the confirmations of transaction %s: %s', tracked.tx_id, e)
+                continue
+            if confirmations:
+                logging.info('Transaction %s is confirmed', tracked.tx_id)
+                self.forget(tracked.tx_id)
+                continue
+            if confirmations is None and not self.rebroadcast(tracked):
+                continue
+            if tracked.broadcast_height is None:
+                tracked.broadcast_height = height
+            elif height - tracked.broadcast_height >= self.bump_after_blocks:
+                try:
+                    self.bump(tracked, height)
+                except Exception as e:
+                    logging.error('Failed bumping the fee of transaction %s: %s', tracked.tx_id, e, exc_info=True)
+        return self.get_unconfirmed()
+
+    def get_unconfirmed(self):
+        with self.lock:
+            return list(self.tracked)
+
+    def forget(self, tx_id):
+        with self.lock:
+            self.tracked.pop(tx_id, None)
+
+    def rebroadcast(self, tracked):
+        """
+        :return: whether the providers accepted the transaction again
+        """
+        logging.warning('Transaction %s is unknown to the providers, broadcasting it again', tracked.tx_id)
+        try:
+            self.transaction_handler.connector.broadcast_tx(tracked.signed_tx)
+        except Exception as e:
+            # its inputs were spent by another transaction
+            logging.error('Transaction %s was dropped, it could not be broadcast again: %s', tracked.tx_id, e)
+            self.forget(tracked.tx_id)
+            self.transaction_handler.utxo_cache.invalidate(self.transaction_handler.issuing_address)
+            return False
+        return True
+
+    def get_package(self, tracked):
+        """
+        :return: tracked and its ancestors among the unconfirmed transactions tracked
+        """
+        with self.lock:
+            by_hash = dict((t.signed_tx.hash(), t) for t in self.tracked.values())
+        package = []
+        seen = set()
+        pending = [tracked]
+        while pending:
+            transaction = pending.pop()
+            if transaction.tx_id in seen:
+                continue
+            seen.add(transaction.tx_id)
+            package.append(transaction)
+            for tx_in in transaction.signed_tx.txs_in:
+                parent = by_hash.get(tx_in.previous_hash)
+                if parent is not None:
+                    pending.append(parent)
+        return package
+
+    def get_change(self, tracked):
+        """
+        :return: the output of tracked back to the issuing address if it is still unspent, else None
+        """
+        handler = self.transaction_handler
+        for spendable in tracked.signed_tx.tx_outs_as_spendable():
+            if spendable.coin_value > 0:
+                unspent = handler.utxo_cache.get_spendable(handler.issuing_address, get_outpoint(spendable))
+                if unspent is not None:
+                    return unspent
+        return None
+
+    def get_bumped_rate(self, package_fee, package_vsize):
+        cost_constants = self.transaction_handler.tx_cost_constants
+        cost_constants.update_fee_rate()
+        package_rate = package_fee / package_vsize
+        satoshi_per_byte = max(cost_constants.satoshi_per_byte, package_rate * self.bump_factor,
+                               package_rate + INCREMENTAL_RELAY_SATOSHI_PER_BYTE)
+        if self.max_satoshi_per_byte is not None:
+            satoshi_per_byte = min(satoshi_per_byte, self.max_satoshi_per_byte)
+        return satoshi_per_byte
+
+    def bump(self, tracked, height):
+        """
+        :return: the txid of the child transaction, or None if tracked is not bumped
+        """
+        with self.transaction_handler.lock:
+            change = self.get_change(tracked)
+            if change is None:
+                # its change is spent by a later transaction, bumping that one bumps tracked too
+                return None
+            package = self.get_package(tracked)
+            package_fee = sum(t.fee for t in package)
+            package_vsize = sum(t.vsize for t in package)
+            satoshi_per_byte = self.get_bumped_rate(package_fee, package_vsize)
+            if satoshi_per_byte * package_vsize <= package_fee:
+                logging.warning('Transaction %s already pays the highest fee rate allowed', tracked.tx_id)
+                return None
+
+            logging.info('Transaction %s is unconfirmed after %d blocks, bumping it from %.1f to %.1f satoshis per '
+                         'byte', tracked.tx_id, height - tracked.broadcast_height, package_fee / package_vsize,
+                         satoshi_per_byte)
+            tx_id = self.child_pays_for_parent(tracked, change, package_fee, package_vsize, satoshi_per_byte, height)
+            if tx_id is not None:
+                tracked.broadcast_height = height
+            return tx_id
+
+    def child_pays_for_parent(self, tracked, change, package_fee, package_vsize, satoshi_per_byte, height):
+        handler = self.transaction_handler
+        child_vsize = tx_utils.estimate_signed_vsize(tx_utils.create_cpfp_trx(0, handler.issuing_address, [change]))
+        fee = int(math.ceil(satoshi_per_byte * (package_vsize + child_vsize))) - package_fee
+        if change.coin_value - fee < handler.tx_cost_constants.get_minimum_output_coin():
+            logging.error('The change of transaction %s cannot pay %d satoshis for a child transaction', tracked.tx_id,
+                          fee)
+            return None
+        child = tx_utils.create_cpfp_trx(fee, handler.issuing_address, [change])
+        prepared_tx = tx_utils.prepare_tx_for_signing(b2h(child.serialize()), [change])
+        signed_tx = handler.sign_transaction(prepared_tx)
+        tx_id = handler.broadcast_transaction(signed_tx)
+        logging.info('Broadcast child transaction %s paying %d satoshis for transaction %s', tx_id, fee, tracked.tx_id)
+        self.track(tx_id, signed_tx, height)
+        return tx_id
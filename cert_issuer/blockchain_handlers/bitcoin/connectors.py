@@ -1,25 +1,26 @@
 """
 Connectors wrap the details of communicating with different Bitcoin clients and implementations.
 """
+import functools
 import io
 import logging
+import threading
 import time
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
 
 import bitcoin.rpc
-import requests
 from bitcoin.core import CTransaction
 from cert_core import Chain
 from pycoin.encoding.hexbytes import b2h, b2h_rev, h2b, h2b_rev
-from pycoin.services import providers
-from pycoin.services.chain_so import ChainSoProvider
-from pycoin.services.insight import InsightProvider
-from pycoin.services.providers import service_provider_methods
 from pycoin.coins.bitcoin.Spendable import Spendable
 
 import cert_issuer.config
 from cert_issuer import helpers
-from cert_issuer.errors import BroadcastError
+from cert_issuer.circuit_breaker import get_circuit_breakers
+from cert_issuer.errors import BroadcastError, ConnectorError
+from cert_issuer.http_client import get_http_client
+from cert_issuer.models import MockServiceProviderConnector
 
 try:
     from urllib2 import urlopen, HTTPError
@@ -28,8 +29,15 @@ except ImportError:
     from urllib.request import urlopen, HTTPError
     from urllib.parse import urlencode
 
-BROADCAST_RETRY_INTERVAL = 30
 MAX_BROADCAST_ATTEMPTS = 3
+# seconds to wait for any provider to accept the transaction, per attempt
+BROADCAST_TIMEOUT = 60
+# jittered exponential backoff between attempts, in seconds
+BROADCAST_BACKOFF_BASE = 2
+BROADCAST_BACKOFF_CAP = 30
+
+# providers are all called at once; calls outliving a broadcast keep running here after it returns
+broadcast_executor = ThreadPoolExecutor(thread_name_prefix='broadcast')
 
 
 def to_hex(transaction):
@@ -52,7 +60,7 @@ class BlockcypherProvider(object):
         broadcast_url = self.base_url + '/txs/push'
         if self.api_token:
             broadcast_url += '?token=' + self.api_token
-        response = requests.post(broadcast_url, json={'tx': hextx})
+        response = get_http_client().post(broadcast_url, json={'tx': hextx})
         if int(response.status_code) == 201:
             tx_id = response.json().get('tx', None)
             tx_hash = tx_id.get('hash', None)
@@ -71,7 +79,7 @@ class BlockcypherProvider(object):
         if self.api_token:
             url_append += '&token=' + self.api_token
         url = self.base_url + '/addrs/' + address + url_append
-        response = requests.get(url)
+        response = get_http_client().get(url)
         if int(response.status_code) == 200:
             for txn in response.json().get('txrefs', []):
                 coin_value = txn.get('value')
@@ -88,13 +96,33 @@ class BlockstreamBroadcaster(object):
     def broadcast_tx(self, tx):
         hextx = to_hex(tx)
         broadcast_url = self.base_url + '/tx'
-        response = requests.post(broadcast_url, data=hextx)
+        response = get_http_client().post(broadcast_url, data=hextx)
         if int(response.status_code) == 200:
             tx_id = response.text
             return tx_id
         logging.error('Error broadcasting the transaction through the Blockstream API. Error msg: %s', response.text)
         raise BroadcastError(response.text)
 
+    def get_block_height(self):
+        response = get_http_client().get(self.base_url + '/blocks/tip/height')
+        if int(response.status_code) == 200:
+            return int(response.text)
+        raise ConnectorError(response.text)
+
+    def get_confirmations(self, tx_id):
+        """
+        :return: the number of confirmations of the transaction, 0 while in the mempool, None if unknown
+        """
+        response = get_http_client().get(self.base_url + '/tx/' + tx_id + '/status')
+        if int(response.status_code) == 404:
+            return None
+        if int(response.status_code) != 200:
+            raise ConnectorError(response.text)
+        status = response.json()
+        if not status.get('confirmed'):
+            return 0
+        return self.get_block_height() - status['block_height'] + 1
+
 class BitcoindConnector(object):
     def __init__(self, netcode):
         self.netcode = netcode
@@ -125,17 +153,25 @@ class BitcoindConnector(object):
             spendables.append(Spendable(coin_value, script, previous_hash, previous_index))
         return spendables
 
+    def get_block_height(self):
+        return bitcoin.rpc.Proxy().getblockcount()
 
-class ServiceProviderConnector(object):
-    @abstractmethod
-    def get_balance(self, address):
-        pass
-
-    def broadcast_tx(self, tx):
-        pass
+    def get_confirmations(self, tx_id):
+        """
+        Transactions of the issuing address are in the bitcoind wallet
+        :return: the number of confirmations of the transaction, 0 while in the mempool, None if unknown
+        """
+        try:
+            transaction = bitcoin.rpc.Proxy().call('gettransaction', tx_id)
+        except bitcoin.rpc.InvalidAddressOrKeyError:
+            return None
+        confirmations = transaction.get('confirmations', 0)
+        # negative when conflicting with a confirmed transaction, it will not confirm
+        return confirmations if confirmations >= 0 else None
 
 
-class MockServiceProviderConnector(ServiceProviderConnector):
+class ServiceProviderConnector(object):
+    @abstractmethod
     def get_balance(self, address):
         pass
 
@@ -149,11 +185,12 @@ class BitcoinServiceProviderConnector(ServiceProviderConnector):
         self.bitcoind = bitcoind
 
     def spendables_for_address(self, bitcoin_address):
-        for m in service_provider_methods('spendables_for_address',
-                                          get_providers_for_chain(self.bitcoin_chain, self.bitcoind)):
+        breakers = get_circuit_breakers()
+        for m in breakers.order(service_provider_methods('spendables_for_address',
+                                                         get_providers_for_chain(self.bitcoin_chain, self.bitcoind))):
             try:
                 logging.debug('m=%s', m)
-                spendables = m(bitcoin_address)
+                spendables = breakers.call(m, bitcoin_address)
                 return spendables
             except Exception as e:
                 logging.warning(e)
@@ -169,7 +206,7 @@ class BitcoinServiceProviderConnector(ServiceProviderConnector):
         logging.debug('get_unspent_outputs for address=%s', address)
         spendables = self.spendables_for_address(bitcoin_address=address)
         if spendables:
-            return sorted(spendables, key=lambda x: hash(x.coin_value))
+            return sorted(spendables, key=lambda x: (x.coin_value, x.tx_hash, x.tx_out_index))
         return None
 
     def get_balance(self, address):
@@ -186,6 +223,31 @@ class BitcoinServiceProviderConnector(ServiceProviderConnector):
         balance = sum(s.coin_value for s in spendables)
         return balance
 
+    def get_block_height(self):
+        return self.call_providers('get_block_height')
+
+    def get_confirmations(self, tx_id):
+        """
+        :return: the number of confirmations of the transaction, 0 while in the mempool, None if the provider asked
+            does not know it
+        """
+        return self.call_providers('get_confirmations', tx_id)
+
+    def call_providers(self, method_name, *args):
+        """
+        Calls method_name of the providers having it, until one answers
+        """
+        last_exception = None
+        breakers = get_circuit_breakers()
+        for m in breakers.order(service_provider_methods(method_name,
+                                                         get_providers_for_chain(self.bitcoin_chain, self.bitcoind))):
+            try:
+                return breakers.call(m, *args)
+            except Exception as e:
+                logging.warning('Caught exception trying provider %s. Trying another. Exception=%s', str(m), e)
+                last_exception = e
+        raise ConnectorError('No provider answered {}: {}'.format(method_name, last_exception))
+
     def broadcast_tx(self, tx):
         """
         Broadcast the transaction through the configured set of providers
@@ -198,76 +260,124 @@ class BitcoinServiceProviderConnector(ServiceProviderConnector):
     @staticmethod
     def broadcast_tx_with_chain(tx, bitcoin_chain, bitcoind=False):
         """
-        Broadcast the transaction through the configured set of providers
+        Broadcast the transaction through all the configured providers whose circuit is not open at once, and return
+        the first txid a provider accepts. Failed attempts are retried after a jittered exponential backoff.
 
         :param tx:
         :param bitcoin_chain:
         :return:
         """
         last_exception = None
-        final_tx_id = None
+        breakers = get_circuit_breakers()
+        method_providers = service_provider_methods('broadcast_tx', get_providers_for_chain(bitcoin_chain, bitcoind))
 
-        # Unlike other providers, we want to broadcast to all available apis
         for attempt_number in range(0, MAX_BROADCAST_ATTEMPTS):
-            for method_provider in service_provider_methods('broadcast_tx',
-                                                            get_providers_for_chain(bitcoin_chain, bitcoind)):
-                try:
-                    tx_id = method_provider(tx)
+            futures = {broadcast_executor.submit(breakers.call, method_provider, tx): method_provider
+                       for method_provider in breakers.order(method_providers)}
+            try:
+                for future in as_completed(futures, timeout=BROADCAST_TIMEOUT):
+                    method_provider = futures[future]
+                    try:
+                        tx_id = future.result()
+                    except Exception as e:
+                        logging.warning('Caught exception trying provider %s. Trying another. Exception=%s',
+                                        str(method_provider), e)
+                        last_exception = e
+                        continue
                     if tx_id:
                         logging.info('Broadcasting succeeded with method_provider=%s, txid=%s', str(method_provider),
                                      tx_id)
-                        if final_tx_id and final_tx_id != tx_id:
-                            logging.error(
-                                'This should never happen; fail and investigate if it does. Got conflicting tx_ids=%s and %s. Hextx=%s',
-                                final_tx_id, tx_id, tx.as_hex())
-                            raise Exception('Got conflicting tx_ids.')
-                        final_tx_id = tx_id
-                except Exception as e:
-                    logging.warning('Caught exception trying provider %s. Trying another. Exception=%s',
-                                    str(method_provider), e)
-                    last_exception = e
-            # At least 1 provider succeeded, so return
-            if final_tx_id:
-                return final_tx_id
-            else:
-                logging.warning('Broadcasting failed. Waiting before retrying. This is attempt number %d',
-                                attempt_number)
-                time.sleep(BROADCAST_RETRY_INTERVAL)
+                        # providers still broadcasting must agree on the txid
+                        for other_future, other_method_provider in futures.items():
+                            if other_future is not future:
+                                other_future.add_done_callback(
+                                    functools.partial(check_broadcast_tx_id, tx, tx_id, other_method_provider))
+                        return tx_id
+            except TimeoutError as e:
+                logging.warning('No provider accepted the transaction within %d seconds', BROADCAST_TIMEOUT)
+                last_exception = e
+
+            if attempt_number < MAX_BROADCAST_ATTEMPTS - 1:
+                delay = helpers.jittered_backoff(attempt_number, BROADCAST_BACKOFF_BASE, BROADCAST_BACKOFF_CAP)
+                logging.warning('Broadcasting failed. Waiting %.1f seconds before retrying. This is attempt number %d',
+                                delay, attempt_number)
+                time.sleep(delay)
         logging.error('Failed broadcasting through all providers')
         logging.error(last_exception, exc_info=True)
         raise BroadcastError(last_exception)
 
 
-# configure api tokens
-config = cert_issuer.config.CONFIG
-blockcypher_token = None if config is None else config.blockcypher_api_token
+def check_broadcast_tx_id(tx, tx_id, method_provider, future):
+    """
+    Done callback of a provider that answered after the broadcast returned tx_id
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    other_tx_id = future.result()
+    if other_tx_id and other_tx_id != tx_id:
+        logging.error(
+            'This should never happen; fail and investigate if it does. Got conflicting tx_ids=%s and %s from %s. Hextx=%s',
+            tx_id, other_tx_id, str(method_provider), tx.as_hex())
+
 
 PYCOIN_BTC_PROVIDERS = "blockchain.info chain.so"  # blockcypher.com
 PYCOIN_XTN_PROVIDERS = ""  # chain.so
 
-# initialize connectors
+# providers of each chain, built on first use of the chain
 connectors = {}
+connectors_lock = threading.Lock()
+
+
+def get_mainnet_providers(blockcypher_token):
+    from pycoin.services import providers
+    from pycoin.services.chain_so import ChainSoProvider
+    from pycoin.services.insight import InsightProvider
 
-# configure mainnet providers
-provider_list = providers.providers_for_config_string(PYCOIN_BTC_PROVIDERS,
-                                                      helpers.to_pycoin_chain(Chain.bitcoin_mainnet))
-provider_list.append(BlockcypherProvider('https://api.blockcypher.com/v1/btc/main', blockcypher_token))
-provider_list.append(InsightProvider(netcode=helpers.to_pycoin_chain(Chain.bitcoin_mainnet)))
-provider_list.append(ChainSoProvider(netcode=helpers.to_pycoin_chain(Chain.bitcoin_mainnet)))
-provider_list.append(BlockstreamBroadcaster('https://blockstream.info/api'))
-connectors[Chain.bitcoin_mainnet] = provider_list
+    provider_list = providers.providers_for_config_string(PYCOIN_BTC_PROVIDERS,
+                                                          helpers.to_pycoin_chain(Chain.bitcoin_mainnet))
+    provider_list.append(BlockcypherProvider('https://api.blockcypher.com/v1/btc/main', blockcypher_token))
+    provider_list.append(InsightProvider(netcode=helpers.to_pycoin_chain(Chain.bitcoin_mainnet)))
+    provider_list.append(ChainSoProvider(netcode=helpers.to_pycoin_chain(Chain.bitcoin_mainnet)))
+    provider_list.append(BlockstreamBroadcaster('https://blockstream.info/api'))
+    return provider_list
 
-# configure testnet providers
-xtn_provider_list = providers.providers_for_config_string(PYCOIN_XTN_PROVIDERS,
-                                                          helpers.to_pycoin_chain(Chain.bitcoin_testnet))
-xtn_provider_list.append(ChainSoProvider(netcode=helpers.to_pycoin_chain(Chain.bitcoin_testnet)))
-xtn_provider_list.append(BlockcypherProvider('https://api.blockcypher.com/v1/btc/test3', blockcypher_token))
-xtn_provider_list.append(BlockstreamBroadcaster('https://blockstream.info/testnet/api'))
-connectors[Chain.bitcoin_testnet] = xtn_provider_list
+
+def get_testnet_providers(blockcypher_token):
+    from pycoin.services import providers
+    from pycoin.services.chain_so import ChainSoProvider
+
+    xtn_provider_list = providers.providers_for_config_string(PYCOIN_XTN_PROVIDERS,
+                                                              helpers.to_pycoin_chain(Chain.bitcoin_testnet))
+    xtn_provider_list.append(ChainSoProvider(netcode=helpers.to_pycoin_chain(Chain.bitcoin_testnet)))
+    xtn_provider_list.append(BlockcypherProvider('https://api.blockcypher.com/v1/btc/test3', blockcypher_token))
+    xtn_provider_list.append(BlockstreamBroadcaster('https://blockstream.info/testnet/api'))
+    return xtn_provider_list
+
+
+provider_factories = {
+    Chain.bitcoin_mainnet: get_mainnet_providers,
+    Chain.bitcoin_testnet: get_testnet_providers
+}
 
 
 def get_providers_for_chain(chain, bitcoind=False):
-    if bitcoind:
-        return [BitcoindConnector(helpers.to_pycoin_chain(chain))]
-    else:
-        return connectors[chain]
+    """
+    Returns the providers of chain, built and cached on the first call for the chain
+    """
+    with connectors_lock:
+        if (chain, bitcoind) not in connectors:
+            if bitcoind:
+                connectors[(chain, bitcoind)] = [BitcoindConnector(helpers.to_pycoin_chain(chain))]
+            else:
+                # read when first needed, after the config is parsed
+                blockcypher_token = getattr(cert_issuer.config.CONFIG, 'blockcypher_api_token', None)
+                connectors[(chain, bitcoind)] = provider_factories[chain](blockcypher_token)
+        return connectors[(chain, bitcoind)]
+
+
+def service_provider_methods(method_name, service_providers):
+    """
+    Same as pycoin.services.providers.service_provider_methods, without importing the pycoin providers
+    """
+    methods = [getattr(m, method_name, None) for m in service_providers]
+    return [m for m in methods if m]
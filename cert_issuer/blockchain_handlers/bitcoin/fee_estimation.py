@@ -0,0 +1,106 @@
+"""
+Live fee rate estimation for Bitcoin issuing transactions (--satoshi_per_byte_dynamic): the fee rate getting a
+transaction confirmed within fee_target_blocks blocks is asked of bitcoind (estimatesmartfee) or of the Esplora block
+explorers (Blockstream, mempool.space), and cached for fee_estimate_ttl seconds.
+
+When no provider answers, the configured satoshi_per_byte is used.
+"""
+import logging
+import threading
+import time
+
+from cert_core import Chain
+
+from cert_issuer.circuit_breaker import get_circuit_breakers
+from cert_issuer.errors import FeeEstimationError
+from cert_issuer.http_client import get_http_client
+
+COIN = 100000000  # satoshis in 1 btc
+DEFAULT_TARGET_BLOCKS = 6
+DEFAULT_TTL = 300
+# minimum relay fee rate of Bitcoin Core
+MIN_SATOSHI_PER_BYTE = 1
+
+
+class BitcoindFeeProvider(object):
+    def get_satoshi_per_byte(self, target_blocks):
+        import bitcoin.rpc
+        estimate = bitcoin.rpc.Proxy().call('estimatesmartfee', target_blocks)
+        if 'feerate' not in estimate:
+            raise FeeEstimationError('bitcoind has no fee estimate: {}'.format(estimate.get('errors')))
+        # BTC per kvB
+        return estimate['feerate'] * COIN / 1000
+
+
+class EsploraFeeProvider(object):
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def get_satoshi_per_byte(self, target_blocks):
+        response = get_http_client().get(self.base_url + '/fee-estimates')
+        if int(response.status_code) != 200:
+            raise FeeEstimationError(response.text)
+        # confirmation target in blocks -> sat/vB
+        estimates = dict((int(target), rate) for target, rate in response.json().items())
+        if not estimates:
+            raise FeeEstimationError('No fee estimates from {}'.format(self.base_url))
+        # the estimate for the closest target at most target_blocks, i.e. the one confirming no later than asked
+        targets = [target for target in estimates if target <= target_blocks]
+        return estimates[max(targets) if targets else min(estimates)]
+
+
+def get_fee_providers(chain, bitcoind=False):
+    if bitcoind:
+        return [BitcoindFeeProvider()]
+    if chain == Chain.bitcoin_mainnet:
+        return [EsploraFeeProvider('https://blockstream.info/api'), EsploraFeeProvider('https://mempool.space/api')]
+    return [EsploraFeeProvider('https://blockstream.info/testnet/api'),
+            EsploraFeeProvider('https://mempool.space/testnet/api')]
+
+
+class FeeEstimator(object):
+    def __init__(self, providers, fallback_satoshi_per_byte, target_blocks=DEFAULT_TARGET_BLOCKS, ttl=DEFAULT_TTL,
+                 max_satoshi_per_byte=None):
+        """
+        :param providers: objects with a get_satoshi_per_byte(target_blocks) method
+        :param fallback_satoshi_per_byte: used when no provider answers
+        :param target_blocks: number of blocks the transaction should be confirmed within
+        :param ttl: seconds an estimate is used for
+        :param max_satoshi_per_byte: cap on the estimates, None for no cap
+        """
+        self.providers = providers
+        self.fallback_satoshi_per_byte = fallback_satoshi_per_byte
+        self.target_blocks = target_blocks
+        self.ttl = ttl
+        self.max_satoshi_per_byte = max_satoshi_per_byte
+        self.satoshi_per_byte = None
+        self.estimated_at = None
+        self.lock = threading.Lock()
+
+    def get_satoshi_per_byte(self):
+        with self.lock:
+            if self.satoshi_per_byte is None or time.monotonic() - self.estimated_at >= self.ttl:
+                self.satoshi_per_byte = self.estimate()
+                self.estimated_at = time.monotonic()
+            return self.satoshi_per_byte
+
+    def estimate(self):
+        breakers = get_circuit_breakers()
+        methods = [provider.get_satoshi_per_byte for provider in self.providers]
+        for method in breakers.order(methods):
+            try:
+                satoshi_per_byte = breakers.call(method, self.target_blocks)
+            except Exception as e:
+                logging.warning('Caught exception estimating the fee rate with %s. Trying another. Exception=%s',
+                                str(method), e)
+                continue
+            satoshi_per_byte = max(satoshi_per_byte, MIN_SATOSHI_PER_BYTE)
+            if self.max_satoshi_per_byte is not None and satoshi_per_byte > self.max_satoshi_per_byte:
+                logging.warning('Estimated fee rate of %.1f satoshis per byte capped to %s', satoshi_per_byte,
+                                self.max_satoshi_per_byte)
+                satoshi_per_byte = self.max_satoshi_per_byte
+            logging.info('Estimated fee rate for confirmation within %d blocks: %.1f satoshis per byte',
+                         self.target_blocks, satoshi_per_byte)
+            return satoshi_per_byte
+        logging.warning('Could not estimate the fee rate, using %s satoshis per byte', self.fallback_satoshi_per_byte)
+        return self.fallback_satoshi_per_byte
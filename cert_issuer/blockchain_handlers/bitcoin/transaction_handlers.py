@@ -1,9 +1,11 @@
 import logging
-import random
+import threading
 
 from pycoin.encoding.hexbytes import b2h
 
 from cert_issuer.blockchain_handlers.bitcoin import tx_utils
+from cert_issuer.blockchain_handlers.bitcoin.coin_selection import CoinSelector
+from cert_issuer.blockchain_handlers.bitcoin.utxo_cache import UTXOCache
 from cert_issuer.config import ESTIMATE_NUM_INPUTS, V2_NUM_OUTPUTS
 from cert_issuer.errors import InsufficientFundsError
 from cert_issuer.models import TransactionCreator, TransactionHandler
@@ -17,6 +19,25 @@ class TransactionV2Creator(TransactionCreator):
 
     def create_transaction(self, tx_cost_constants, issuing_address, inputs, op_return_value):
         fee = tx_utils.calculate_tx_fee(tx_cost_constants, len(inputs), V2_NUM_OUTPUTS)
+        transaction = self.create_transaction_with_fee(tx_cost_constants, issuing_address, inputs, op_return_value, fee)
+
+        # calculate_tx_fee sizes the inputs at an upper bound, the fee is set again for the size of the transaction.
+        # It is sized with a change output even if the first draft had none: paying less may leave a change above the
+        # dust threshold, and then the change output is added. A change left as fee pays more than that size.
+        vsize = tx_utils.estimate_signed_vsize(transaction)
+        if len(transaction.vout) == 1:
+            vsize += tx_utils.BYTES_PER_OUTPUT
+        vsize_fee = tx_utils.calculate_fee_for_vsize(tx_cost_constants, vsize)
+        if vsize_fee != fee:
+            transaction = self.create_transaction_with_fee(tx_cost_constants, issuing_address, inputs, op_return_value,
+                                                           vsize_fee)
+        return transaction
+
+    def create_transaction_with_fee(self, tx_cost_constants, issuing_address, inputs, op_return_value, fee):
+        value_in = sum(tx_input.coin_value for tx_input in inputs)
+        if value_in - fee < tx_cost_constants.get_minimum_output_coin():
+            # the change would be dust, it is left to the miners instead
+            fee = value_in
         transaction = tx_utils.create_trx(
             op_return_value,
             fee,
@@ -29,21 +50,34 @@ class TransactionV2Creator(TransactionCreator):
 
 class BitcoinTransactionHandler(TransactionHandler):
     def __init__(self, connector, tx_cost_constants, secret_manager, issuing_address, prepared_inputs=None,
-                 transaction_creator=TransactionV2Creator()):
+                 transaction_creator=TransactionV2Creator(), coin_selector=None):
         self.connector = connector
         self.tx_cost_constants = tx_cost_constants
         self.secret_manager = secret_manager
         self.issuing_address = issuing_address
         self.prepared_inputs = prepared_inputs
         self.transaction_creator = transaction_creator
+        self.coin_selector = coin_selector or CoinSelector(tx_cost_constants)
+        # spendables are fetched once, then updated with each transaction broadcast
+        self.utxo_cache = UTXOCache(connector)
+        # a ConfirmationTracker bumping the fee of the transactions issued, if set
+        self.confirmation_tracker = None
+        # spending the issuing address' outputs is serialized, between batches and fee bumps
+        self.lock = threading.RLock()
 
     def ensure_balance(self):
+        self.tx_cost_constants.update_fee_rate()
         # ensure the issuing address has sufficient balance
-        balance = self.connector.get_balance(self.issuing_address)
+        balance = self.utxo_cache.get_balance(self.issuing_address)
 
         transaction_cost = self.transaction_creator.estimate_cost_for_certificate_batch(self.tx_cost_constants)
         logging.info('Total cost will be %d satoshis', transaction_cost)
 
+        if transaction_cost > balance:
+            # the address may have been topped up since the spendables were fetched
+            self.utxo_cache.invalidate(self.issuing_address)
+            balance = self.utxo_cache.get_balance(self.issuing_address)
+
         if transaction_cost > balance:
             error_message = 'Please add {} satoshis to the address {}'.format(
                 transaction_cost - balance, self.issuing_address)
@@ -52,10 +86,14 @@ class BitcoinTransactionHandler(TransactionHandler):
 
     def issue_transaction(self, blockchain_bytes):
         op_return_value = b2h(blockchain_bytes)
-        prepared_tx = self.create_transaction(blockchain_bytes)
-        signed_tx = self.sign_transaction(prepared_tx)
-        self.verify_transaction(signed_tx, op_return_value)
-        txid = self.broadcast_transaction(signed_tx)
+        self.tx_cost_constants.update_fee_rate()
+        with self.lock:
+            prepared_tx = self.create_transaction(blockchain_bytes)
+            signed_tx = self.sign_transaction(prepared_tx)
+            self.verify_transaction(signed_tx, op_return_value)
+            txid = self.broadcast_transaction(signed_tx)
+        if self.confirmation_tracker is not None:
+            self.confirmation_tracker.track(txid, signed_tx)
         # this logging is already done in issuer
         # logging.info('Broadcast transaction with txid %s', txid)
         return txid
@@ -64,21 +102,19 @@ class BitcoinTransactionHandler(TransactionHandler):
         if self.prepared_inputs:
             inputs = self.prepared_inputs
         else:
-            spendables = self.connector.get_unspent_outputs(self.issuing_address)
+            spendables = self.utxo_cache.get_spendables(self.issuing_address)
             if not spendables:
                 error_message = 'No money to spend at address {}'.format(self.issuing_address)
                 logging.error(error_message)
                 raise InsufficientFundsError(error_message)
 
-            cost = self.transaction_creator.estimate_cost_for_certificate_batch(self.tx_cost_constants)
-            current_total = 0
-            inputs = []
-            random.shuffle(spendables)
-            for s in spendables:
-                inputs.append(s)
-                current_total += s.coin_value
-                if current_total > cost:
-                    break
+            inputs = self.coin_selector.select(spendables)
+            if not inputs:
+                error_message = 'Not enough money to pay for the transaction at address {}'.format(
+                    self.issuing_address)
+                logging.error(error_message)
+                raise InsufficientFundsError(error_message)
+            logging.info('Selected %d of %d unspent outputs', len(inputs), len(spendables))
 
         tx = self.transaction_creator.create_transaction(self.tx_cost_constants, self.issuing_address, inputs,
                                                          op_return_bytes)
@@ -93,7 +129,7 @@ class BitcoinTransactionHandler(TransactionHandler):
 
         # log the actual byte count
         tx_byte_count = tx_utils.get_byte_count(signed_tx)
-        logging.info('The actual transaction size is %d bytes', tx_byte_count)
+        logging.info('The actual transaction size is %d bytes, %d vbytes', tx_byte_count, tx_utils.get_vsize(signed_tx))
 
         signed_hextx = signed_tx.as_hex()
         logging.info('Signed hextx=%s', signed_hextx)
@@ -105,5 +141,11 @@ class BitcoinTransactionHandler(TransactionHandler):
         tx_utils.verify_transaction(signed_hextx, op_return_value)
 
     def broadcast_transaction(self, signed_tx):
-        tx_id = self.connector.broadcast_tx(signed_tx)
+        try:
+            tx_id = self.connector.broadcast_tx(signed_tx)
+        except Exception:
+            # an input may have been spent elsewhere, the spendables are fetched again for the next attempt
+            self.utxo_cache.invalidate(self.issuing_address)
+            raise
+        self.utxo_cache.spend(self.issuing_address, signed_tx)
         return tx_id
@@ -8,6 +8,7 @@ Helpers for bitcoin transactions, including:
 
 import io
 import logging
+import math
 
 from bitcoin.core import CScript, CMutableTransaction, CMutableTxOut, CTxIn, COutPoint
 from bitcoin.core.script import OP_RETURN
@@ -20,6 +21,9 @@ BYTES_PER_INPUT = 148  # assuming compressed public key
 BYTES_PER_OUTPUT = 34
 FIXED_EXTRA_BYTES = 10
 OP_RETURN_BYTE_COUNT = 43  # our op_return output values always have the same length because they are SHA-256 hashes
+# script signature of a P2PKH input: DER signature of up to 72 bytes with the sighash type, and compressed public key,
+# with their push opcodes
+P2PKH_SCRIPT_SIG_BYTES = 107
 
 
 def create_trx(op_return_val, issuing_transaction_fee, issuing_address, tx_outs, tx_inputs):
@@ -49,6 +53,21 @@ def create_trx(op_return_val, issuing_transaction_fee, issuing_address, tx_outs,
     return transaction
 
 
+def create_cpfp_trx(fee, issuing_address, tx_inputs):
+    """
+    Child transaction spending tx_inputs (the change of an unconfirmed issuing transaction) back to issuing_address,
+    paying fee for both
+    :param fee:
+    :param issuing_address:
+    :param tx_inputs:
+    :return:
+    """
+    tx_ins = [CTxIn(COutPoint(tx_input.tx_hash, tx_input.tx_out_index)) for tx_input in tx_inputs]
+    value_in = sum(tx_input.coin_value for tx_input in tx_inputs)
+    change_out = create_transaction_output(issuing_address, value_in - fee)
+    return CMutableTransaction(tx_ins, [change_out])
+
+
 def calculate_raw_tx_size_with_op_return(num_inputs, num_outputs):
     """
     :param num_inputs:
@@ -97,6 +116,27 @@ def get_byte_count(signed_tx):
     return tx_byte_count
 
 
+def get_vsize(signed_tx):
+    """
+    Virtual size of a pycoin transaction, i.e. its weight (BIP 141) / 4 rounded up; its size without witness data
+    :param signed_tx:
+    :return:
+    """
+    total_size = len(signed_tx.as_bin())
+    base_size = len(signed_tx.as_bin(include_witness_data=False))
+    return (base_size * 3 + total_size + 3) // 4
+
+
+def estimate_signed_vsize(unsigned_tx):
+    """
+    Virtual size of an unsigned transaction once its (P2PKH) inputs are signed. At most one byte over per input,
+    as signatures are 71 or 72 bytes long.
+    :param unsigned_tx: CMutableTransaction, as created by create_trx
+    :return:
+    """
+    return len(unsigned_tx.serialize()) + P2PKH_SCRIPT_SIG_BYTES * len(unsigned_tx.vin)
+
+
 def prepare_tx_for_signing(hex_tx, tx_inputs):
     logging.info('Preparing tx for signing')
     transaction = Tx.from_hex(hex_tx)
@@ -151,3 +191,14 @@ def calculate_tx_fee(tx_cost_constants, num_inputs, num_outputs):
     tx_size = calculate_raw_tx_size_with_op_return(num_inputs, num_outputs)
     tx_fee = tx_cost_constants.satoshi_per_byte * tx_size
     return max(tx_fee, tx_cost_constants.get_recommended_fee_coin())
+
+
+def calculate_fee_for_vsize(tx_cost_constants, vsize):
+    """
+    Same as calculate_tx_fee, for the virtual size of the transaction itself
+    :param tx_cost_constants:
+    :param vsize:
+    :return:
+    """
+    tx_fee = int(math.ceil(tx_cost_constants.satoshi_per_byte * vsize))
+    return max(tx_fee, tx_cost_constants.get_recommended_fee_coin())
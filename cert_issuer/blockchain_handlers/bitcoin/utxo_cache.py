@@ -0,0 +1,76 @@
+"""
+Unspent outputs of the issuing addresses, fetched from the providers once and then kept up to date locally: after a
+broadcast the inputs it spent are removed and its change output is added. Consecutive batches then chain off the
+unconfirmed change of the previous one, without asking the block explorers for the address again.
+
+The providers are asked again only once the cache may be wrong: when a broadcast fails (e.g. an input was spent
+elsewhere), or when the cached balance is too low (the address may have been topped up).
+"""
+import logging
+import threading
+
+
+def get_outpoint(spendable):
+    return spendable.tx_hash, spendable.tx_out_index
+
+
+class UTXOCache(object):
+    def __init__(self, connector):
+        """
+        :param connector: the BitcoinServiceProviderConnector the unspent outputs are fetched with
+        """
+        self.connector = connector
+        # address -> {(tx hash, output index): Spendable}, in the order the connector returned them
+        self.utxos = {}
+        self.lock = threading.Lock()
+
+    def get_spendables(self, address):
+        """
+        :return: the unspent outputs of address, fetched from the providers on the first call
+        """
+        with self.lock:
+            return list(self._get_utxos(address).values())
+
+    def get_balance(self, address):
+        with self.lock:
+            return sum(spendable.coin_value for spendable in self._get_utxos(address).values())
+
+    def spend(self, address, signed_tx):
+        """
+        Applies a transaction broadcast from address: its inputs are spent, and its outputs with a value (the change
+        back to address; the certificates' OP_RETURN output carries none) become spendable
+        """
+        with self.lock:
+            utxos = self.utxos.get(address)
+            if utxos is None:
+                # fetched again on next use, providers will list the change if they have seen the transaction
+                return
+            for tx_in in signed_tx.txs_in:
+                utxos.pop((tx_in.previous_hash, tx_in.previous_index), None)
+            for spendable in signed_tx.tx_outs_as_spendable():
+                if spendable.coin_value > 0:
+                    utxos[get_outpoint(spendable)] = spendable
+            logging.debug('%d unspent outputs left at address %s', len(utxos), address)
+
+    def get_spendable(self, address, outpoint):
+        """
+        :return: the unspent output of address at outpoint (tx hash, output index), or None if it is spent
+        """
+        with self.lock:
+            return self._get_utxos(address).get(outpoint)
+
+    def invalidate(self, address):
+        """
+        Forgets the unspent outputs of address, they are fetched from the providers on next use
+        """
+        with self.lock:
+            self.utxos.pop(address, None)
+
+    def _get_utxos(self, address):
+        utxos = self.utxos.get(address)
+        if utxos is None:
+            logging.info('Fetching the unspent outputs of address %s', address)
+            spendables = self.connector.get_unspent_outputs(address) or []
+            utxos = {get_outpoint(spendable): spendable for spendable in spendables}
+            self.utxos[address] = utxos
+        return utxos
@@ -1,7 +1,6 @@
 import logging
 import time
 
-import requests
 import web3
 from web3 import Web3, HTTPProvider
 
@@ -14,7 +13,10 @@ except ImportError:
 
 from cert_core import Chain
 from cert_issuer.models import ServiceProviderConnector
+from cert_issuer.circuit_breaker import get_circuit_breakers
 from cert_issuer.errors import BroadcastError
+from cert_issuer.http_client import get_http_client
+from cert_issuer.hedged_reads import HedgedReader, DEFAULT_HEDGE_DELAY
 
 BROADCAST_RETRY_INTERVAL = 30
 MAX_BROADCAST_ATTEMPTS = 3
@@ -30,6 +32,7 @@ class EthereumServiceProviderConnector(ServiceProviderConnector):
         self.ethereum_chain = ethereum_chain
 
         self.local_node = local_node
+        self.hedged_reader = HedgedReader(getattr(app_config, 'hedge_delay', None) or DEFAULT_HEDGE_DELAY)
 
         # initialize connectors
         self.connectors = {}
@@ -79,49 +82,32 @@ class EthereumServiceProviderConnector(ServiceProviderConnector):
         return self.connectors[chain]
 
     def get_balance(self, address):
-        for m in self.get_providers_for_chain(self.ethereum_chain, self.local_node):
-            try:
-                logging.debug('m=%s', m)
-                balance = m.get_balance(address)
-                return balance
-            except Exception as e:
-                logging.warning(e)
-                pass
-        return 0
+        balance = self.hedged_reader.read(
+            self.get_providers_for_chain(self.ethereum_chain, self.local_node), 'get_balance', address)
+        return 0 if balance is None else balance
 
     def gas_price(self):
-        for m in self.get_providers_for_chain(self.ethereum_chain, self.local_node):
-            try:
-                logging.info('m=%s', m)
-                gas_price = m.gas_price()
-                return gas_price
-            except Exception as e:
-                logging.info(e)
-                pass
-        return 0
+        gas_price = self.hedged_reader.read(
+            self.get_providers_for_chain(self.ethereum_chain, self.local_node), 'gas_price')
+        return 0 if gas_price is None else gas_price
 
     def get_address_nonce(self, address):
-        for m in self.get_providers_for_chain(self.ethereum_chain, self.local_node):
-            try:
-                logging.debug('m=%s', m)
-                nonce = m.get_address_nonce(address)
-                return nonce
-            except Exception as e:
-                logging.warning(e)
-                pass
-        return 0
+        nonce = self.hedged_reader.read(
+            self.get_providers_for_chain(self.ethereum_chain, self.local_node), 'get_address_nonce', address)
+        return 0 if nonce is None else nonce
 
     def broadcast_tx(self, tx):
 
         last_exception = None
         final_tx_id = None
 
+        breakers = get_circuit_breakers()
         # Broadcast to all available api's
         for attempt_number in range(0, MAX_BROADCAST_ATTEMPTS):
-            for m in self.get_providers_for_chain(self.ethereum_chain, self.local_node):
+            for m in breakers.order(self.get_providers_for_chain(self.ethereum_chain, self.local_node)):
                 try:
                     logging.debug('m=%s', m)
-                    txid = m.broadcast_tx(tx)
+                    txid = breakers.call(m.broadcast_tx, tx)
                     if (txid):
                         logging.info('Broadcasting succeeded with method_provider=%s, txid=%s', str(m), txid)
                         if final_tx_id and final_tx_id != txid:
@@ -187,7 +173,7 @@ class EtherscanBroadcaster(object):
         headers = {
             'User-Agent': 'Python-urllib/3.8'
         }
-        response = requests.request(method, url, data=data, headers=headers)
+        response = get_http_client().request(method, url, data=data, headers=headers)
         return response
 
     def broadcast_tx(self, tx):
@@ -275,7 +261,7 @@ class MyEtherWalletBroadcaster(object):
             "params": ["0x" + tx],
             "id": 1
         }
-        response = requests.post(self.base_url, json=data, headers={'user-agent':'cert-issuer'})
+        response = get_http_client().post(self.base_url, json=data, headers={'user-agent':'cert-issuer'})
         if 'error' in response.json():
             logging.error("MyEtherWallet returned an error: %s", response.json()['error'])
             raise BroadcastError(response.json()['error'])
@@ -297,7 +283,7 @@ class MyEtherWalletBroadcaster(object):
             "params": [address, "latest"],
             "id": 1
         }
-        response = requests.post(self.base_url, json=data, headers={'user-agent':'cert-issuer'})
+        response = get_http_client().post(self.base_url, json=data, headers={'user-agent':'cert-issuer'})
         if int(response.status_code) == 200:
             logging.info('Balance check response: %s', response.json())
             balance = int(response.json().get('result', None), 0)
@@ -318,7 +304,7 @@ class MyEtherWalletBroadcaster(object):
             "params": [address, "pending"],
             "id": 1
         }
-        response = requests.post(self.base_url, json=data, headers={'user-agent':'cert-issuer'})
+        response = get_http_client().post(self.base_url, json=data, headers={'user-agent':'cert-issuer'})
         if int(response.status_code) == 200:
             # the int(res, 0) transforms the hex nonce to int
             nonce = int(response.json().get('result', None), 0)
@@ -0,0 +1,98 @@
+"""
+Local nonce allocation for the issuing address, so that several batches can be in flight at once (many Merkle roots per
+block) rather than each waiting for the node to count the previous one.
+
+The next nonce is seeded from the address' transaction count including pending transactions (or the configured
+nonce), then handed out sequentially. A nonce whose transaction fails before being accepted is released:
+ - if it was the last one handed out, it is simply handed out again;
+ - otherwise it is a gap, which holds up every later transaction of the address: gaps are handed out first.
+
+After a failure or a gap filled, once no other transaction is in flight, the nonces are synced again with the node's
+transaction count. A count past the next nonce means the address was used elsewhere, the next nonce follows it. A count
+below it stops at a nonce the node is missing (it dropped the transaction, or it failed), which is a gap: later
+transactions may be queued behind it, their nonces are not handed out again.
+"""
+import logging
+import threading
+
+
+class NonceManager(object):
+    def __init__(self, connector, address, nonce=None):
+        """
+        :param connector: with a get_address_nonce(address) method returning the pending transaction count
+        :param nonce: first nonce to hand out, instead of the transaction count; 0 or None for the count
+        """
+        self.connector = connector
+        self.address = address
+        self.next_nonce = nonce or None
+        # nonces released below next_nonce, to hand out again
+        self.gaps = set()
+        # nonces handed out whose transactions are being created and broadcast
+        self.in_flight = set()
+        self.needs_sync = False
+        self.lock = threading.Lock()
+
+    def allocate(self):
+        """
+        :return: the nonce of the next transaction; it must be confirmed or released once the transaction is broadcast
+            or has failed
+        """
+        with self.lock:
+            if self.next_nonce is None or (self.needs_sync and not self.in_flight):
+                self.sync()
+            if self.gaps:
+                nonce = min(self.gaps)
+                self.gaps.remove(nonce)
+                logging.info('Filling the gap at nonce %d', nonce)
+                # the node may be missing the next nonce too
+                self.needs_sync = True
+            else:
+                nonce = self.next_nonce
+                self.next_nonce += 1
+            self.in_flight.add(nonce)
+            return nonce
+
+    def confirm(self, nonce):
+        """
+        The transaction with nonce was accepted
+        """
+        with self.lock:
+            self.in_flight.discard(nonce)
+
+    def release(self, nonce):
+        """
+        The transaction with nonce failed before being accepted, nonce is to be used again
+        """
+        with self.lock:
+            self.in_flight.discard(nonce)
+            if nonce == self.next_nonce - 1:
+                self.next_nonce = nonce
+                # gaps just below are now at the end
+                while self.next_nonce - 1 in self.gaps:
+                    self.next_nonce -= 1
+                    self.gaps.remove(self.next_nonce)
+            else:
+                logging.warning('Nonce %d released while later nonces are in use, it is a gap', nonce)
+                self.gaps.add(nonce)
+            self.needs_sync = True
+
+    def sync(self):
+        """
+        Checks the nonces against the node's pending transaction count. Called with the lock held.
+        """
+        pending_nonce = self.connector.get_address_nonce(self.address)
+        self.needs_sync = False
+        if self.next_nonce is None or pending_nonce >= self.next_nonce:
+            if self.next_nonce is not None and pending_nonce > self.next_nonce:
+                logging.warning('Address %s sent transactions up to nonce %d elsewhere', self.address,
+                                pending_nonce - 1)
+            self.next_nonce = pending_nonce
+            self.gaps.clear()
+        else:
+            # nonces below the count are taken, whether by these transactions or by others
+            self.gaps = set(gap for gap in self.gaps if gap >= pending_nonce)
+            if pending_nonce not in self.gaps:
+                logging.warning('The node is missing the transaction of address %s with nonce %d', self.address,
+                                pending_nonce)
+                self.gaps.add(pending_nonce)
+        logging.info('Next nonce of address %s is %d', self.address, min(self.gaps) if self.gaps else self.next_nonce)
@@ -5,6 +5,7 @@ from eth_utils import to_hex, remove_0x_prefix
 
 from cert_issuer.errors import InsufficientFundsError
 from cert_issuer.blockchain_handlers.ethereum import tx_utils
+from cert_issuer.blockchain_handlers.ethereum.nonce_manager import NonceManager
 from cert_issuer.models import TransactionHandler
 from cert_issuer.signer import FinalizableSigner
 
@@ -41,6 +42,8 @@ class EthereumTransactionHandler(TransactionHandler):
         # input transactions are not needed for Ether
         self.prepared_inputs = prepared_inputs
         self.transaction_creator = transaction_creator
+        # nonces are allocated locally, so that batches do not wait for each other's transactions to be counted
+        self.nonce_manager = NonceManager(connector, self.issuing_address, nonce)
 
     def ensure_balance(self):
         # testing etherscan api wrapper
@@ -59,16 +62,23 @@ class EthereumTransactionHandler(TransactionHandler):
 
     def issue_transaction(self, blockchain_bytes):
         eth_data_field = remove_0x_prefix(to_hex(blockchain_bytes))
-        prepared_tx = self.create_transaction(blockchain_bytes)
-        signed_tx = self.sign_transaction(prepared_tx)
-        self.verify_transaction(signed_tx, eth_data_field)
-        txid = self.broadcast_transaction(signed_tx)
+        nonce = self.nonce_manager.allocate()
+        try:
+            prepared_tx = self.create_transaction(blockchain_bytes, nonce)
+            signed_tx = self.sign_transaction(prepared_tx)
+            self.verify_transaction(signed_tx, eth_data_field)
+            txid = self.broadcast_transaction(signed_tx)
+        except Exception:
+            self.nonce_manager.release(nonce)
+            raise
+        self.nonce_manager.confirm(nonce)
         return txid
 
-    def create_transaction(self, blockchain_bytes):
+    def create_transaction(self, blockchain_bytes, nonce=None):
         if self.balance:
             # it is assumed here that the address has sufficient funds, as the ensure_balance has just been checked
-            nonce = self.nonce or self.connector.get_address_nonce(self.issuing_address)
+            if nonce is None:
+                nonce = self.nonce or self.connector.get_address_nonce(self.issuing_address)
             logging.info("NONCE IS %d", nonce)
             # Transactions in the first iteration will be send to burn address
             toaddress = Web3.to_checksum_address('0xdeaddeaddeaddeaddeaddeaddeaddeaddeaddead')
@@ -3,7 +3,7 @@ import os
 
 from cert_core import UnknownChainError
 
-from cert_issuer.certificate_handlers import CertificateBatchHandler, CertificateV3Handler, CertificateBatchWebHandler, CertificateWebV3Handler
+from cert_issuer.certificate_handlers import CertificateBatchHandler, CertificateV3Handler, CertificateBatchWebHandler, CertificateWebV3Handler, CertificateBatchJSONLHandler
 from cert_issuer.blockchain_handlers.layer2.connectors import Layer2ServiceProviderConnector
 from cert_issuer.blockchain_handlers.layer2.signer import Layer2Signer
 from cert_issuer.blockchain_handlers.layer2.transaction_handlers import Layer2TransactionHandler
@@ -49,12 +49,20 @@ def instantiate_blockchain_handlers(app_config, file_mode=True):
     chain = app_config.chain
     secret_manager = initialize_signer(app_config)
 
-    certificate_batch_handler = (CertificateBatchHandler if file_mode else CertificateBatchWebHandler)(
-        secret_manager=secret_manager,
-        certificate_handler=(CertificateV3Handler if file_mode else CertificateWebV3Handler)(app_config),
-        merkle_tree=MerkleTreeGenerator(),
-        config=app_config
-    )
+    if file_mode and getattr(app_config, 'unsigned_certificates_file', None):
+        certificate_batch_handler = CertificateBatchJSONLHandler(
+            secret_manager=secret_manager,
+            certificate_handler=CertificateWebV3Handler(app_config),
+            merkle_tree=MerkleTreeGenerator(),
+            config=app_config
+        )
+    else:
+        certificate_batch_handler = (CertificateBatchHandler if file_mode else CertificateBatchWebHandler)(
+            secret_manager=secret_manager,
+            certificate_handler=(CertificateV3Handler if file_mode else CertificateWebV3Handler)(app_config),
+            merkle_tree=MerkleTreeGenerator(),
+            config=app_config
+        )
 
     if chain.is_mock_type():
         transaction_handler = MockTransactionHandler()
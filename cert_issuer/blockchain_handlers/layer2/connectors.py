@@ -1,7 +1,6 @@
 import logging
 import time
 
-import requests
 import web3
 from web3 import Web3, HTTPProvider
 
@@ -14,7 +13,10 @@ except ImportError:
 
 from cert_core import Chain
 from cert_issuer.models import ServiceProviderConnector
+from cert_issuer.circuit_breaker import get_circuit_breakers
 from cert_issuer.errors import BroadcastError
+from cert_issuer.http_client import get_http_client
+from cert_issuer.hedged_reads import HedgedReader, DEFAULT_HEDGE_DELAY
 
 BROADCAST_RETRY_INTERVAL = 30
 MAX_BROADCAST_ATTEMPTS = 3
@@ -28,6 +30,7 @@ class Layer2ServiceProviderConnector(ServiceProviderConnector):
             local_node=False):
         self.layer2_chain = layer2_chain
         self.local_node = local_node
+        self.hedged_reader = HedgedReader(getattr(app_config, 'hedge_delay', None) or DEFAULT_HEDGE_DELAY)
         self.connectors = {}
 
         # Configure Polygon connectors
@@ -82,42 +85,26 @@ class Layer2ServiceProviderConnector(ServiceProviderConnector):
         return self.connectors[chain]
 
     def get_balance(self, address):
-        for m in self.get_providers_for_chain(self.layer2_chain, self.local_node):
-            try:
-                logging.debug('m=%s', m)
-                balance = m.get_balance(address)
-                return balance
-            except Exception as e:
-                logging.warning(e)
-                pass
-        return 0
+        balance = self.hedged_reader.read(
+            self.get_providers_for_chain(self.layer2_chain, self.local_node), 'get_balance', address)
+        return 0 if balance is None else balance
 
     def gas_price(self):
-        for m in self.get_providers_for_chain(self.layer2_chain, self.local_node):
-            try:
-                logging.info('m=%s', m)
-                gas_price = m.gas_price()
-                return gas_price
-            except Exception as e:
-                logging.info(e)
-                pass
-        return 0
+        gas_price = self.hedged_reader.read(
+            self.get_providers_for_chain(self.layer2_chain, self.local_node), 'gas_price')
+        return 0 if gas_price is None else gas_price
 
     def get_address_nonce(self, address):
-        for m in self.get_providers_for_chain(self.layer2_chain, self.local_node):
-            try:
-                nonce = m.get_address_nonce(address)
-                return nonce
-            except Exception as e:
-                logging.warning(e)
-                pass
-        return 0
+        nonce = self.hedged_reader.read(
+            self.get_providers_for_chain(self.layer2_chain, self.local_node), 'get_address_nonce', address)
+        return 0 if nonce is None else nonce
 
     def broadcast_tx(self, tx):
+        breakers = get_circuit_breakers()
         for attempt in range(MAX_BROADCAST_ATTEMPTS):
-            for m in self.get_providers_for_chain(self.layer2_chain, self.local_node):
+            for m in breakers.order(self.get_providers_for_chain(self.layer2_chain, self.local_node)):
                 try:
-                    txid = m.broadcast_tx(tx)
+                    txid = breakers.call(m.broadcast_tx, tx)
                     logging.info('Broadcast transaction with txid %s', txid)
                     return txid
                 except Exception as e:
@@ -157,9 +144,9 @@ class PolygonscanBroadcaster(object):
 
     def send_request(self, method, url, data=None):
         if method == 'GET':
-            response = requests.get(url, params=data)
+            response = get_http_client().get(url, params=data)
         else:
-            response = requests.post(url, data=data)
+            response = get_http_client().post(url, data=data)
         return response.json()
 
     def broadcast_tx(self, tx):
@@ -223,9 +210,9 @@ class ArbiscanBroadcaster(object):
 
     def send_request(self, method, url, data=None):
         if method == 'GET':
-            response = requests.get(url, params=data)
+            response = get_http_client().get(url, params=data)
         else:
-            response = requests.post(url, data=data)
+            response = get_http_client().post(url, data=data)
         return response.json()
 
     def broadcast_tx(self, tx):
@@ -289,9 +276,9 @@ class OptimisticEtherscanBroadcaster(object):
 
     def send_request(self, method, url, data=None):
         if method == 'GET':
-            response = requests.get(url, params=data)
+            response = get_http_client().get(url, params=data)
         else:
-            response = requests.post(url, data=data)
+            response = get_http_client().post(url, data=data)
         return response.json()
 
     def broadcast_tx(self, tx):
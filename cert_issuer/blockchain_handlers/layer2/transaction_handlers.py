@@ -4,6 +4,7 @@ import web3
 from eth_utils import remove_0x_prefix, to_hex
 from web3 import Web3
 
+from cert_issuer.blockchain_handlers.ethereum.nonce_manager import NonceManager
 from cert_issuer.blockchain_handlers.ethereum.transaction_handlers import EthereumTransactionCreator
 from cert_issuer.errors import InsufficientFundsError
 from cert_issuer.models import TransactionHandler
@@ -14,7 +15,7 @@ class Layer2TransactionCreator(EthereumTransactionCreator):
         total = tx_cost_constants.get_recommended_max_cost()
         return total
 
-    def create_transaction(self, tx_cost_constants, issuing_address, inputs, op_return_value):
+    def create_transaction(self, tx_cost_constants, issuing_address, inputs, op_return_value, nonce=0):
         # Layer2 transactions are similar to Ethereum but with different gas costs
         transaction = {
             'to': issuing_address,
@@ -22,7 +23,7 @@ class Layer2TransactionCreator(EthereumTransactionCreator):
             'data': op_return_value,
             'gas': tx_cost_constants.get_gas_limit(),
             'gasPrice': tx_cost_constants.get_gas_price(),
-            'nonce': 0  # This will be set by the transaction handler
+            'nonce': nonce
         }
         
         if tx_cost_constants.get_max_priority_fee_per_gas():
@@ -45,6 +46,8 @@ class Layer2TransactionHandler(TransactionHandler):
         # input transactions are not needed for Layer2
         self.prepared_inputs = prepared_inputs
         self.transaction_creator = transaction_creator
+        # nonces are allocated locally, so that batches do not wait for each other's transactions to be counted
+        self.nonce_manager = NonceManager(connector, self.issuing_address, nonce)
 
     def ensure_balance(self):
         # testing layer2 api wrapper
@@ -63,21 +66,28 @@ class Layer2TransactionHandler(TransactionHandler):
 
     def issue_transaction(self, blockchain_bytes):
         layer2_data_field = remove_0x_prefix(to_hex(blockchain_bytes))
-        prepared_tx = self.create_transaction(blockchain_bytes)
-        signed_tx = self.sign_transaction(prepared_tx)
-        self.verify_transaction(signed_tx, layer2_data_field)
-        txid = self.broadcast_transaction(signed_tx)
+        nonce = self.nonce_manager.allocate()
+        try:
+            prepared_tx = self.create_transaction(blockchain_bytes, nonce)
+            signed_tx = self.sign_transaction(prepared_tx)
+            self.verify_transaction(signed_tx, layer2_data_field)
+            txid = self.broadcast_transaction(signed_tx)
+        except Exception:
+            self.nonce_manager.release(nonce)
+            raise
+        self.nonce_manager.confirm(nonce)
         return txid
 
-    def create_transaction(self, op_return_bytes):
-        # Get current nonce from the blockchain
-        current_nonce = self.connector.get_address_nonce(self.issuing_address)
-        if self.nonce > 0:
-            current_nonce = self.nonce
+    def create_transaction(self, op_return_bytes, nonce=None):
+        if nonce is None:
+            # Get current nonce from the blockchain
+            nonce = self.connector.get_address_nonce(self.issuing_address)
+            if self.nonce > 0:
+                nonce = self.nonce
 
         eth_data_field = remove_0x_prefix(to_hex(op_return_bytes))
-        transaction = self.transaction_creator.create_transaction(self.tx_cost_constants, self.issuing_address, [], eth_data_field)
-        transaction['nonce'] = current_nonce
+        transaction = self.transaction_creator.create_transaction(self.tx_cost_constants, self.issuing_address, [],
+                                                                  eth_data_field, nonce)
         transaction['from'] = self.issuing_address
 
         logging.info('Unsigned transaction: %s', transaction)
@@ -0,0 +1,72 @@
+import logging
+import os
+import pickle
+
+DEFAULT_MAX_IN_MEMORY = 10000
+SPILL_EXT = '.pickle'
+
+
+class ParsedCertificateCache(object):
+    """
+    Holds the parsed json of each certificate in a batch, so that validation, normalization and proof insertion
+    share a single read and json decode of the unsigned certificate.
+
+    Memory is bounded by max_in_memory. Past that limit, records are pickled to spill_dir (cheaper to reload than
+    re-decoding the json); without a spill_dir they are simply re-read by the loader when needed.
+
+    Batches are always walked in the same order, so records are never evicted: the first max_in_memory certificates
+    stay in memory and the remainder go to disk.
+    """
+
+    def __init__(self, loader, max_in_memory=DEFAULT_MAX_IN_MEMORY, spill_dir=None):
+        self.loader = loader
+        self.max_in_memory = max_in_memory
+        self.spill_dir = spill_dir
+        self.records = {}
+        self.spilled = set()
+        self.loads = 0
+
+    def get(self, certificate_metadata):
+        uid = certificate_metadata.uid
+        if uid in self.records:
+            return self.records[uid]
+        if uid in self.spilled:
+            with open(self._spill_file_name(uid), 'rb') as spill_file:
+                return pickle.load(spill_file)
+
+        record = self.loader(certificate_metadata)
+        self.loads += 1
+        self._put(uid, record)
+        return record
+
+    def discard(self, certificate_metadata):
+        """
+        Drop the record once its last consumer is done with it (e.g. after the proof was added)
+        """
+        uid = certificate_metadata.uid
+        self.records.pop(uid, None)
+        if uid in self.spilled:
+            self.spilled.discard(uid)
+            os.remove(self._spill_file_name(uid))
+
+    def clear(self):
+        for uid in list(self.spilled):
+            os.remove(self._spill_file_name(uid))
+        self.records = {}
+        self.spilled = set()
+        self.loads = 0
+
+    def _put(self, uid, record):
+        if len(self.records) < self.max_in_memory:
+            self.records[uid] = record
+        elif self.spill_dir:
+            if not self.spilled:
+                logging.info('More than %d certificates in batch, spilling parsed certificates to %s',
+                             self.max_in_memory, self.spill_dir)
+                os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_file_name(uid), 'wb') as spill_file:
+                pickle.dump(record, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.spilled.add(uid)
+
+    def _spill_file_name(self, uid):
+        return os.path.join(self.spill_dir, uid + SPILL_EXT)
@@ -1,7 +1,11 @@
+import copy
 import json
 import logging
+import os
 
-from cert_issuer import helpers
+from cert_issuer import helpers, jsonl
+from cert_issuer.errors import NoCertificatesFoundError
+from cert_issuer.certificate_cache import ParsedCertificateCache, DEFAULT_MAX_IN_MEMORY
 from cert_issuer.proof_handler import ProofHandler
 from pycoin.encoding.hexbytes import b2h
 from cert_issuer.normalization_handler import JSONLDHandler
@@ -13,11 +17,37 @@ from cert_issuer.signer import FinalizableSigner
 class CertificateV3Handler(CertificateHandler):
     def __init__(self, app_config):
         self.app_config = app_config
+        self.parsed_certificates = self._create_parsed_certificate_cache()
+        self.normalize_workers = getattr(app_config, 'normalize_workers', None) or 1
+
+    def for_sub_batch(self):
+        # the cache is not thread safe, each sub-batch has its own
+        handler = copy.copy(self)
+        handler.parsed_certificates = self._create_parsed_certificate_cache()
+        return handler
+
+    def _create_parsed_certificate_cache(self):
+        spill_dir = None
+        if getattr(self.app_config, 'work_dir', None):
+            # spilled records are named after the certificate uid, sub-batches can share the directory
+            spill_dir = os.path.join(self.app_config.work_dir, helpers.PARSED_CERTIFICATES_DIR)
+        return ParsedCertificateCache(
+            self._read_certificate_to_issue,
+            max_in_memory=getattr(self.app_config, 'certificate_cache_size', None) or DEFAULT_MAX_IN_MEMORY,
+            spill_dir=spill_dir)
 
     def get_byte_array_to_issue(self, certificate_metadata):
         certificate_json = self._get_certificate_to_issue(certificate_metadata)
         return JSONLDHandler.normalize_to_utf8(certificate_json)
 
+    def get_byte_arrays_to_issue(self, certificates_metadata):
+        certificates_json = (self._get_certificate_to_issue(metadata) for metadata in certificates_metadata)
+        return JSONLDHandler.normalize_batch_to_utf8(
+            certificates_json,
+            self.normalize_workers,
+            context_urls=getattr(self.app_config, 'context_urls', None),
+            context_file_paths=getattr(self.app_config, 'context_file_paths', None))
+
     def add_proof(self, certificate_metadata, merkle_proof_value):
         """
         :param certificate_metadata:
@@ -25,12 +55,20 @@ class CertificateV3Handler(CertificateHandler):
         :return:
         """
         certificate_json = self._get_certificate_to_issue(certificate_metadata)
+        # the proof is added in place, so this is the last use of the parsed certificate
+        self.parsed_certificates.discard(certificate_metadata)
         certificate_json = ProofHandler().add_merkle_proof_2019(certificate_json, merkle_proof_value, self.app_config)
 
-        with open(certificate_metadata.blockchain_cert_file_name, 'w') as out_file:
-            out_file.write(json.dumps(certificate_json))
+        # written straight to the output dir, a certificate is only visible there once complete
+        helpers.write_file_atomically(certificate_metadata.final_blockchain_cert_file_name, json.dumps(certificate_json))
+
+    def clear_parsed_certificates(self):
+        self.parsed_certificates.clear()
 
     def _get_certificate_to_issue(self, certificate_metadata):
+        return self.parsed_certificates.get(certificate_metadata)
+
+    def _read_certificate_to_issue(self, certificate_metadata):
         with open(certificate_metadata.unsigned_cert_file_name, 'r') as unsigned_cert_file:
             certificate_json = json.load(unsigned_cert_file)
         return certificate_json
@@ -38,10 +76,18 @@ class CertificateV3Handler(CertificateHandler):
 class CertificateWebV3Handler(CertificateHandler):
     def __init__(self, app_config):
         self.app_config = app_config
+        self.normalize_workers = getattr(app_config, 'normalize_workers', None) or 1
 
     def get_byte_array_to_issue(self, certificate_json):
         return JSONLDHandler.normalize_to_utf8(certificate_json)
 
+    def get_byte_arrays_to_issue(self, certificates_json):
+        return JSONLDHandler.normalize_batch_to_utf8(
+            certificates_json,
+            self.normalize_workers,
+            context_urls=getattr(self.app_config, 'context_urls', None),
+            context_file_paths=getattr(self.app_config, 'context_file_paths', None))
+
     def add_proof(self, certificate_json, merkle_proof_value):
         certificate_json = ProofHandler().add_merkle_proof_2019(certificate_json, merkle_proof_value, self.app_config)
         return certificate_json
@@ -59,10 +105,7 @@ class CertificateBatchWebHandler(BatchHandler):
         Returns a generator (1-time iterator) of certificates in the batch
         :return:
         """
-
-        for cert in self.certificates_to_issue:
-            data_to_issue = self.certificate_handler.get_byte_array_to_issue(cert)
-            yield data_to_issue
+        return self.certificate_handler.get_byte_arrays_to_issue(self.certificates_to_issue)
 
     def prepare_batch(self):
         """
@@ -74,8 +117,9 @@ class CertificateBatchWebHandler(BatchHandler):
             self.certificate_handler.validate_certificate(cert)
 
         self.merkle_tree.populate(self.get_certificate_generator())
-        logging.info('here is the op_return_code data: %s', b2h(self.merkle_tree.get_blockchain_data()))
-        return self.merkle_tree.get_blockchain_data()
+        blockchain_data = self.merkle_tree.get_blockchain_data()
+        logging.info('here is the op_return_code data: %s', b2h(blockchain_data))
+        return blockchain_data
 
 
 class CertificateBatchHandler(BatchHandler):
@@ -85,10 +129,19 @@ class CertificateBatchHandler(BatchHandler):
     In this case, certificates are initialized as an Ordered Dictionary, and we iterate in insertion order.
     """
     def pre_batch_actions(self, config):
+        self.certificate_handler.clear_parsed_certificates()
+        self.issued_tx_ids = None
         self._process_directories(config)
 
     def post_batch_actions(self, config):
-        helpers.copy_output(self.certificates_to_issue)
+        if self.is_sub_batch:
+            # the batch is anchored and its certificates are in the output dir, a rerun can skip them
+            helpers.append_batch_checkpoint(config.work_dir, self.merkle_tree.tx_id, self.certificates_to_issue.keys())
+        else:
+            self.complete_batches(config)
+
+    def complete_batches(self, config):
+        helpers.remove_batch_checkpoint(config.work_dir)
         logging.info('Your Blockchain Certificates are in %s', config.blockchain_certificates_dir)
 
     def prepare_batch(self):
@@ -108,17 +161,16 @@ class CertificateBatchHandler(BatchHandler):
                 self.certificate_handler.sign_certificate(signer, metadata)
 
         self.merkle_tree.populate(self.get_certificate_generator())
-        logging.info('here is the op_return_code data: %s', b2h(self.merkle_tree.get_blockchain_data()))
-        return self.merkle_tree.get_blockchain_data()
+        blockchain_data = self.merkle_tree.get_blockchain_data()
+        logging.info('here is the op_return_code data: %s', b2h(blockchain_data))
+        return blockchain_data
 
     def get_certificate_generator(self):
         """
         Returns a generator (1-time iterator) of certificates in the batch
         :return:
         """
-        for uid, metadata in self.certificates_to_issue.items():
-            data_to_issue = self.certificate_handler.get_byte_array_to_issue(metadata)
-            yield data_to_issue
+        return self.certificate_handler.get_byte_arrays_to_issue(self.certificates_to_issue.values())
 
     def finish_batch(self, tx_id, chain):
         proof_generator = self.merkle_tree.get_proof_generator(tx_id, chain)
@@ -136,13 +188,105 @@ class CertificateBatchHandler(BatchHandler):
                 unsigned_certs_dir,
                 signed_certs_dir,
                 blockchain_certificates_dir,
-                work_dir)
+                work_dir,
+                staging=getattr(config, 'work_dir_staging', None) or helpers.STAGING_LINK)
+
+        issued = helpers.read_batch_checkpoint(work_dir)
+        if issued:
+            for uid in list(certificates_metadata):
+                if uid in issued and os.path.exists(certificates_metadata[uid].final_blockchain_cert_file_name):
+                    del certificates_metadata[uid]
+            logging.info('Resuming from batch checkpoint, skipping certificates already issued')
 
         num_certificates = len(certificates_metadata)
 
         if num_certificates < 1:
+            if issued:
+                # stopped after the last batch was checkpointed, before the checkpoint was removed
+                logging.info('Every certificate was issued by the batches in the checkpoint')
+                self.issued_tx_ids = list(dict.fromkeys(issued.values()))
+                self.complete_batches(config)
             return None
 
         logging.info('Processing %d certificates under work path=%s', num_certificates, work_dir)
         self.set_certificates_in_batch(certificates_metadata)
 
+
+class CertificateBatchJSONLHandler(BatchHandler):
+    """
+    Issues the certificates of a JSONL file, one certificate per line, and writes the blockchain certificates to a
+    JSONL file in the same order. Either file may be gzip or zstd compressed.
+
+    The input is streamed once to build the Merkle tree and once more to add the proofs, so no certificates are held
+    in memory. certificates_to_issue is the range of line numbers in the batch.
+
+    Unlike the directory handler, sub-batches are not checkpointed: if issuing fails, the partial output is discarded
+    and a rerun issues every certificate of the file again.
+    """
+    def pre_batch_actions(self, config):
+        self.unsigned_certificates_file = config.unsigned_certificates_file
+        blockchain_certificates_file = getattr(config, 'blockchain_certificates_file', None) or os.path.join(
+            config.blockchain_certificates_dir, os.path.basename(self.unsigned_certificates_file))
+        os.makedirs(os.path.dirname(os.path.abspath(blockchain_certificates_file)), exist_ok=True)
+
+        num_certificates = jsonl.count_documents(self.unsigned_certificates_file)
+        if num_certificates < 1:
+            logging.warning('No certificates to process')
+            raise NoCertificatesFoundError('No certificates to process')
+
+        logging.info('Processing %d certificates from %s', num_certificates, self.unsigned_certificates_file)
+        self.writer = jsonl.JSONLWriter(blockchain_certificates_file)
+        # shared by the sub-batches: they are prepared in order in one thread, and finished in order in another
+        self.certificate_reader = jsonl.JSONLReader(self.unsigned_certificates_file)
+        self.proof_reader = jsonl.JSONLReader(self.unsigned_certificates_file)
+        self.set_certificates_in_batch(range(num_certificates))
+
+    def post_batch_actions(self, config):
+        if not self.is_sub_batch:
+            self.complete_batches(config)
+
+    def complete_batches(self, config):
+        self.certificate_reader.close()
+        self.proof_reader.close()
+        self.writer.commit()
+        logging.info('Your Blockchain Certificates are in %s', self.writer.file_name)
+
+    def abort_batches(self, config):
+        self.certificate_reader.close()
+        self.proof_reader.close()
+        self.writer.abort()
+
+    def split_certificates(self, batch_size):
+        for start in range(0, len(self.certificates_to_issue), batch_size):
+            yield self.certificates_to_issue[start:start + batch_size]
+
+    def prepare_batch(self):
+        """
+        Propagates exception on failure
+        :return: byte array to put on the blockchain
+        """
+        self.merkle_tree.populate(self.get_certificate_generator())
+        blockchain_data = self.merkle_tree.get_blockchain_data()
+        logging.info('here is the op_return_code data: %s', b2h(blockchain_data))
+        return blockchain_data
+
+    def get_certificate_generator(self):
+        """
+        Returns a generator (1-time iterator) of certificates in the batch, validated as they are read
+        :return:
+        """
+        return self.certificate_handler.get_byte_arrays_to_issue(self._get_validated_certificates())
+
+    def finish_batch(self, tx_id, chain):
+        proof_generator = self.merkle_tree.get_proof_generator(tx_id, chain)
+        for certificate_json in self._read_certificates(self.proof_reader):
+            proof_value = next(proof_generator)
+            self.writer.write(self.certificate_handler.add_proof(certificate_json, proof_value))
+
+    def _get_validated_certificates(self):
+        for certificate_json in self._read_certificates(self.certificate_reader):
+            self.certificate_handler.validate_certificate(certificate_json)
+            yield certificate_json
+
+    def _read_certificates(self, reader):
+        return reader.read(self.certificates_to_issue.start, self.certificates_to_issue.stop)
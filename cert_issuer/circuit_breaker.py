@@ -0,0 +1,168 @@
+"""
+Circuit breakers for the blockchain service providers, shared by the Bitcoin, Ethereum and Layer2 connectors.
+
+Each provider has a breaker tracking its error rate and latency. After failure_threshold failures in a row the
+circuit opens and the provider is skipped; once reset_timeout seconds have passed it is half-open, and the next call
+is a probe: a success closes the circuit, a failure opens it again. Providers that can be called are tried in order of
+health score.
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+from cert_issuer import config
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 60
+# weight of the latest call in the error rate and latency moving averages
+SMOOTHING = 0.2
+
+circuit_breakers = None
+
+
+def get_circuit_breakers():
+    global circuit_breakers
+    if circuit_breakers is None:
+        app_config = config.CONFIG
+        circuit_breakers = CircuitBreakers(
+            failure_threshold=getattr(app_config, 'circuit_failure_threshold', None) or DEFAULT_FAILURE_THRESHOLD,
+            reset_timeout=getattr(app_config, 'circuit_reset_timeout', None) or DEFAULT_RESET_TIMEOUT)
+    return circuit_breakers
+
+
+def provider_name(provider):
+    """
+    Class name and host (or network) of the provider. Not the full URL, which can hold an API token.
+    """
+    url = (getattr(provider, 'base_url', None) or getattr(provider, 'api_domain', None) or
+           getattr(provider, 'ethereum_url', None))
+    location = urlsplit(url).netloc if url else getattr(provider, 'network_path', None)
+    if location:
+        return '{} {}'.format(type(provider).__name__, location)
+    return type(provider).__name__
+
+
+class CircuitBreaker(object):
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.opened_at = None
+        self.consecutive_failures = 0
+        self.error_rate = 0.0
+        self.latency = None
+        self.lock = threading.Lock()
+
+    def is_available(self):
+        """
+        True if the provider can be called: the circuit is closed, or open for longer than reset_timeout (half-open)
+        """
+        with self.lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                logging.info('Circuit of provider %s is half-open, probing it', self.name)
+                self.state = HALF_OPEN
+            return self.state != OPEN
+
+    def record_success(self, latency):
+        with self.lock:
+            if self.state != CLOSED:
+                logging.info('Provider %s answered, closing its circuit', self.name)
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.error_rate *= 1 - SMOOTHING
+            self.latency = latency if self.latency is None else self.latency + SMOOTHING * (latency - self.latency)
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            self.error_rate += SMOOTHING * (1 - self.error_rate)
+            if self.state == HALF_OPEN or (self.state == CLOSED and
+                                           self.consecutive_failures >= self.failure_threshold):
+                logging.warning('Provider %s failed %d times in a row, opening its circuit for %d seconds', self.name,
+                                self.consecutive_failures, self.reset_timeout)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def health_score(self):
+        """
+        Between 0 and 1, higher is healthier: the success rate, lowered by latency. Unmeasured providers score 1.
+        """
+        with self.lock:
+            latency = self.latency or 0
+            return (1 - self.error_rate) / (1 + latency)
+
+    def to_dict(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'error_rate': self.error_rate,
+            'latency': self.latency,
+            'health_score': self.health_score()
+        }
+
+
+class CircuitBreakers(object):
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get_breaker(self, provider):
+        """
+        :param provider: a provider, or a method of a provider, which shares the breaker of the provider
+        """
+        provider = getattr(provider, '__self__', provider)
+        with self.lock:
+            if provider not in self.breakers:
+                self.breakers[provider] = CircuitBreaker(provider_name(provider), self.failure_threshold,
+                                                         self.reset_timeout)
+            return self.breakers[provider]
+
+    def order(self, providers):
+        """
+        Returns the providers (or provider methods) that can be called, healthiest first, keeping the configured order between equally
+        healthy ones. If every circuit is open, all providers are returned, healthiest first, rather than none.
+        """
+        providers = list(providers)
+        available = [provider for provider in providers if self.get_breaker(provider).is_available()]
+        if not available:
+            logging.warning('The circuits of all providers are open, trying them anyway')
+            available = providers
+        return sorted(available, key=lambda provider: -self.get_breaker(provider).health_score())
+
+    def call(self, method, *args):
+        """
+        Calls the provider method with args and records the outcome on the provider breaker
+        """
+        breaker = self.get_breaker(method)
+        start = time.monotonic()
+        try:
+            result = method(*args)
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success(time.monotonic() - start)
+        return result
+
+    def get_metrics(self):
+        """
+        :return: dict of provider name to circuit state, consecutive failures, error rate, latency moving average in
+            seconds and health score
+        """
+        with self.lock:
+            breakers = list(self.breakers.values())
+        metrics = {}
+        for breaker in breakers:
+            name = breaker.name
+            # e.g. the same API on main net and testnet
+            while name in metrics:
+                name += "'"
+            metrics[name] = breaker.to_dict()
+        return metrics
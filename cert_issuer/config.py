@@ -1,7 +1,6 @@
 import logging
 import os
 
-import bitcoin
 import configargparse
 from cert_core import BlockchainType, Chain, chain_to_bitcoin_network, UnknownChainError
 
@@ -45,9 +44,52 @@ def add_arguments(p):
                    help='Default path to data directory storing signed certs', env_var='SIGNED_CERTIFICATES_DIR')
     p.add_argument('--blockchain_certificates_dir', default=os.path.join(DATA_PATH, 'blockchain_certificates'),
                    help='Default path to data directory storing blockchain certs', env_var='BLOCKCHAIN_CERTIFICATES_DIR')
+    p.add_argument('--unsigned_certificates_file', default=None,
+                   help='JSONL file of unsigned certificates, one per line, optionally gzip (.gz) or zstd (.zst) '
+                        'compressed. When set, it is issued instead of unsigned_certificates_dir.',
+                   env_var='UNSIGNED_CERTIFICATES_FILE')
+    p.add_argument('--blockchain_certificates_file', default=None,
+                   help='JSONL file the blockchain certificates are written to when issuing unsigned_certificates_file. '
+                        'Defaults to a file of the same name in blockchain_certificates_dir.',
+                   env_var='BLOCKCHAIN_CERTIFICATES_FILE')
     p.add_argument('--work_dir', default=WORK_PATH,
                    help='Default path to work directory, storing intermediate outputs. This gets deleted in between runs.', env_var='WORK_DIR')
+    p.add_argument('--work_dir_staging', default='link', choices=['link', 'copy'],
+                   help='How unsigned certificates are staged into the work directory. "link" hardlinks them (or '
+                        'reflinks them, where the filesystem supports it) and falls back to copying; "copy" always '
+                        'copies.', env_var='WORK_DIR_STAGING')
+    p.add_argument('--certificate_cache_size', default=10000, type=int,
+                   help='Maximum number of parsed certificates kept in memory during a batch. Past that, parsed '
+                        'certificates are spilled to the work directory.', env_var='CERTIFICATE_CACHE_SIZE')
+    p.add_argument('--normalize_workers', default=1, type=int,
+                   help='Number of processes used to normalize (JSON-LD canonicalize) certificates before hashing. '
+                        'Default is 1, normalizing in the issuing process.', env_var='NORMALIZE_WORKERS')
+    p.add_argument('--serve_batch_size', default=100, type=int,
+                   help='cert-issuer serve: number of certificates in the inbox (unsigned_certificates_dir) that '
+                        'triggers issuing them', env_var='SERVE_BATCH_SIZE')
+    p.add_argument('--serve_max_age', default=60, type=float,
+                   help='cert-issuer serve: seconds after which a certificate in the inbox is issued, even if fewer '
+                        'than serve_batch_size are waiting', env_var='SERVE_MAX_AGE')
+    p.add_argument('--serve_poll_interval', default=1, type=float,
+                   help='cert-issuer serve: seconds between checks of the inbox', env_var='SERVE_POLL_INTERVAL')
+    p.add_argument('--web_batch_window', default=0.5, type=float,
+                   help='ASGI server (cert_issuer.asgi): seconds during which concurrent requests are coalesced into '
+                        'one batch and transaction', env_var='WEB_BATCH_WINDOW')
+    p.add_argument('--web_max_batch_size', default=1000, type=int,
+                   help='ASGI server (cert_issuer.asgi): number of certificates that triggers issuing a batch before '
+                        'the window is over', env_var='WEB_MAX_BATCH_SIZE')
     p.add_argument('--max_retry', default=10, type=int, help='Maximum attempts to retry transaction on failure', env_var='MAX_RETRY')
+    p.add_argument('--http_connect_timeout', default=5, type=float,
+                   help='Seconds to wait for a connection to a blockchain API provider', env_var='HTTP_CONNECT_TIMEOUT')
+    p.add_argument('--http_read_timeout', default=30, type=float,
+                   help='Seconds to wait for a blockchain API provider to send data', env_var='HTTP_READ_TIMEOUT')
+    p.add_argument('--http_pool_size', default=10, type=int,
+                   help='Number of connections kept open to each blockchain API provider', env_var='HTTP_POOL_SIZE')
+    p.add_argument('--circuit_failure_threshold', default=3, type=int,
+                   help='Failures in a row after which a blockchain API provider is skipped', env_var='CIRCUIT_FAILURE_THRESHOLD')
+    p.add_argument('--circuit_reset_timeout', default=60, type=float,
+                   help='Seconds a failing blockchain API provider is skipped before it is tried again',
+                   env_var='CIRCUIT_RESET_TIMEOUT')
     p.add_argument('--chain', default='bitcoin_regtest',
                    help=('Which chain to use. Default is bitcoin_regtest (which is how the docker container is configured). Other options are '
                          'bitcoin_testnet bitcoin_mainnet, mockchain, ethereum_mainnet, ethereum_ropsten, ethereum_goerli, ethereum_sepolia, '
@@ -62,17 +104,55 @@ def add_arguments(p):
                    help='blockchain dust threshold (in BTC) -- below this 1/3 is fees.', env_var='DUST_THRESHOLD')
     p.add_argument('--tx_fee', default=0.0006, type=float,
                    help='recommended tx fee (in BTC) for inclusion in next block. http://bitcoinexchangerate.org/fees', env_var='TX_FEE')
-    p.add_argument('--batch_size', default=10, type=int,
-                   help='Certificate batch size', env_var='BATCH_SIZE')
+    p.add_argument('--batch_size', default=None, type=int,
+                   help='Maximum number of certificates anchored in one transaction. By default all certificates are '
+                        'issued in a single transaction.', env_var='BATCH_SIZE')
     p.add_argument('--satoshi_per_byte', default=250,
                    type=int, help='Satoshi per byte', env_var='SATOSHI_PER_BYTE')
+    p.add_argument('--satoshi_per_byte_dynamic', dest='satoshi_per_byte_dynamic', default=False, action='store_true',
+                   help='Estimate the fee rate from bitcoind or the block explorers, instead of using satoshi_per_byte '
+                        'and tx_fee. satoshi_per_byte is used when no estimate can be had.',
+                   env_var='SATOSHI_PER_BYTE_DYNAMIC')
+    p.add_argument('--fee_target_blocks', default=6, type=int,
+                   help='With satoshi_per_byte_dynamic, number of blocks the issuing transaction should be confirmed '
+                        'within.', env_var='FEE_TARGET_BLOCKS')
+    p.add_argument('--fee_estimate_ttl', default=300, type=float,
+                   help='With satoshi_per_byte_dynamic, seconds a fee rate estimate is used for.',
+                   env_var='FEE_ESTIMATE_TTL')
+    p.add_argument('--max_satoshi_per_byte', default=None, type=float,
+                   help='With satoshi_per_byte_dynamic or fee_bump_method, cap on the estimated fee rate and on the '
+                        'fee rate of the bumps. By default there is none.',
+                   env_var='MAX_SATOSHI_PER_BYTE')
+    p.add_argument('--fee_bump_method', default=None, choices=['cpfp'],
+                   help='cert-issuer serve and web issuance: watch the Bitcoin issuing transactions and bump the fee of '
+                        'those unconfirmed after fee_bump_after_blocks blocks; cpfp spends their change in a child '
+                        'transaction, keeping their txid and so the proofs valid. A single cert-issuer run exits '
+                        'before any check, and ignores it. By default transactions are not watched.',
+                   env_var='FEE_BUMP_METHOD')
+    p.add_argument('--fee_bump_after_blocks', default=3, type=int,
+                   help='With fee_bump_method, blocks a transaction waits unconfirmed before its fee is bumped.',
+                   env_var='FEE_BUMP_AFTER_BLOCKS')
+    p.add_argument('--fee_bump_factor', default=1.5, type=float,
+                   help='With fee_bump_method, minimum increase of the fee rate of a bump.', env_var='FEE_BUMP_FACTOR')
+    p.add_argument('--confirmation_poll_interval', default=60, type=float,
+                   help='With fee_bump_method, seconds between confirmation checks.',
+                   env_var='CONFIRMATION_POLL_INTERVAL')
+    p.add_argument('--coin_selection_seed', default=0, type=int,
+                   help='Seed of the coin selection; the same unspent outputs and seed always select the same inputs.',
+                   env_var='COIN_SELECTION_SEED')
+    p.add_argument('--consolidation_satoshi_per_byte', default=None, type=int,
+                   help='At or below this fee rate, small unspent outputs are consolidated into the issuing transactions. '
+                        'By default they are not.', env_var='CONSOLIDATION_SATOSHI_PER_BYTE')
+    p.add_argument('--max_consolidation_inputs', default=10, type=int,
+                   help='Number of inputs consolidation fills an issuing transaction up to.',
+                   env_var='MAX_CONSOLIDATION_INPUTS')
     p.add_argument('--bitcoind', dest='bitcoind', default=False, action='store_true',
                    help='Use bitcoind connectors.', env_var='BITCOIND')
     p.add_argument('--no_bitcoind', dest='bitcoind', default=True, action='store_false',
                    help='Default; do not use bitcoind connectors; use APIs instead', env_var='NO_BITCOIND')
     # ethereum arguments
     p.add_argument('--nonce', default=0, type=int,
-                   help='sets nonce of ETH transaction. useful if you run your own transaction management system.', env_var='NONCE')
+                   help='sets nonce of the first ETH transaction, the next ones follow it. useful if you run your own transaction management system. By default the pending transaction count of the issuing address is used.', env_var='NONCE')
     p.add_argument('--max_priority_fee_per_gas', default=0, type=int,
                    help='decide the priority fee per gas spent for EIP-1559-compliant transactions (in wei, the smallest ETH unit)', env_var='MAX_PRIORITY_FEE_PER_GAS')
     p.add_argument('--gas_price', default=20000000000, type=int,
@@ -81,6 +161,9 @@ def add_arguments(p):
                    help='Fetch the current gas price from Etherscan. Requires etherscan_api_token to be set', env_var='GAS_PRICE_DYNAMIC')
     p.add_argument('--gas_limit', default=25000, type=int,
                    help='decide on the maximum spendable gas. gas_limit < 25000 might not be sufficient', env_var='GAS_LIMIT')
+    p.add_argument('--hedge_delay', default=0.5, type=float,
+                   help='Seconds to wait for the fastest Ethereum/Layer2 provider to answer a balance, nonce or gas '
+                        'price lookup before also asking the next one', env_var='HEDGE_DELAY')
     p.add_argument('--etherscan_api_token', default=None, type=str,
                    help='The API token of the Etherscan broadcaster', env_var='ETHERSCAN_API_TOKEN')
     p.add_argument('--ethereum_rpc_url', default=None, type=str,
@@ -147,6 +230,30 @@ def add_arguments(p):
                    env_var='CONTEXT_FILE_PATHS',
                    nargs='+'
                    )
+    p.add_argument('--schema_urls',
+                   default=None,
+                   type=str,
+                   help='credentialSchema urls to resolve from local files instead of the network, e.g. on an ' +
+                        'air-gapped issuing machine. Space separated list, must be used in conjunction with the ' +
+                        '`--schema_file_paths` property.',
+                   env_var='SCHEMA_URLS',
+                   nargs='+'
+                   )
+    p.add_argument('--schema_file_paths',
+                   default=None,
+                   type=str,
+                   help='Local copies of the `--schema_urls` schemas. Space separated list, order should match ' +
+                        '`--schema_urls` order.',
+                   env_var='SCHEMA_FILE_PATHS',
+                   nargs='+'
+                   )
+    p.add_argument('--schema_cache_dir',
+                   default=None,
+                   type=str,
+                   help='Directory where downloaded credentialSchema documents are cached between runs. Cached ' +
+                        'schemas are revalidated with their ETag, and used as is when the network is unavailable.',
+                   env_var='SCHEMA_CACHE_DIR'
+                   )
     p.add_argument('--multiple_proofs',
                    default='chained',
                    type=str,
@@ -194,6 +301,7 @@ def get_config(path_to_config=os.path.join(PATH, 'conf.ini')):
     logging.info('This run will try to issue on the %s chain', parsed_config.chain.name)
 
     if parsed_config.chain.blockchain_type == BlockchainType.bitcoin:
+        import bitcoin
         bitcoin_chain_for_python_bitcoinlib = parsed_config.chain
         if parsed_config.chain == Chain.bitcoin_regtest:
             bitcoin_chain_for_python_bitcoinlib = Chain.bitcoin_regtest
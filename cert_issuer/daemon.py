@@ -0,0 +1,149 @@
+"""
+Long-running issuer (cert-issuer serve): watches the unsigned certificates directory as an inbox and issues the
+certificates in it as a batch once there are serve_batch_size of them, or once the oldest has waited serve_max_age
+seconds.
+
+The handlers, connectors, HTTP connection pools, schemas and JSON-LD contexts are set up once and stay warm from one
+batch to the next. The issuing key is still read for each batch and dropped after signing.
+
+Certificates must appear in the inbox atomically (written elsewhere, then renamed in as <uid>.json), see enqueue.
+"""
+import copy
+import glob
+import json
+import logging
+import os
+import shutil
+import signal
+import threading
+import time
+
+from cert_issuer import helpers, issue_certificates
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_AGE = 60
+DEFAULT_POLL_INTERVAL = 1
+# certificates of the batch being issued are moved from the inbox to this directory in it
+BATCH_DIR = '.batch'
+
+
+class IssuanceDaemon(object):
+    def __init__(self, app_config, certificate_batch_handler=None, transaction_handler=None):
+        """
+        :param app_config: the parsed config; unsigned_certificates_dir is the inbox
+        :param certificate_batch_handler: defaults to the handlers of the configured chain, as for a single run
+        :param transaction_handler:
+        """
+        if getattr(app_config, 'unsigned_certificates_file', None):
+            logging.warning('unsigned_certificates_file is ignored when serving, certificates are read from %s',
+                            app_config.unsigned_certificates_dir)
+            app_config = copy.copy(app_config)
+            app_config.unsigned_certificates_file = None
+        self.app_config = app_config
+        self.inbox_dir = app_config.unsigned_certificates_dir
+        self.batch_dir = os.path.join(self.inbox_dir, BATCH_DIR)
+        self.max_batch_size = getattr(app_config, 'serve_batch_size', None) or DEFAULT_BATCH_SIZE
+        self.max_batch_age = getattr(app_config, 'serve_max_age', None) or DEFAULT_MAX_AGE
+        self.poll_interval = getattr(app_config, 'serve_poll_interval', None) or DEFAULT_POLL_INTERVAL
+
+        if certificate_batch_handler is None:
+            certificate_batch_handler, transaction_handler, _ = \
+                issue_certificates.instantiate_blockchain_handlers(app_config)
+        self.certificate_batch_handler = certificate_batch_handler
+        self.transaction_handler = transaction_handler
+        self.stopped = threading.Event()
+        self.failed_batches = 0
+
+    def enqueue(self, uid, certificate_json):
+        """
+        Adds a certificate to the inbox
+        """
+        os.makedirs(self.inbox_dir, exist_ok=True)
+        helpers.write_file_atomically(os.path.join(self.inbox_dir, uid + helpers.JSON_EXT),
+                                      json.dumps(certificate_json))
+
+    def get_inbox(self):
+        """
+        :return: the certificate files in the inbox, oldest first
+        """
+        inbox = []
+        for file_name in glob.glob(os.path.join(self.inbox_dir, '*' + helpers.JSON_EXT)):
+            try:
+                inbox.append((os.path.getmtime(file_name), file_name))
+            except FileNotFoundError:
+                # removed since listed
+                continue
+        return [file_name for _, file_name in sorted(inbox)]
+
+    def is_batch_ready(self, inbox):
+        if len(inbox) >= self.max_batch_size:
+            return True
+        return bool(inbox) and time.time() - os.path.getmtime(inbox[0]) >= self.max_batch_age
+
+    def run(self):
+        """
+        Issues batches until stop is called. A batch being issued when stop is called is finished first.
+        """
+        logging.info('Serving, issuing batches of up to %d certificates from %s', self.max_batch_size, self.inbox_dir)
+        self.return_to_inbox()
+        while not self.stopped.is_set():
+            try:
+                inbox = self.get_inbox()
+                ready = self.is_batch_ready(inbox)
+            except FileNotFoundError:
+                inbox, ready = [], False
+            if ready:
+                self.issue_batch(inbox[:self.max_batch_size])
+            else:
+                self.stopped.wait(self.poll_interval)
+        logging.info('Stopped serving')
+
+    def stop(self):
+        self.stopped.set()
+
+    def issue_batch(self, file_names):
+        """
+        Moves file_names out of the inbox and issues them. On failure they go back to the inbox, and are retried after
+        a backoff.
+        :return: the transaction id (or ids, with batch_size set), or None on failure
+        """
+        os.makedirs(self.batch_dir, exist_ok=True)
+        for file_name in file_names:
+            os.replace(file_name, os.path.join(self.batch_dir, os.path.basename(file_name)))
+
+        batch_config = copy.copy(self.app_config)
+        batch_config.unsigned_certificates_dir = self.batch_dir
+        start = time.monotonic()
+        try:
+            tx_id = issue_certificates.issue(batch_config, self.certificate_batch_handler, self.transaction_handler)
+        except Exception as e:
+            logging.error('Failed issuing a batch of %d certificates: %s', len(file_names), e, exc_info=True)
+            self.return_to_inbox()
+            delay = helpers.jittered_backoff(self.failed_batches, self.poll_interval, self.max_batch_age)
+            self.failed_batches += 1
+            self.stopped.wait(delay)
+            return None
+
+        shutil.rmtree(self.batch_dir)
+        self.failed_batches = 0
+        logging.info('Issued a batch of %d certificates in %.1f seconds, transaction id %s', len(file_names),
+                     time.monotonic() - start, tx_id)
+        return tx_id
+
+    def return_to_inbox(self):
+        """
+        Moves the certificates of an unfinished batch back to the inbox, keeping their age
+        """
+        if not os.path.isdir(self.batch_dir):
+            return
+        for file_name in glob.glob(os.path.join(self.batch_dir, '*' + helpers.JSON_EXT)):
+            os.replace(file_name, os.path.join(self.inbox_dir, os.path.basename(file_name)))
+
+
+def main(app_config):
+    daemon = IssuanceDaemon(app_config)
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
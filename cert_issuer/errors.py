@@ -63,8 +63,22 @@ class BroadcastError(Error):
     pass
 
 
+class FeeEstimationError(Error):
+    """
+    A provider could not estimate the fee rate
+    """
+    pass
+
+
 class UnrecognizedChainError(Error):
     """
     Didn't recognize chain
     """
     pass
+
+
+class InvalidMerkleTreeStateError(Error):
+    """
+    The Merkle tree was used out of order, e.g. a leaf was added after the tree was finalized
+    """
+    pass
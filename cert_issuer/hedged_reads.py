@@ -0,0 +1,83 @@
+"""
+Hedged reads across equivalent service providers: the call goes to the primary provider, a backup provider is called
+if no answer came within the hedge delay, and the first valid answer wins.
+
+Providers whose circuit is open are skipped (see circuit_breaker). Latencies of successful calls are kept per
+provider, and providers are ranked by median latency, so the fastest one becomes the primary.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cert_issuer.circuit_breaker import get_circuit_breakers
+from cert_issuer.metrics import LatencyHistogram
+
+DEFAULT_HEDGE_DELAY = 0.5
+# latency recorded for a failed call
+FAILED_CALL_LATENCY = float('inf')
+
+# calls outliving a read (the slower providers) keep running here after it returns
+read_executor = ThreadPoolExecutor(thread_name_prefix='hedged_read')
+
+
+class HedgedReader(object):
+    def __init__(self, hedge_delay=DEFAULT_HEDGE_DELAY):
+        self.hedge_delay = hedge_delay
+        self.histograms = {}
+        # reads run concurrently, each provider must get a single histogram
+        self.lock = threading.Lock()
+
+    def get_histogram(self, provider):
+        with self.lock:
+            if provider not in self.histograms:
+                self.histograms[provider] = LatencyHistogram()
+            return self.histograms[provider]
+
+    def rank(self, providers):
+        """
+        Orders providers by median latency. Providers without measurements keep their configured order, ahead of
+        the measured ones, so each gets measured. Failed calls count as infinitely slow, so a provider failing more
+        often than not ranks last.
+        """
+        def median_latency(provider):
+            median = self.get_histogram(provider).quantile(0.5)
+            return -1 if median is None else median
+        return sorted(providers, key=median_latency)
+
+    def read(self, providers, method_name, *args):
+        """
+        Calls method_name(*args) on the ranked providers, hedging after hedge_delay, and returns the first answer that
+        is not None. A provider that fails is replaced by the next one right away.
+        :return: the answer, or None if every provider failed
+        """
+        remaining = list(self.rank(get_circuit_breakers().order(providers)))
+        pending = {}
+        while remaining or pending:
+            if remaining:
+                provider = remaining.pop(0)
+                pending[read_executor.submit(self._timed_call, provider, method_name, args)] = provider
+            done, _ = wait(pending, timeout=self.hedge_delay if remaining else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.warning('Caught exception calling %s on provider %s. Exception=%s', method_name,
+                                    str(provider), e)
+                    continue
+                if result is not None:
+                    return result
+            if not done and remaining:
+                logging.debug('No answer to %s within %.2f seconds, hedging', method_name, self.hedge_delay)
+        return None
+
+    def _timed_call(self, provider, method_name, args):
+        start = time.monotonic()
+        latency = FAILED_CALL_LATENCY
+        try:
+            result = get_circuit_breakers().call(getattr(provider, method_name), *args)
+            latency = time.monotonic() - start
+            return result
+        finally:
+            self.get_histogram(provider).observe(latency)
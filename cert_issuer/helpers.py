@@ -1,6 +1,8 @@
 import collections
+import json
 import logging
 import os
+import random
 import shutil
 
 import glob2
@@ -9,13 +11,27 @@ from pycoin.encoding.hexbytes import b2h, h2b
 
 from cert_issuer.errors import NoCertificatesFoundError
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 unhexlify = h2b
 hexlify = b2h
 
 UNSIGNED_CERTIFICATES_DIR = 'unsigned_certificates'
 SIGNED_CERTIFICATES_DIR = 'signed_certificates'
 BLOCKCHAIN_CERTIFICATES_DIR = 'blockchain_certificates'
+PARSED_CERTIFICATES_DIR = 'parsed_certificates'
+BATCH_CHECKPOINT_FILE = 'batch_checkpoint.jsonl'
 JSON_EXT = '.json'
+TMP_EXT = '.tmp'
+
+STAGING_LINK = 'link'
+STAGING_COPY = 'copy'
+
+# ioctl request cloning a file's extents (copy-on-write reflink) on btrfs, xfs, ...
+FICLONE = 0x40049409
 
 
 class CertificateMetadata(object):
@@ -30,14 +46,15 @@ class CertificateMetadata(object):
 
 
 def prepare_issuance_batch(unsigned_certs_dir, signed_certs_dir, blockchain_certs_dir, work_dir,
-                           file_extension=JSON_EXT):
+                           file_extension=JSON_EXT, staging=STAGING_LINK):
     """
-    Prepares file system for issuing a batch of certificates. Copies inputs to work_dir, and ensures
+    Prepares file system for issuing a batch of certificates. Stages inputs in work_dir, and ensures
     that all output dirs required for processing the batch exist.
     :param unsigned_certs_dir: input certificates
     :param signed_certs_dir: output dir
     :param blockchain_certs_dir: output dir
     :param work_dir: work dir
+    :param staging: STAGING_LINK to link inputs into work_dir where possible, STAGING_COPY to copy them
     :return:
     """
 
@@ -59,8 +76,9 @@ def prepare_issuance_batch(unsigned_certs_dir, signed_certs_dir, blockchain_cert
     signed_certs_work_dir = os.path.join(work_dir, SIGNED_CERTIFICATES_DIR)
     blockchain_certs_work_dir = os.path.join(work_dir, BLOCKCHAIN_CERTIFICATES_DIR)
 
-    # copy input certs to unsigned certs work subdir and create output subdirs
-    shutil.copytree(unsigned_certs_dir, unsigned_certs_work_dir)
+    # stage input certs in unsigned certs work subdir and create output subdirs
+    copy_function = shutil.copy2 if staging == STAGING_COPY else stage_file
+    shutil.copytree(unsigned_certs_dir, unsigned_certs_work_dir, copy_function=copy_function)
     os.makedirs(signed_certs_work_dir, exist_ok=True)
     os.makedirs(blockchain_certs_work_dir, exist_ok=True)
 
@@ -86,11 +104,93 @@ def prepare_issuance_batch(unsigned_certs_dir, signed_certs_dir, blockchain_cert
     return cert_info
 
 
-def copy_output(certificates_metadata):
-    for _, metadata in certificates_metadata.items():
-        from_file = metadata.blockchain_cert_file_name
-        to_file = metadata.final_blockchain_cert_file_name
-        shutil.copy2(from_file, to_file)
+def stage_file(src, dst):
+    """
+    copytree copy_function staging an input without copying its data: a hardlink, else a reflink, else a copy.
+    Staged inputs are only ever read.
+    """
+    try:
+        os.link(src, dst)
+        return dst
+    except OSError:
+        pass
+    if reflink_file(src, dst):
+        return dst
+    return shutil.copy2(src, dst)
+
+
+def reflink_file(src, dst):
+    """
+    Clones src to dst sharing its data blocks, where the filesystem supports it
+    :return: True if dst was created
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def write_file_atomically(file_name, content):
+    """
+    Writes content to a temporary file next to file_name and renames it into place, so file_name is either absent or
+    complete
+    """
+    tmp_file_name = file_name + TMP_EXT
+    with open(tmp_file_name, 'w') as out_file:
+        out_file.write(content)
+    os.replace(tmp_file_name, file_name)
+
+
+def read_batch_checkpoint(work_dir):
+    """
+    Returns the ids of the certificates issued by the batches recorded in work_dir's checkpoint, mapped to the id of
+    the transaction that anchored them
+    """
+    issued = {}
+    checkpoint_file_name = os.path.join(work_dir, BATCH_CHECKPOINT_FILE)
+    if not os.path.exists(checkpoint_file_name):
+        return issued
+    with open(checkpoint_file_name) as checkpoint_file:
+        for line in checkpoint_file:
+            try:
+                batch = json.loads(line)
+            except ValueError:
+                # torn write of the last batch, that batch will be redone
+                logging.warning('Ignoring incomplete batch checkpoint entry')
+                continue
+            for uid in batch['uids']:
+                issued[uid] = batch['tx_id']
+    return issued
+
+
+def append_batch_checkpoint(work_dir, tx_id, uids):
+    """
+    Records a batch whose certificates were anchored by tx_id and written to the output dir
+    """
+    with open(os.path.join(work_dir, BATCH_CHECKPOINT_FILE), 'a') as checkpoint_file:
+        checkpoint_file.write(json.dumps({'tx_id': tx_id, 'uids': list(uids)}) + '\n')
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+
+
+def remove_batch_checkpoint(work_dir):
+    checkpoint_file_name = os.path.join(work_dir, BATCH_CHECKPOINT_FILE)
+    if os.path.exists(checkpoint_file_name):
+        os.remove(checkpoint_file_name)
+
+
+def jittered_backoff(attempt_number, base, cap):
+    """
+    Exponential backoff with full jitter: a random delay, in seconds, between 0 and min(cap, base * 2 ** attempt_number)
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt_number))
 
 
 def to_pycoin_chain(chain):
@@ -0,0 +1,117 @@
+"""
+Pooled, keep-alive HTTP client shared by the service provider connectors, so repeated calls to the same provider
+reuse an open TCP+TLS connection instead of paying a handshake each time.
+
+Every request gets explicit connect and read timeouts, and request counts, errors and latencies are kept per host.
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cert_issuer import config
+from cert_issuer.metrics import LatencyHistogram
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+# connections kept open per host
+DEFAULT_POOL_SIZE = 10
+# hosts with a pool of open connections; the least recently used pool is closed past that
+POOL_HOSTS = 20
+
+http_client = None
+
+
+def get_http_client():
+    global http_client
+    if http_client is None:
+        app_config = config.CONFIG
+        http_client = HTTPClient(
+            connect_timeout=getattr(app_config, 'http_connect_timeout', None) or DEFAULT_CONNECT_TIMEOUT,
+            read_timeout=getattr(app_config, 'http_read_timeout', None) or DEFAULT_READ_TIMEOUT,
+            pool_size=getattr(app_config, 'http_pool_size', None) or DEFAULT_POOL_SIZE)
+    return http_client
+
+
+class HostMetrics(object):
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency_p50': self.latency.quantile(0.5),
+            'latency_p99': self.latency.quantile(0.99)
+        }
+
+
+class HTTPClient(object):
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 pool_size=DEFAULT_POOL_SIZE):
+        """
+        :param connect_timeout: seconds to wait for a connection to be established
+        :param read_timeout: seconds to wait between bytes of the response
+        :param pool_size: connections kept open per host; more concurrent requests to a host still go through, on
+            connections closed after use
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.host_metrics = {}
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """
+        Same as requests.request, on a pooled connection, with the client timeouts unless timeout is given
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        metrics = self.get_host_metrics(host)
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self.lock:
+                metrics.requests += 1
+                metrics.errors += 1
+            raise
+        metrics.latency.observe(time.monotonic() - start)
+        with self.lock:
+            metrics.requests += 1
+            if response.status_code >= 500:
+                metrics.errors += 1
+        # not the full url, it can hold an API token
+        logging.debug('%s %s returned %d', method, host, response.status_code)
+        return response
+
+    def get_host_metrics(self, host):
+        with self.lock:
+            if host not in self.host_metrics:
+                self.host_metrics[host] = HostMetrics()
+            return self.host_metrics[host]
+
+    def get_metrics(self):
+        """
+        :return: dict of host to request count, error count (connection failures, timeouts and 5xx responses) and
+            latency median and 99th percentile in seconds
+        """
+        with self.lock:
+            host_metrics = dict(self.host_metrics)
+        return {host: metrics.to_dict() for host, metrics in host_metrics.items()}
+
+    def close(self):
+        self.session.close()
@@ -9,31 +9,62 @@ if sys.version_info.major < 3:
 
 
 def issue(app_config, certificate_batch_handler, transaction_handler):
+    """
+    Issues the certificates in one transaction, or in transactions of at most batch_size certificates when batch_size
+    is set. Issued batches are checkpointed in the work dir, so rerunning after a failure only issues the remaining
+    batches.
+    :return: the transaction id, or the list of transaction ids when batch_size is set or when every certificate was
+        already issued by an earlier run
+    """
     certificate_batch_handler.pre_batch_actions(app_config)
+    if certificate_batch_handler.issued_tx_ids is not None:
+        return certificate_batch_handler.issued_tx_ids
 
-    transaction_handler.ensure_balance()
+    try:
+        transaction_handler.ensure_balance()
 
-    issuer = Issuer(
-        certificate_batch_handler=certificate_batch_handler,
-        transaction_handler=transaction_handler,
-        max_retry=app_config.max_retry)
-    tx_id = issuer.issue(app_config.chain)
+        issuer = Issuer(
+            certificate_batch_handler=certificate_batch_handler,
+            transaction_handler=transaction_handler,
+            max_retry=app_config.max_retry)
 
-    certificate_batch_handler.post_batch_actions(app_config)
-    return tx_id
+        batch_size = getattr(app_config, 'batch_size', None)
+        if batch_size:
+            tx_ids = issuer.issue_batches(certificate_batch_handler.get_sub_batches(batch_size), app_config.chain)
+            certificate_batch_handler.complete_batches(app_config)
+            return tx_ids
 
+        tx_id = issuer.issue(app_config.chain)
 
-def main(app_config):
+        certificate_batch_handler.post_batch_actions(app_config)
+        return tx_id
+    except Exception:
+        certificate_batch_handler.abort_batches(app_config)
+        raise
+
+
+def instantiate_blockchain_handlers(app_config, file_mode=True):
+    """
+    :param file_mode: False for a batch handler issuing certificates passed in memory, as the web server does
+    :return: the certificate batch handler, transaction handler and connector of the configured chain
+    """
     chain = app_config.chain
     if chain.is_ethereum_type():
         from cert_issuer.blockchain_handlers import ethereum
-        certificate_batch_handler, transaction_handler, connector = ethereum.instantiate_blockchain_handlers(app_config)
+        return ethereum.instantiate_blockchain_handlers(app_config, file_mode)
     elif chain.is_layer2_type():
         from cert_issuer.blockchain_handlers import layer2
-        certificate_batch_handler, transaction_handler, connector = layer2.instantiate_blockchain_handlers(app_config)
+        return layer2.instantiate_blockchain_handlers(app_config, file_mode)
     else:
         from cert_issuer.blockchain_handlers import bitcoin
-        certificate_batch_handler, transaction_handler, connector = bitcoin.instantiate_blockchain_handlers(app_config)
+        return bitcoin.instantiate_blockchain_handlers(app_config, file_mode)
+
+
+def main(app_config):
+    if getattr(app_config, 'fee_bump_method', None):
+        logging.warning('fee_bump_method is ignored: a single run exits before the transaction could be bumped, it is '
+                        'for cert-issuer serve and web issuance')
+    certificate_batch_handler, transaction_handler, connector = instantiate_blockchain_handlers(app_config)
     return issue(app_config, certificate_batch_handler, transaction_handler)
 
 
@@ -2,6 +2,7 @@
 Base class for building blockchain transactions to issue Blockchain Certificates.
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from cert_issuer.errors import BroadcastError
 
@@ -21,11 +22,38 @@ class Issuer:
         """
 
         blockchain_bytes = self.certificate_batch_handler.prepare_batch()
+        return self.issue_prepared_batch(self.certificate_batch_handler, blockchain_bytes, chain)
 
+    def issue_batches(self, batch_handlers, chain):
+        """
+        Issue each batch in its own transaction, in order. The next batch is prepared (validated, signed and its
+        Merkle tree built) in the background while the current one is broadcast and its proofs are added.
+        post_batch_actions of each batch handler runs once its batch is issued.
+        :return: the transaction ids, in batch order
+        """
+        tx_ids = []
+        batch_handlers = iter(batch_handlers)
+        batch_handler = next(batch_handlers, None)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            if batch_handler is not None:
+                prepared = executor.submit(batch_handler.prepare_batch)
+            while batch_handler is not None:
+                blockchain_bytes = prepared.result()
+                next_batch_handler = next(batch_handlers, None)
+                if next_batch_handler is not None:
+                    prepared = executor.submit(next_batch_handler.prepare_batch)
+
+                tx_ids.append(self.issue_prepared_batch(batch_handler, blockchain_bytes, chain))
+                batch_handler.post_batch_actions(batch_handler.config)
+                logging.info('Issued batch %d', len(tx_ids))
+                batch_handler = next_batch_handler
+        return tx_ids
+
+    def issue_prepared_batch(self, certificate_batch_handler, blockchain_bytes, chain):
         for attempt_number in range(0, self.max_retry):
             try:
                 txid = self.transaction_handler.issue_transaction(blockchain_bytes)
-                self.certificate_batch_handler.finish_batch(txid, chain)
+                certificate_batch_handler.finish_batch(txid, chain)
                 logging.info('Broadcast transaction with txid %s', txid)
                 return txid
             except BroadcastError:
@@ -0,0 +1,125 @@
+"""
+Streams JSONL files, one JSON document per line, optionally gzip (.gz) or zstd (.zst) compressed. zstd needs the
+zstandard package.
+"""
+import gzip
+import io
+import itertools
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_EXT = '.gz'
+ZSTD_EXT = '.zst'
+TMP_EXT = '.tmp'
+
+
+def open_jsonl(file_name, mode='rb'):
+    """
+    Opens a JSONL file in binary mode ('rb' or 'wb'), compressed according to its extension
+    """
+    return _get_opener(file_name)(file_name, mode)
+
+
+def _get_opener(file_name):
+    if file_name.endswith(GZIP_EXT):
+        return gzip.open
+    if file_name.endswith(ZSTD_EXT):
+        if zstandard is None:
+            raise ImportError('Reading or writing {} requires the zstandard package'.format(file_name))
+        return _open_zstd
+    return open
+
+
+def _open_zstd(file_name, mode):
+    if mode == 'rb':
+        # buffered, for line iteration
+        return io.BufferedReader(zstandard.open(file_name, mode))
+    return zstandard.open(file_name, mode)
+
+
+def count_documents(file_name):
+    with open_jsonl(file_name) as jsonl_file:
+        return sum(1 for line in jsonl_file if line.strip())
+
+
+def read_jsonl(file_name, start=0, stop=None):
+    """
+    Returns a generator of documents start to stop (excluded) of file_name. Blank lines are skipped; lines before
+    start are not decoded.
+    """
+    with open_jsonl(file_name) as jsonl_file:
+        lines = (line for line in jsonl_file if line.strip())
+        for line in itertools.islice(lines, start, stop):
+            yield json.loads(line)
+
+
+class JSONLReader(object):
+    """
+    Reads consecutive ranges of documents of file_name, keeping the file open and positioned from one range to the
+    next: a file read in n sub-batches is decompressed once, rather than up to each range again. Reading a range
+    before the position opens the file again.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.jsonl_file = None
+        self.lines = None
+        # number of documents read or skipped
+        self.position = 0
+        self.opened = 0
+
+    def read(self, start, stop):
+        """
+        Returns a generator of documents start to stop (excluded), as read_jsonl
+        """
+        if self.jsonl_file is None or start < self.position:
+            self.close()
+            self.jsonl_file = open_jsonl(self.file_name)
+            self.lines = (line for line in self.jsonl_file if line.strip())
+            self.position = 0
+            self.opened += 1
+        for _ in itertools.islice(self.lines, start - self.position):
+            self.position += 1
+        while self.position < stop:
+            line = next(self.lines, None)
+            if line is None:
+                return
+            self.position += 1
+            yield json.loads(line)
+
+    def close(self):
+        if self.jsonl_file is not None:
+            self.jsonl_file.close()
+            self.jsonl_file = None
+
+
+class JSONLWriter(object):
+    """
+    Writes documents to file_name, one per line. They go to a temporary file that is renamed to file_name by commit,
+    so file_name only ever holds a complete output.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.tmp_file_name = file_name + TMP_EXT
+        self.jsonl_file = _get_opener(file_name)(self.tmp_file_name, 'wb')
+
+    def write(self, document):
+        self.jsonl_file.write(json.dumps(document).encode('utf-8') + b'\n')
+
+    def commit(self):
+        self.jsonl_file.close()
+        os.replace(self.tmp_file_name, self.file_name)
+
+    def abort(self):
+        """
+        Discards the documents written, file_name is left as it was
+        """
+        self.jsonl_file.close()
+        if os.path.exists(self.tmp_file_name):
+            os.remove(self.tmp_file_name)
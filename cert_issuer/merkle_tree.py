@@ -0,0 +1,132 @@
+"""
+SHA-256 Merkle tree over raw 32-byte digests.
+
+Each level is one contiguous bytearray of concatenated digests. Trees are built the same way as
+blockcerts-merkletools, so roots and proofs are identical: pairs are hashed left to right, and an odd node at the
+end of a level is promoted to the next level as is.
+"""
+import hashlib
+
+DIGEST_SIZE = 32
+
+
+def _sha256_digest(data):
+    return hashlib.sha256(data).digest()
+
+
+class MerkleTree(object):
+    def __init__(self):
+        self.leaves = bytearray()
+        self.levels = None
+
+    def add_leaf(self, digest):
+        """
+        Adds a leaf. The leaf must be a 32-byte digest.
+        """
+        if len(digest) != DIGEST_SIZE:
+            raise ValueError('Merkle tree leaves must be {} byte digests'.format(DIGEST_SIZE))
+        self.leaves += digest
+        self.levels = None
+
+    def get_leaf_count(self):
+        return len(self.leaves) // DIGEST_SIZE
+
+    def get_leaf(self, index):
+        return bytes(self.leaves[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE])
+
+    def is_ready(self):
+        return self.levels is not None
+
+    def make_tree(self):
+        """
+        Builds all levels, from the leaves (levels[0]) up to the root (levels[-1])
+        """
+        levels = [self.leaves]
+        level = memoryview(self.leaves)
+        while len(level) > DIGEST_SIZE:
+            pair_count = len(level) // (2 * DIGEST_SIZE)
+            pairs = (level[i:i + 2 * DIGEST_SIZE] for i in range(0, pair_count * 2 * DIGEST_SIZE, 2 * DIGEST_SIZE))
+            next_level = bytearray(b''.join(map(_sha256_digest, pairs)))
+            if len(level) % (2 * DIGEST_SIZE):
+                # odd node at the end of the level is promoted
+                next_level += level[-DIGEST_SIZE:]
+            levels.append(next_level)
+            level = memoryview(next_level)
+        self.levels = levels
+
+    def get_root(self):
+        if not self.levels or not self.levels[-1]:
+            return None
+        return bytes(self.levels[-1])
+
+    def get_proof(self, index):
+        """
+        Returns the proof for the leaf at index, from the leaf level up, as a list of (position, sibling digest)
+        where position is 'left' or 'right'
+        """
+        proof = []
+        for level in self.levels[:-1]:
+            node_count = len(level) // DIGEST_SIZE
+            if index == node_count - 1 and node_count % 2 == 1:
+                # odd end node, promoted without hashing
+                index //= 2
+                continue
+            if index % 2:
+                sibling_index = index - 1
+                position = 'left'
+            else:
+                sibling_index = index + 1
+                position = 'right'
+            proof.append((position, bytes(level[sibling_index * DIGEST_SIZE:(sibling_index + 1) * DIGEST_SIZE])))
+            index //= 2
+        return proof
+
+    def get_proofs(self, make_entry=None):
+        """
+        Yields the proof of every leaf, in leaf order.
+
+        The sibling entry of each node is built once, with make_entry(position, sibling digest) (defaults to the
+        get_proof tuple), and the same entry object is shared by the proofs of all the leaves below that node.
+        Generating all proofs is one pass over the levels plus O(log n) per proof.
+        """
+        if make_entry is None:
+            make_entry = _proof_entry
+        sibling_entries = []
+        for level in self.levels[:-1]:
+            node_count = len(level) // DIGEST_SIZE
+            entries = [None] * node_count
+            for index in range(node_count - node_count % 2):
+                if index % 2:
+                    sibling_index = index - 1
+                    position = 'left'
+                else:
+                    sibling_index = index + 1
+                    position = 'right'
+                sibling = bytes(level[sibling_index * DIGEST_SIZE:(sibling_index + 1) * DIGEST_SIZE])
+                entries[index] = make_entry(position, sibling)
+            sibling_entries.append(entries)
+
+        for leaf_index in range(self.get_leaf_count()):
+            proof = []
+            index = leaf_index
+            for entries in sibling_entries:
+                entry = entries[index]
+                # no entry for an odd end node, it is promoted without hashing
+                if entry is not None:
+                    proof.append(entry)
+                index //= 2
+            yield proof
+
+
+def _proof_entry(position, sibling):
+    return position, sibling
+
+
+def validate_proof(proof, target_hash, merkle_root):
+    proof_hash = target_hash
+    for position, sibling in proof:
+        if position == 'left':
+            proof_hash = _sha256_digest(sibling + proof_hash)
+        else:
+            proof_hash = _sha256_digest(proof_hash + sibling)
+    return proof_hash == merkle_root
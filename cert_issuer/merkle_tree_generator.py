@@ -2,47 +2,155 @@ import hashlib
 import logging
 from datetime import datetime
 
+from cbor2 import dumps
 from cert_core import Chain
-from blockcerts_merkletools import MerkleTools
-from pycoin.encoding.hexbytes import h2b
-from lds_merkle_proof_2019.merkle_proof_2019 import MerkleProof2019
+from pycoin.encoding.hexbytes import b2h
+from lds_merkle_proof_2019 import mappings
 from cert_issuer import helpers
+from cert_issuer.errors import InvalidMerkleTreeStateError
+from cert_issuer.merkle_tree import MerkleTree, DIGEST_SIZE
 
+# MerkleTreeGenerator states: leaves are added while populating, the tree is built once when finalized, and proofs
+# are handed out once the root is anchored in a transaction
+POPULATING = 'populating'
+FINALIZED = 'finalized'
+ANCHORED = 'anchored'
 
-def hash_byte_array(data):
-    hashed = hashlib.sha256(data).hexdigest()
-    return hashed
+HEX_DIGEST_SIZE = 2 * DIGEST_SIZE
 
+BASE58BTC_PREFIX = b'z'
+BASE58_ALPHABET = b'123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BASE58_PAIRS = [bytes((high, low)) for high in BASE58_ALPHABET for low in BASE58_ALPHABET]
+BASE58_PAIR_BASE = 58 * 58
+BASE58_LEAF_PAIRS = 16
 
-def ensure_string(value):
-    if isinstance(value, str):
-        return value
-    return value.decode('utf-8')
+_base58_pair_powers = {}
+
+
+def digest_byte_array(data):
+    return hashlib.sha256(data).digest()
+
+
+def b2a_base58(data):
+    """
+    Base58 encoding of data read as one big-endian number, same as multibase's base58btc (leading zero bytes are
+    not preserved). Digits are produced two at a time with a divide-and-conquer split of the number, instead of one
+    division of the whole number per digit.
+    """
+    value = int.from_bytes(data, 'big')
+    # 58 ** 2 > 2 ** 11
+    pair_count = value.bit_length() // 11 + 1
+    pairs = []
+    _append_base58_pairs(value, pair_count, pairs)
+    return b''.join(pairs).lstrip(BASE58_ALPHABET[0:1]) or BASE58_ALPHABET[0:1]
+
+
+def _append_base58_pairs(value, pair_count, pairs):
+    if pair_count <= BASE58_LEAF_PAIRS:
+        leaf = []
+        for _ in range(pair_count):
+            value, pair = divmod(value, BASE58_PAIR_BASE)
+            leaf.append(BASE58_PAIRS[pair])
+        leaf.reverse()
+        pairs.extend(leaf)
+        return
+    low_count = pair_count // 2
+    if low_count not in _base58_pair_powers:
+        _base58_pair_powers[low_count] = BASE58_PAIR_BASE ** low_count
+    high, low = divmod(value, _base58_pair_powers[low_count])
+    _append_base58_pairs(high, pair_count - low_count, pairs)
+    _append_base58_pairs(low, low_count, pairs)
+
+
+class ProofEncoder(object):
+    """
+    MerkleProof2019 encoder producing the same proof values as lds_merkle_proof_2019's MerkleProof2019().encode(),
+    with a faster base58btc step. multibase converts with python-baseconv, digit by digit in pure Python, which
+    dominates the time to encode a proof.
+
+    The CBOR map is built here from the library's public mappings, following MerkleProof2019's layout.
+    """
+
+    def encode(self, proof_json):
+        cbor_encoding = dumps(self.map_json(proof_json))
+        return BASE58BTC_PREFIX + b2a_base58(cbor_encoding)
+
+    def map_json(self, proof_json):
+        mapped_list = []
+        for key, value in proof_json.items():
+            if key == 'path':
+                mapped_list.append([mappings.root[key], self.map_path(value)])
+            elif key == 'anchors':
+                mapped_list.append([mappings.root[key], [self.map_anchor(anchor) for anchor in value]])
+            else:
+                mapped_list.append([mappings.root[key], dumps(value)])
+        return mapped_list
+
+    def map_path(self, proof_path):
+        path_list = []
+        for path_item in proof_path:
+            if 'right' in path_item:
+                path_list.append([mappings.path['right'], dumps(path_item['right'])])
+            if 'left' in path_item:
+                path_list.append([mappings.path['left'], dumps(path_item['left'])])
+        return path_list
+
+    def map_anchor(self, anchor):
+        """
+        :param anchor: blink, e.g. blink:btc:mainnet:<txid>
+        """
+        anchor_item_list = []
+        anchor_parts = anchor.split(':')
+        for i, anchor_part in enumerate(anchor_parts[1:], 1):
+            if i == 1:
+                anchor_item_list.append([0, mappings.chain[anchor_part]['id']])
+            elif i == 2 and 'networks' in mappings.chain[anchor_parts[1]]:
+                anchor_item_list.append([1, mappings.chain[anchor_parts[1]]['networks'][anchor_part]])
+            else:
+                anchor_item_list.append([i - 1, dumps(anchor_part)])
+        return anchor_item_list
 
 
 class MerkleTreeGenerator(object):
     def __init__(self):
-        self.tree = MerkleTools(hash_type='sha256')
+        self.reset()
+
+    def reset(self):
+        self.tree = MerkleTree()
+        self.state = POPULATING
+        self.merkle_root = None
+        self.tx_id = None
 
     def populate(self, node_generator):
         """
         Populate Merkle Tree with data from node_generator. This requires that node_generator yield byte[] elements.
-        Hashes, computes hex digest, and adds it to the Merkle Tree
+        Hashes, computes digest, and adds it to the Merkle Tree
         :param node_generator:
         :return:
         """
+        if self.state != POPULATING:
+            raise InvalidMerkleTreeStateError('Cannot add leaves to a {} Merkle tree'.format(self.state))
         for data in node_generator:
-            hashed = hash_byte_array(data)
-            self.tree.add_leaf(hashed)
+            self.tree.add_leaf(digest_byte_array(data))
+
+    def finalize(self):
+        """
+        Build the tree. This happens once; the root and levels are kept for the proofs.
+        :return:
+        """
+        if self.state != POPULATING:
+            return
+        self.tree.make_tree()
+        self.merkle_root = self.tree.get_root()
+        self.state = FINALIZED
 
     def get_blockchain_data(self):
         """
         Finalize tree and return byte array to issue on blockchain
         :return:
         """
-        self.tree.make_tree()
-        merkle_root = self.tree.get_merkle_root()
-        return h2b(ensure_string(merkle_root))
+        self.finalize()
+        return self.merkle_root
 
     def get_proof_generator(self, tx_id, chain=Chain.bitcoin_mainnet):
         """
@@ -51,33 +159,31 @@ class MerkleTreeGenerator(object):
         :param tx_id: blockchain transaction id
         :return:
         """
-        root = ensure_string(self.tree.get_merkle_root())
-        node_count = len(self.tree.leaves)
-        for index in range(0, node_count):
-            proof = self.tree.get_proof(index)
-            proof2 = []
-
-            for p in proof:
-                dict2 = dict()
-                for key, value in p.items():
-                    dict2[key] = ensure_string(value)
-                proof2.append(dict2)
-            target_hash = ensure_string(self.tree.get_leaf(index))
-            mp2019 = MerkleProof2019()
+        if self.state == POPULATING:
+            raise InvalidMerkleTreeStateError('Merkle tree must be finalized before generating proofs')
+        self.state = ANCHORED
+        self.tx_id = tx_id
+        root = b2h(self.merkle_root)
+        anchors = [helpers.tx_to_blink(chain, tx_id)]
+        leaves = b2h(self.tree.leaves)
+        mp2019 = ProofEncoder()
+        for index, path in enumerate(self.tree.get_proofs(to_path_entry)):
             merkle_json = {
-                  "path": proof2,
+                  "path": path,
                   "merkleRoot": root,
-                  "targetHash": target_hash,
-                  "anchors": [
-                    helpers.tx_to_blink(chain, tx_id)
-                  ]
+                  "targetHash": leaves[index * HEX_DIGEST_SIZE:(index + 1) * HEX_DIGEST_SIZE],
+                  "anchors": anchors
                 }
-            logging.info('merkle_json: %s', str(merkle_json))
+            logging.debug('merkle_json: %s', merkle_json)
 
             proof_value = mp2019.encode(merkle_json)
             yield proof_value
 
 
+def to_path_entry(position, sibling):
+    return {position: b2h(sibling)}
+
+
 def to_source_id(txid, chain):
     if chain.is_bitcoin_type() or chain.is_ethereum_type():
         return txid
@@ -0,0 +1,39 @@
+"""
+Latency histograms, shared by the HTTP client's per host metrics, the hedged reads' provider ranking and the micro
+batcher.
+"""
+import bisect
+import threading
+
+# upper bounds, in seconds, of the latency histogram buckets: 1ms to ~60s, each 1.5 times the previous
+LATENCY_BUCKETS = [0.001 * 1.5 ** i for i in range(28)]
+
+
+class LatencyHistogram(object):
+    def __init__(self):
+        # the last bucket counts latencies above LATENCY_BUCKETS[-1]
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.count += 1
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q quantile, or None if nothing was observed
+        """
+        with self.lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= rank and bucket_count:
+                    break
+        if index < len(LATENCY_BUCKETS):
+            return LATENCY_BUCKETS[index]
+        return float('inf')
@@ -0,0 +1,196 @@
+"""
+Micro-batching of web issuance: certificates from concurrent callers are collected for up to window seconds, or until
+max_batch_size of them are waiting, and anchored together in one transaction. Each caller gets back its own
+certificates with their proofs.
+
+MicroBatcher is for threaded servers (e.g. a WSGI app calling issue from its request threads); cert_issuer.asgi
+batches the same way on an event loop. Both issue their batches with issue_requests and keep BatchMetrics.
+"""
+import copy
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from cert_issuer import issue_certificates
+from cert_issuer.metrics import LatencyHistogram
+
+DEFAULT_BATCH_WINDOW = 0.5
+DEFAULT_MAX_BATCH_SIZE = 1000
+
+
+def get_web_batch_issuer(app_config, certificate_batch_handler, transaction_handler):
+    """
+    :param certificate_batch_handler: a CertificateBatchWebHandler
+    :return: a blocking function issuing a list of certificates in one transaction, and returning them with their
+        proofs, in order
+    """
+    # batches are bounded by max_batch_size, they are not split
+    batch_config = copy.copy(app_config)
+    batch_config.batch_size = None
+
+    def issue_batch(certificates):
+        certificate_batch_handler.set_certificates_in_batch(certificates)
+        issue_certificates.issue(batch_config, certificate_batch_handler, transaction_handler)
+        return certificate_batch_handler.proof
+    return issue_batch
+
+
+class BatchMetrics(object):
+    def __init__(self):
+        self.batches = 0
+        self.failed_batches = 0
+        self.requests = 0
+        self.certificates = 0
+        # from a request arriving to its batch being issued
+        self.wait_latency = LatencyHistogram()
+        # issuing a batch, until its proofs are out
+        self.issue_latency = LatencyHistogram()
+        self.lock = threading.Lock()
+
+    def observe_batch(self, request_count, certificate_count, wait_latencies, issue_latency, failed=False):
+        for wait_latency in wait_latencies:
+            self.wait_latency.observe(wait_latency)
+        self.issue_latency.observe(issue_latency)
+        with self.lock:
+            self.batches += 1
+            if failed:
+                self.failed_batches += 1
+            self.requests += request_count
+            self.certificates += certificate_count
+
+    def to_dict(self):
+        with self.lock:
+            metrics = {
+                'batches': self.batches,
+                'failed_batches': self.failed_batches,
+                'requests': self.requests,
+                'certificates': self.certificates,
+                'certificates_per_batch': self.certificates / self.batches if self.batches else None
+            }
+        metrics.update({
+            'wait_latency_p50': self.wait_latency.quantile(0.5),
+            'wait_latency_p99': self.wait_latency.quantile(0.99),
+            'issue_latency_p50': self.issue_latency.quantile(0.5),
+            'issue_latency_p99': self.issue_latency.quantile(0.99)
+        })
+        return metrics
+
+
+def issue_requests(issue_batch, metrics, pending):
+    """
+    Issues the certificates of the pending requests in one batch. Blocking, the futures are not resolved here: an
+    event loop's futures must be resolved in its own thread, see resolve_requests.
+    :param issue_batch: blocking function taking a list of certificates and returning them issued, in order
+    :param metrics: the BatchMetrics to update
+    :param pending: (certificates, future, arrival time) of the requests
+    :return: (future, certificates issued, exception) of each request
+    """
+    certificates = [certificate for request_certificates, _, _ in pending for certificate in request_certificates]
+    logging.info('Issuing %d certificates of %d requests in one batch', len(certificates), len(pending))
+    start = time.monotonic()
+    wait_latencies = [start - arrived for _, _, arrived in pending]
+    try:
+        issued = issue_batch(certificates)
+    except Exception as e:
+        logging.error('Failed issuing a batch of %d certificates: %s', len(certificates), e, exc_info=True)
+        metrics.observe_batch(len(pending), len(certificates), wait_latencies, time.monotonic() - start, failed=True)
+        return [(future, None, e) for _, future, _ in pending]
+
+    metrics.observe_batch(len(pending), len(certificates), wait_latencies, time.monotonic() - start)
+    outcomes = []
+    offset = 0
+    for request_certificates, future, _ in pending:
+        outcomes.append((future, issued[offset:offset + len(request_certificates)], None))
+        offset += len(request_certificates)
+    return outcomes
+
+
+def resolve_requests(outcomes):
+    """
+    Hands each caller its certificates, or the exception that failed the batch
+    :param outcomes: as returned by issue_requests
+    """
+    for future, issued, exception in outcomes:
+        # the caller may have gone away
+        if future.done():
+            continue
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(issued)
+
+
+class MicroBatcher(object):
+    def __init__(self, issue_batch, window=DEFAULT_BATCH_WINDOW, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        """
+        :param issue_batch: blocking function taking a list of certificates and returning them issued, in order
+        :param window: seconds the first certificate of a batch waits for others to join
+        :param max_batch_size: number of certificates that triggers issuing before the window is over
+        """
+        self.issue_batch = issue_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.metrics = BatchMetrics()
+        # (certificates, future, arrival time) of the requests waiting for the next batch
+        self.pending = []
+        self.pending_count = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name='micro_batcher', daemon=True)
+        self.thread.start()
+
+    def issue(self, certificates, timeout=None):
+        """
+        Adds certificates to the next batch and waits for it to be issued
+        :return: the certificates issued
+        """
+        future = Future()
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('The micro-batcher is closed')
+            self.pending.append((certificates, future, time.monotonic()))
+            self.pending_count += len(certificates)
+            self.condition.notify()
+        return future.result(timeout)
+
+    def close(self):
+        """
+        Issues the pending certificates, and stops
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                deadline = self.pending[0][2] + self.window
+                while self.pending_count < self.max_batch_size and not self.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                pending, self.pending, self.pending_count = self.pending, [], 0
+            self._issue(pending)
+
+    def _issue(self, pending):
+        resolve_requests(issue_requests(self.issue_batch, self.metrics, pending))
+
+
+def create_micro_batcher(app_config):
+    """
+    Returns a MicroBatcher issuing with the web handlers of the configured chain, and the web_batch_window and
+    web_max_batch_size of app_config
+    """
+    certificate_batch_handler, transaction_handler, _ = issue_certificates.instantiate_blockchain_handlers(
+        app_config, file_mode=False)
+    return MicroBatcher(
+        get_web_batch_issuer(app_config, certificate_batch_handler, transaction_handler),
+        window=getattr(app_config, 'web_batch_window', None) or DEFAULT_BATCH_WINDOW,
+        max_batch_size=getattr(app_config, 'web_max_batch_size', None) or DEFAULT_MAX_BATCH_SIZE)
@@ -1,3 +1,5 @@
+import collections
+import copy
 import json
 from abc import abstractmethod
 from cert_issuer.config import ESTIMATE_NUM_INPUTS
@@ -5,6 +7,11 @@ from cert_issuer.models.verifiable_credential import verify_credential, verify_p
 from cert_issuer.models.metadata import validate_metadata_structure
 
 class BatchHandler(object):
+    is_sub_batch = False
+    # set by pre_batch_actions when an earlier run already issued every certificate: the ids of the transactions
+    # that anchored them, nothing is left to issue
+    issued_tx_ids = None
+
     def __init__(self, secret_manager, certificate_handler, merkle_tree, config):
         self.certificate_handler = certificate_handler
         self.secret_manager = secret_manager
@@ -19,8 +26,36 @@ class BatchHandler(object):
     def post_batch_actions(self, config):
         pass
 
+    def abort_batches(self, config):
+        """
+        Called instead of the post batch actions when issuing failed, to release what pre_batch_actions opened
+        """
+        pass
+
     def set_certificates_in_batch(self, certificates_to_issue):
         self.certificates_to_issue = certificates_to_issue
+        # a new batch gets a new tree
+        self.merkle_tree.reset()
+
+    def get_sub_batches(self, batch_size):
+        """
+        Splits the certificates to issue into batches of at most batch_size certificates, each anchored in its own
+        transaction. Each sub-batch has its own Merkle tree and certificate handler state, so one can be prepared while
+        another is being issued.
+        :return: a generator of batch handlers, in certificate order
+        """
+        for certificates_to_issue in self.split_certificates(batch_size):
+            sub_batch = copy.copy(self)
+            sub_batch.is_sub_batch = True
+            sub_batch.merkle_tree = type(self.merkle_tree)()
+            sub_batch.certificate_handler = self.certificate_handler.for_sub_batch()
+            sub_batch.set_certificates_in_batch(certificates_to_issue)
+            yield sub_batch
+
+    def split_certificates(self, batch_size):
+        certificates = list(self.certificates_to_issue.items())
+        for start in range(0, len(certificates), batch_size):
+            yield collections.OrderedDict(certificates[start:start + batch_size])
 
 
 class CertificateHandler(object):
@@ -48,10 +83,26 @@ class CertificateHandler(object):
     def get_byte_array_to_issue(self, certificate_metadata):
         pass
 
+    def get_byte_arrays_to_issue(self, certificates_metadata):
+        """
+        Returns a generator of the byte arrays to issue, in the order of certificates_metadata
+        """
+        for certificate_metadata in certificates_metadata:
+            yield self.get_byte_array_to_issue(certificate_metadata)
+
     @abstractmethod
     def add_proof(self, certificate_metadata, merkle_proof):
         pass
 
+    def clear_parsed_certificates(self):
+        pass
+
+    def for_sub_batch(self):
+        """
+        :return: a handler for a sub-batch, which may be prepared in another thread than the other sub-batches
+        """
+        return self
+
 
 class ServiceProviderConnector(object):
     @abstractmethod
@@ -62,6 +113,14 @@ class ServiceProviderConnector(object):
         pass
 
 
+class MockServiceProviderConnector(ServiceProviderConnector):
+    def get_balance(self, address):
+        pass
+
+    def broadcast_tx(self, tx):
+        pass
+
+
 class Signer(object):
     """
     Abstraction for a component that can sign.
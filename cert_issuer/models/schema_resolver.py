@@ -0,0 +1,103 @@
+import collections
+import hashlib
+import json
+import logging
+import os
+import socket
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from cert_issuer.http_client import DEFAULT_READ_TIMEOUT
+
+DEFAULT_MAX_SCHEMAS = 128
+NOT_MODIFIED = 304
+
+
+class SchemaResolver(object):
+    """
+    Resolves credentialSchema documents and keeps a compiled validator per schema url, so a batch sharing one schema
+    downloads and compiles it once.
+
+    Lookup order for a schema url:
+     - in-process LRU of compiled validators
+     - local mirrors (url -> file path), for air-gapped issuing machines
+     - cache_dir, if configured; the cached copy is revalidated with its ETag and used as is when offline
+     - the network, giving up after timeout seconds without an answer
+    """
+
+    def __init__(self, cache_dir=None, mirrors=None, max_schemas=DEFAULT_MAX_SCHEMAS, timeout=DEFAULT_READ_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.mirrors = mirrors or {}
+        self.max_schemas = max_schemas
+        self.timeout = timeout
+        self.validators = collections.OrderedDict()
+
+    def validate(self, instance, schema_url):
+        validator = self.get_validator(schema_url)
+        error = best_match(validator.iter_errors(instance))
+        if error is not None:
+            raise error
+
+    def get_validator(self, schema_url):
+        if schema_url in self.validators:
+            self.validators.move_to_end(schema_url)
+            return self.validators[schema_url]
+
+        schema = self.load_schema(schema_url)
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        validator = validator_class(schema)
+
+        self.validators[schema_url] = validator
+        if len(self.validators) > self.max_schemas:
+            self.validators.popitem(last=False)
+        return validator
+
+    def load_schema(self, schema_url):
+        if schema_url in self.mirrors:
+            with open(self.mirrors[schema_url]) as schema_file:
+                return json.load(schema_file)
+
+        cached = self._read_cache(schema_url)
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        try:
+            with urlopen(Request(schema_url, headers=headers), timeout=self.timeout) as response:
+                schema = json.loads(response.read().decode('utf-8'))
+                self._write_cache(schema_url, response.headers.get('ETag'), schema)
+                return schema
+        except HTTPError as e:
+            if e.code == NOT_MODIFIED and cached:
+                return cached['schema']
+            raise
+        except (URLError, socket.timeout) as e:
+            if cached:
+                logging.warning('Could not fetch schema %s (%s), using cached copy', schema_url,
+                                getattr(e, 'reason', e))
+                return cached['schema']
+            raise
+
+    def _cache_file_name(self, schema_url):
+        return os.path.join(self.cache_dir, hashlib.sha256(schema_url.encode('utf-8')).hexdigest() + '.json')
+
+    def _read_cache(self, schema_url):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_file_name(schema_url)) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, schema_url, etag, schema):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_file_name = self._cache_file_name(schema_url)
+        with open(cache_file_name + '.tmp', 'w') as cache_file:
+            json.dump({'url': schema_url, 'etag': etag, 'schema': schema}, cache_file)
+        os.replace(cache_file_name + '.tmp', cache_file_name)
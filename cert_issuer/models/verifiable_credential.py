@@ -1,15 +1,73 @@
 import re
 import logging
-import json
+from datetime import datetime, timedelta
 from urllib.parse import urlparse
 from cert_schema import ContextUrls
-from urllib.request import urlretrieve
-from jsonschema import validate as jsonschema_validate
+from cert_issuer import config
+from cert_issuer.http_client import DEFAULT_READ_TIMEOUT
+from cert_issuer.models.schema_resolver import SchemaResolver
+
+schema_resolver = None
+# the config schema_resolver was built with
+schema_resolver_config = None
+
+# https://www.w3.org/TR/vc-data-model-2.0/#example-regular-expression-to-detect-a-valid-xml-schema-1-1-part-2-datetimestamp
+RFC3339_DATE_PATTERN = re.compile(r'-?([1-9][0-9]{3,}|0[0-9]{3})-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])T(([01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](\.[0-9]+)?|(24:00:00(\.0+)?))(Z|(\+|-)((0[0-9]|1[0-3]):[0-5][0-9]|14:00))$')
+# splits a date matching RFC3339_DATE_PATTERN for datetime.fromisoformat, which takes neither Z, 24:00:00 nor more
+# than 6 digits of fractional seconds on all supported Python versions
+RFC3339_DATE_PARTS = re.compile(r'(?P<date>[0-9]{4}-[0-9]{2}-[0-9]{2})T(?P<time>[0-9]{2}:[0-9]{2}:[0-9]{2})(\.(?P<fraction>[0-9]+))?(?P<offset>Z|[+-][0-9]{2}:[0-9]{2})$')
+
+# the context urls are read from cert-schema once, not on every validation
+context_urls = ContextUrls()
+VC_V1_CONTEXT = context_urls.verifiable_credential_v1()
+VC_V2_CONTEXT = context_urls.verifiable_credential_v2()
+VC_CONTEXT_URLS = [VC_V1_CONTEXT, VC_V2_CONTEXT]
+BLOCKCERTS_CONTEXT_URLS = frozenset(context_urls.v3_all())
+COMPULSORY_TYPES = frozenset(['VerifiableCredential', 'VerifiablePresentation'])
+
+
+def get_schema_resolver():
+    """
+    :return: the resolver for the current config, built again whenever another config is loaded
+    """
+    global schema_resolver, schema_resolver_config
+    app_config = config.CONFIG
+    if schema_resolver is None or app_config is not schema_resolver_config:
+        mirrors = {}
+        if getattr(app_config, 'schema_urls', None) and getattr(app_config, 'schema_file_paths', None):
+            mirrors = dict(zip(app_config.schema_urls, app_config.schema_file_paths))
+        schema_resolver = SchemaResolver(cache_dir=getattr(app_config, 'schema_cache_dir', None), mirrors=mirrors,
+                                         timeout=getattr(app_config, 'http_read_timeout', None) or DEFAULT_READ_TIMEOUT)
+        schema_resolver_config = app_config
+    return schema_resolver
 
 # TODO: move the v3 checks to cert-schema
 def validate_RFC3339_date (date):
-    # // https://www.w3.org/TR/vc-data-model-2.0/#example-regular-expression-to-detect-a-valid-xml-schema-1-1-part-2-datetimestamp
-    return re.match('-?([1-9][0-9]{3,}|0[0-9]{3})-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])T(([01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](\.[0-9]+)?|(24:00:00(\.0+)?))(Z|(\+|-)((0[0-9]|1[0-3]):[0-5][0-9]|14:00))$', date)
+    return RFC3339_DATE_PATTERN.match(date)
+
+def parse_RFC3339_date (date):
+    """
+    :return: the timezone aware datetime of an RFC3339 date, or None if it is out of datetime's range (e.g. year 0 or
+        over 9999)
+    """
+    parts = RFC3339_DATE_PARTS.match(date)
+    if not parts:
+        return None
+    time = parts.group('time')
+    next_day = time == '24:00:00'
+    if next_day:
+        time = '00:00:00'
+    fraction = (parts.group('fraction') or '')[:6].ljust(6, '0')
+    offset = parts.group('offset')
+    if offset == 'Z':
+        offset = '+00:00'
+    try:
+        parsed = datetime.fromisoformat('{}T{}.{}{}'.format(parts.group('date'), time, fraction, offset))
+        if next_day:
+            parsed += timedelta(days=1)
+    except (ValueError, OverflowError):
+        return None
+    return parsed
 
 def is_valid_url (url):
     try:
@@ -21,12 +79,10 @@ def is_valid_url (url):
        and url.__contains__(':'))
 
 def is_V1_verifiable_credential (context):
-    ContextUrlsInstance = ContextUrls()
-    return ContextUrlsInstance.verifiable_credential_v1() in context
+    return VC_V1_CONTEXT in context
 
 def is_V2_verifiable_credential (context):
-    ContextUrlsInstance = ContextUrls()
-    return ContextUrlsInstance.verifiable_credential_v2() in context
+    return VC_V2_CONTEXT in context
 
 
 def validate_url (url):
@@ -35,29 +91,23 @@ def validate_url (url):
     pass
 
 def validate_type (certificate_type):
-    compulsory_types = ['VerifiableCredential', 'VerifiablePresentation']
     if not isinstance(certificate_type, list):
         raise ValueError('`type` property must be an array')
 
-    contains_compulsory_types = list(set(compulsory_types) & set(certificate_type))
-    if len(certificate_type) == 0 or len(contains_compulsory_types) == 0:
+    if len(certificate_type) == 0 or COMPULSORY_TYPES.isdisjoint(certificate_type):
         raise ValueError('`type` property must be an array with at least `VerifiableCredential` or `VerifiablePresentation` value')
     pass
 
 def validate_context (context, type):
-    ContextUrlsInstance = ContextUrls()
-    vc_context_url = [ContextUrlsInstance.verifiable_credential_v1(), ContextUrlsInstance.verifiable_credential_v2()]
-    blockcerts_valid_context_url = ContextUrlsInstance.v3_all()
-
     if not isinstance(context, list):
         raise ValueError('`@context` property must be an array')
-    if context[0] not in vc_context_url:
-        raise ValueError('First @context declared must be one of {}, was given {}'.format(vc_context_url, context[0]))
+    if context[0] not in VC_CONTEXT_URLS:
+        raise ValueError('First @context declared must be one of {}, was given {}'.format(VC_CONTEXT_URLS, context[0]))
     if is_V1_verifiable_credential(context) and is_V2_verifiable_credential(context):
         raise ValueError('Cannot have both v1 and v2 Verifiable Credentials contexts defined in the context array')
     if len(type) > 1 and len(context) == 1:
         raise ValueError('A more specific type: {}, was detected, yet no context seems provided for that type'.format(type[1]))
-    if context[-1] not in blockcerts_valid_context_url:
+    if context[-1] not in BLOCKCERTS_CONTEXT_URLS:
         logging.warning("""
            Last `@context` is not blockcerts' context. It is not a critical issue but some issues have come up at times
            because of some properties of a different context overwriting blockcerts' taxonomy. Check this property
@@ -74,13 +124,10 @@ def validate_credential_subject (credential_subject, credential_schema):
     if not isinstance(credential_subject, list):
         credential_subject = [credential_subject]
 
+    resolver = get_schema_resolver()
     for schema in credential_schema:
-        schema_url = schema['id']
-        local_filename, headers = urlretrieve(schema_url)
-        with open(local_filename) as f:
-            schema = json.load(f)
-            for subject in credential_subject:
-                jsonschema_validate(subject, schema)
+        for subject in credential_subject:
+            resolver.validate(subject, schema['id'])
     pass
 
 
@@ -127,6 +174,11 @@ def validate_valid_until_date (certificate_valid_until_date):
     pass
 
 def validate_date_set_after_other_date(second_date, first_date, second_date_key, first_date_key):
+    # compared as instants, so that offsets and fractional seconds are taken into account
+    parsed_second_date = parse_RFC3339_date(second_date)
+    parsed_first_date = parse_RFC3339_date(first_date)
+    if parsed_second_date is not None and parsed_first_date is not None:
+        second_date, first_date = parsed_second_date, parsed_first_date
     if not second_date > first_date:
         raise ValueError('`{}` property must be a date set after `{}`'.format(second_date_key, first_date_key))
     pass
@@ -173,6 +225,34 @@ def validate_credential_schema (certificate_credential_schema):
             raise ValueError('credentialSchema.type must be a string of value: JsonSchema', schema['id'])
     pass
 
+# (property, required, property it must be set after) of the dates of each Verifiable Credentials version
+DATE_RULES = [
+    (VC_V1_CONTEXT, [
+        ('issuanceDate', True, None),
+        ('expirationDate', False, 'issuanceDate')
+    ]),
+    (VC_V2_CONTEXT, [
+        ('validFrom', False, None),
+        ('validUntil', False, 'validFrom')
+    ])
+]
+
+def validate_dates (certificate_metadata, date_rules):
+    for property_name, required, after_property_name in date_rules:
+        if property_name not in certificate_metadata:
+            if required:
+                raise ValueError('`{}` property must be defined'.format(property_name))
+            continue
+        validate_date_RFC3339_string_format(certificate_metadata[property_name], property_name)
+        if after_property_name in certificate_metadata:
+            validate_date_set_after_other_date(
+                certificate_metadata[property_name],
+                certificate_metadata[after_property_name],
+                property_name,
+                after_property_name
+            )
+    pass
+
 def verify_credential(certificate_metadata):
     try:
         # if undefined will throw KeyError
@@ -188,57 +268,10 @@ def verify_credential(certificate_metadata):
     except ValueError as err:
         raise ValueError(err)
 
-    if is_V1_verifiable_credential(certificate_metadata['@context']):
-        try:
-            # if undefined will throw KeyError
-            validate_issuance_date(certificate_metadata['issuanceDate'])
-        except KeyError:
-            raise ValueError('`issuanceDate` property must be defined')
-        except ValueError as err:
-            raise ValueError(err)
-
-        if 'expirationDate' in certificate_metadata:
-            try:
-                # if undefined will throw KeyError
-                validate_expiration_date(certificate_metadata['expirationDate'])
-                validate_date_set_after_other_date(
-                    certificate_metadata['expirationDate'],
-                    certificate_metadata['issuanceDate'],
-                    'expirationDate',
-                    'issuanceDate'
-                )
-            except KeyError:
-                # optional property
-                pass
-            except ValueError as err:
-                raise ValueError(err)
-
-    if is_V2_verifiable_credential(certificate_metadata['@context']):
-        try:
-            # if undefined will throw KeyError
-            validate_valid_from_date(certificate_metadata['validFrom'])
-        except KeyError:
-            # optional property
-            pass
-        except ValueError as err:
-            raise ValueError(err)
-
-        if 'validUntil' in certificate_metadata:
-            try:
-                # if undefined will throw KeyError
-                validate_valid_until_date(certificate_metadata['validUntil'])
-                if 'validFrom' in certificate_metadata:
-                    validate_date_set_after_other_date(
-                        certificate_metadata['validUntil'],
-                        certificate_metadata['validFrom'],
-                        'validUntil',
-                        'validFrom'
-                    )
-            except KeyError:
-                # optional property
-                pass
-            except ValueError as err:
-                raise ValueError(err)
+    context = certificate_metadata['@context']
+    for vc_context, date_rules in DATE_RULES:
+        if vc_context in context:
+            validate_dates(certificate_metadata, date_rules)
 
     try:
         # if undefined will throw KeyError
@@ -1,22 +1,122 @@
+import collections
+import copy
 import json
 import os
-from cert_schema import normalize_jsonld, extend_preloaded_context
+from concurrent.futures import ProcessPoolExecutor
+from cert_schema import normalize_jsonld, extend_preloaded_context, preloaded_context_document_loader
 
-from cert_issuer.config import CONFIG
+from cert_issuer import config
+
+# number of certificates sent to a worker at once, and number of chunks in flight per worker
+NORMALIZE_CHUNK_SIZE = 32
+NORMALIZE_CHUNKS_PER_WORKER = 2
+
+
+class ContextRegistry(object):
+    """
+    In-memory JSON-LD contexts used for normalization.
+
+    Configured custom contexts are read from disk once per process. Any other context is resolved once through
+    cert_schema (bundled with the library, or downloaded) and then served from memory.
+    """
+
+    def __init__(self):
+        self.contexts = {}
+        self.loaded_context_files = set()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, context_urls, context_file_paths):
+        if context_urls is None or context_file_paths is None:
+            return
+        for (url, path) in zip(context_urls, context_file_paths):
+            if (url, path) in self.loaded_context_files:
+                continue
+            with open(os.path.join(os.getcwd(), path)) as context_file:
+                context_data = json.load(context_file)
+            self.contexts[url] = context_data
+            # keep cert_schema aware of the context for callers using its own document loader
+            extend_preloaded_context(url, context_data)
+            self.loaded_context_files.add((url, path))
+
+    def document_loader(self, url, options=None):
+        if url in self.contexts:
+            self.hits += 1
+            return {
+                'contextUrl': None,
+                'documentUrl': url,
+                'document': self.contexts[url]
+            }
+        self.misses += 1
+        response = preloaded_context_document_loader(url)
+        self.contexts[url] = response['document']
+        return response
+
+
+CONTEXT_REGISTRY = ContextRegistry()
 
 
 class JSONLDHandler:
     @staticmethod
     def normalize_to_utf8(certificate_json):
         JSONLDHandler.preload_contexts()
-        normalized = normalize_jsonld(certificate_json, detect_unmapped_fields=True)
+        # detect_unmapped_fields appends a fallback @vocab to the certificate's own @context list; the certificate
+        # may be cached and written out with its proof afterwards, so it is normalized from a copy
+        normalized = normalize_jsonld(copy.deepcopy(certificate_json), document_loader=CONTEXT_REGISTRY.document_loader,
+                                      detect_unmapped_fields=True)
         return normalized.encode('utf-8')
 
+    @staticmethod
+    def normalize_batch_to_utf8(certificates_json, workers, context_urls=None, context_file_paths=None):
+        """
+        Normalizes certificates across a pool of worker processes. Yields the normalized certificates in the same
+        order as certificates_json, so the Merkle tree is the same as with serial normalization.
+
+        Certificates are consumed in chunks and only a bounded number of chunks are in flight at any time.
+        :param certificates_json: iterable of certificates
+        :param workers: number of worker processes
+        :param context_urls: custom contexts to preload in the workers
+        :param context_file_paths: local files of the custom contexts
+        :return:
+        """
+        if workers <= 1:
+            for certificate_json in certificates_json:
+                yield JSONLDHandler.normalize_to_utf8(certificate_json)
+            return
+
+        max_in_flight = workers * NORMALIZE_CHUNKS_PER_WORKER
+        in_flight = collections.deque()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=JSONLDHandler.load_contexts,
+                                 initargs=(context_urls, context_file_paths)) as executor:
+            for chunk in _chunks(certificates_json, NORMALIZE_CHUNK_SIZE):
+                if len(in_flight) >= max_in_flight:
+                    yield from in_flight.popleft().result()
+                in_flight.append(executor.submit(_normalize_chunk, chunk))
+            while in_flight:
+                yield from in_flight.popleft().result()
+
     @staticmethod
     def preload_contexts():
-        if CONFIG is None or CONFIG.context_urls is None or CONFIG.context_file_paths is None:
+        if config.CONFIG is None:
             return
-        for (url, path) in zip(CONFIG.context_urls, CONFIG.context_file_paths):
-            with open(os.path.join(os.getcwd(), path)) as context_file:
-                context_data = json.load(context_file)
-                extend_preloaded_context(url, context_data)
+        JSONLDHandler.load_contexts(config.CONFIG.context_urls, config.CONFIG.context_file_paths)
+
+    @staticmethod
+    def load_contexts(context_urls, context_file_paths):
+        CONTEXT_REGISTRY.load(context_urls, context_file_paths)
+
+
+def _normalize_chunk(certificates_json):
+    return [JSONLDHandler.normalize_to_utf8(certificate_json) for certificate_json in certificates_json]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -1,9 +1,8 @@
 import logging
 import os
+import threading
 import time
 
-import requests
-
 from cert_issuer.models import SecretManager
 
 
@@ -34,18 +33,30 @@ class FileSecretManager(SecretManager):
                 ' ensure this is what you want, since this is less secure')
 
 
+# a batch prepared in the background must not start or stop the secret manager while a transaction is being signed
+_signer_lock = threading.RLock()
+
+
 class FinalizableSigner(object):
     def __init__(self, secret_manager):
         self.secret_manager = secret_manager
 
     def __enter__(self):
+        _signer_lock.acquire()
         logging.info('Starting finalizable signer')
-        self.secret_manager.start()
+        try:
+            self.secret_manager.start()
+        except BaseException:
+            _signer_lock.release()
+            raise
         return self.secret_manager
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         logging.info('Stopping finalizable signer')
-        self.secret_manager.stop()
+        try:
+            self.secret_manager.stop()
+        finally:
+            _signer_lock.release()
 
 
 def import_key(secrets_file_path):
@@ -56,6 +67,7 @@ def import_key(secrets_file_path):
 
 def internet_on():
     """Pings Google to see if the internet is on. If online, returns true. If offline, returns false."""
+    import requests
     try:
         requests.get('http://google.com')
         return True
@@ -85,7 +85,6 @@ max_priority_fee_per_gas=0
 gas_price_dynamic=false
 
 # Certificate settings
-batch_size=1
 safe_mode=true
 
 # File paths
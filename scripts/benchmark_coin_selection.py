@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Replays consecutive issuing transactions over a synthetic set of unspent outputs, selecting the inputs of each with
+CoinSelector and with the previous selection (shuffle, then take outputs until they cover the cost estimated for
+ESTIMATE_NUM_INPUTS inputs). Each transaction's change is added back to the set, as the UTXO cache does.
+
+Reports selection time, fees paid, inputs per transaction and the unspent outputs left.
+
+usage: python scripts/benchmark_coin_selection.py [--utxos 10000 50000] [--transactions 200] [--satoshi_per_byte 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycoin.coins.bitcoin.Spendable import Spendable
+
+from cert_issuer.blockchain_handlers.bitcoin import BitcoinTransactionCostConstants, tx_utils
+from cert_issuer.blockchain_handlers.bitcoin.coin_selection import CoinSelector
+from cert_issuer.config import ESTIMATE_NUM_INPUTS, V2_NUM_OUTPUTS
+
+SCRIPT = b'\x76\xa9\x14' + b'\x01' * 20 + b'\x88\xac'
+
+
+def synthetic_utxos(count, seed):
+    """
+    Mostly small outputs (as left by earlier issuing), and a few large ones (top ups), in satoshis
+    """
+    rng = random.Random(seed)
+    utxos = []
+    for index in range(count):
+        value = int(rng.lognormvariate(10, 1.5)) + 1
+        utxos.append(Spendable(value, SCRIPT, index.to_bytes(32, 'big'), 0))
+    return utxos
+
+
+def select_shuffled(cost_constants, spendables, rng):
+    cost = tx_utils.calculate_tx_fee(cost_constants, ESTIMATE_NUM_INPUTS, V2_NUM_OUTPUTS)
+    spendables = list(spendables)
+    rng.shuffle(spendables)
+    inputs = []
+    total = 0
+    for spendable in spendables:
+        inputs.append(spendable)
+        total += spendable.coin_value
+        if total > cost:
+            break
+    if total < tx_utils.calculate_tx_fee(cost_constants, len(inputs), V2_NUM_OUTPUTS):
+        return None
+    return inputs
+
+
+def replay(name, select, cost_constants, utxos, transactions):
+    utxos = dict(((s.tx_hash, s.tx_out_index), s) for s in utxos)
+    selection_time = 0
+    fees = 0
+    inputs_count = 0
+    issued = 0
+    for number in range(transactions):
+        start = time.perf_counter()
+        inputs = select(list(utxos.values()))
+        selection_time += time.perf_counter() - start
+        if not inputs:
+            break
+        value_in = sum(s.coin_value for s in inputs)
+        fee = tx_utils.calculate_tx_fee(cost_constants, len(inputs), V2_NUM_OUTPUTS)
+        change = value_in - fee
+        if change < cost_constants.get_minimum_output_coin():
+            fee, change = value_in, 0
+        for s in inputs:
+            del utxos[(s.tx_hash, s.tx_out_index)]
+        if change > 0:
+            change_tx_hash = (10 ** 9 + number).to_bytes(32, 'big')
+            utxos[(change_tx_hash, 0)] = Spendable(change, SCRIPT, change_tx_hash, 0)
+        fees += fee
+        inputs_count += len(inputs)
+        issued += 1
+
+    print('{:>12} {:>8} {:>14.2f} {:>14.0f} {:>10.2f} {:>10}'.format(
+        name, issued, selection_time * 1000 / max(issued, 1), fees / max(issued, 1), inputs_count / max(issued, 1),
+        len(utxos)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--utxos', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--transactions', type=int, default=200)
+    parser.add_argument('--satoshi_per_byte', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    cost_constants = BitcoinTransactionCostConstants(recommended_tx_fee=0, satoshi_per_byte=args.satoshi_per_byte)
+    selector = CoinSelector(cost_constants, seed=args.seed)
+    shuffle_rng = random.Random(args.seed)
+    for count in args.utxos:
+        print('{} unspent outputs, {} satoshis per byte'.format(count, args.satoshi_per_byte))
+        print('{:>12} {:>8} {:>14} {:>14} {:>10} {:>10}'.format(
+            'selection', 'txs', 'ms/selection', 'fee/tx (sat)', 'inputs/tx', 'utxos left'))
+        utxos = synthetic_utxos(count, args.seed)
+        replay('shuffle', lambda spendables: select_shuffled(cost_constants, spendables, shuffle_rng),
+               cost_constants, utxos, args.transactions)
+        replay('coin select', selector.select, cost_constants, utxos, args.transactions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compares the per-certificate normalization cost of re-reading the custom JSON-LD contexts for every certificate
+(previous behaviour) against the in-process context registry.
+
+usage: python scripts/benchmark_context_preload.py [--certificates 200] [--contexts 5]
+"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cert_schema import normalize_jsonld, extend_preloaded_context
+
+from cert_issuer.normalization_handler import JSONLDHandler, CONTEXT_REGISTRY
+
+CREDENTIAL = {
+    '@context': [
+        'https://www.w3.org/2018/credentials/v1',
+        'https://w3id.org/blockcerts/v3'
+    ],
+    'id': 'urn:uuid:bbba8553-8ec1-445f-82c9-a57251dd731c',
+    'type': ['VerifiableCredential', 'BlockcertsCredential'],
+    'issuer': 'https://www.blockcerts.org/samples/3.0/issuer-blockcerts.json',
+    'issuanceDate': '2022-08-18T14:04:24Z',
+    'credentialSubject': {
+        'id': 'did:example:ebfeb1f712ebc6f1c276e12ec21'
+    }
+}
+
+
+def write_contexts(context_dir, num_contexts):
+    urls = []
+    paths = []
+    for i in range(num_contexts):
+        url = 'https://example.com/contexts/{}.json'.format(i)
+        path = os.path.join(context_dir, 'context_{}.json'.format(i))
+        terms = {'field{}_{}'.format(i, t): 'https://example.com/vocab#field{}_{}'.format(i, t) for t in range(200)}
+        with open(path, 'w') as context_file:
+            json.dump({'@context': terms}, context_file)
+        urls.append(url)
+        paths.append(path)
+    return urls, paths
+
+
+def make_certificates(urls, count):
+    for n in range(count):
+        certificate = copy.deepcopy(CREDENTIAL)
+        certificate['@context'] = certificate['@context'][:1] + urls + certificate['@context'][1:]
+        for i in range(len(urls)):
+            certificate['credentialSubject']['field{}_0'.format(i)] = 'value {}'.format(n)
+        yield certificate
+
+
+def legacy_normalize(certificate_json, urls, paths):
+    for (url, path) in zip(urls, paths):
+        with open(path) as context_file:
+            extend_preloaded_context(url, json.load(context_file))
+    return normalize_jsonld(certificate_json, detect_unmapped_fields=True).encode('utf-8')
+
+
+def run(label, certificates, normalize):
+    start = time.perf_counter()
+    for certificate in certificates:
+        normalize(certificate)
+    elapsed = time.perf_counter() - start
+    print('{:<10} {:>8.3f} ms/certificate'.format(label, elapsed * 1000 / len(certificates)))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--certificates', type=int, default=200)
+    parser.add_argument('--contexts', type=int, default=5)
+    args = parser.parse_args()
+
+    context_dir = tempfile.mkdtemp()
+    try:
+        urls, paths = write_contexts(context_dir, args.contexts)
+        certificates = list(make_certificates(urls, args.certificates))
+        print('{} certificates, {} custom contexts'.format(args.certificates, args.contexts))
+
+        before = run('legacy', certificates, lambda c: legacy_normalize(c, urls, paths))
+        JSONLDHandler.load_contexts(urls, paths)
+        after = run('registry', certificates, JSONLDHandler.normalize_to_utf8)
+        print('speedup    {:>8.2f}x'.format(before / after))
+        print('registry hits={} misses={}'.format(CONTEXT_REGISTRY.hits, CONTEXT_REGISTRY.misses))
+    finally:
+        shutil.rmtree(context_dir)
+
+
+if __name__ == '__main__':
+    main()
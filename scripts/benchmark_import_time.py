@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measures the cold start imports of issuing on the mock chain with python -X importtime, and fails if they take longer
+than the budget or pull in a blockchain library the mock chain does not need.
+
+Each run is a fresh interpreter; the fastest run is reported, to leave out noise from the machine.
+
+usage: python scripts/benchmark_import_time.py [--budget 350] [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what cert-issuer imports before issuing on the mock chain
+MOCKCHAIN_MODULES = [
+    'cert_issuer.config',
+    'cert_issuer.issue_certificates',
+    'cert_issuer.blockchain_handlers.bitcoin'
+]
+
+# only needed to issue on a real chain
+FORBIDDEN_MODULES = [
+    'web3',
+    'bitcoin.rpc',
+    'bitcoin.wallet',
+    'pycoin.coins.bitcoin.Tx',
+    'pycoin.services.providers'
+]
+
+
+def measure_imports():
+    """
+    :return: list of (module, self microseconds, cumulative microseconds), in import order
+    """
+    code = '; '.join('import ' + module for module in MOCKCHAIN_MODULES)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        imports.append((module.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=float, default=350, help='maximum cold start import time, in milliseconds')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='number of slowest modules to list')
+    args = parser.parse_args()
+
+    runs = [measure_imports() for _ in range(args.runs)]
+    # every module shows up once, so the sum of self times is the total import time
+    totals = [sum(self_us for _, self_us, _ in imports) / 1000 for imports in runs]
+    fastest = runs[totals.index(min(totals))]
+
+    print('{:>10} {:>12}  {}'.format('self (ms)', 'cumul. (ms)', 'module'))
+    for module, self_us, cumulative_us in sorted(fastest, key=lambda i: -i[1])[:args.top]:
+        print('{:>10.1f} {:>12.1f}  {}'.format(self_us / 1000, cumulative_us / 1000, module))
+    print('total import time: {:.1f} ms (fastest of {} runs), budget: {:.1f} ms'.format(min(totals), args.runs,
+                                                                                    args.budget))
+
+    failed = False
+    imported = set(module for module, _, _ in fastest)
+    for module in FORBIDDEN_MODULES:
+        if module in imported:
+            print('{} is imported on the mock chain'.format(module))
+            failed = True
+    if min(totals) > args.budget:
+        print('Import time is over budget')
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compares build time and peak memory of cert_issuer.merkle_tree.MerkleTree against blockcerts-merkletools, fed the
+way MerkleTreeGenerator feeds each of them (raw digests vs hex digests).
+
+blockcerts-merkletools is no longer a dependency of cert-issuer; install it to get the comparison.
+
+usage: python scripts/benchmark_merkle_tree.py [--leaves 1000 100000 1000000]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cert_issuer.merkle_tree import MerkleTree
+
+try:
+    from blockcerts_merkletools import MerkleTools
+except ImportError:
+    MerkleTools = None
+
+
+def leaf_data(count):
+    for i in range(count):
+        yield str(i).encode('utf-8')
+
+
+def build_native(count):
+    tree = MerkleTree()
+    for data in leaf_data(count):
+        tree.add_leaf(hashlib.sha256(data).digest())
+    tree.make_tree()
+    return tree.get_root().hex()
+
+
+def build_merkletools(count):
+    tree = MerkleTools(hash_type='sha256')
+    for data in leaf_data(count):
+        tree.add_leaf(hashlib.sha256(data).hexdigest())
+    tree.make_tree()
+    return tree.get_merkle_root()
+
+
+def measure(build, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    root = build(count)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return root, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--leaves', type=int, nargs='+', default=[1000, 100000, 1000000])
+    args = parser.parse_args()
+
+    if MerkleTools is None:
+        print('blockcerts-merkletools is not installed, only measuring MerkleTree')
+
+    print('{:>10} {:>12} {:>10} {:>12} {:>12}'.format('leaves', 'engine', 'time (s)', 'peak (MB)', 'root'))
+    for count in args.leaves:
+        engines = [('native', build_native)]
+        if MerkleTools is not None:
+            engines.append(('merkletools', build_merkletools))
+        roots = set()
+        for name, build in engines:
+            root, elapsed, peak = measure(build, count)
+            roots.add(root)
+            print('{:>10} {:>12} {:>10.3f} {:>12.1f} {:>12}'.format(count, name, elapsed, peak / 2 ** 20, root[:10]))
+        if len(roots) != 1:
+            raise Exception('Merkle roots differ for {} leaves'.format(count))
+
+
+if __name__ == '__main__':
+    main()
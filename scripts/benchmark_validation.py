@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Measures how many certificates per second CertificateV3Handler.validate_certificate checks, on the credentials and
+presentation of the tests/v3_certificate_validation integration tests.
+
+credentialSchema is left out of the fixtures: resolving the schema is cached after the first certificate, and would
+need the network here.
+
+usage: python scripts/benchmark_validation.py [--certificates 20000]
+"""
+import argparse
+import copy
+import importlib.util
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from cert_issuer.certificate_handlers import CertificateV3Handler
+
+FIXTURES_DIR = os.path.join(ROOT_DIR, 'tests', 'v3_certificate_validation')
+FIXTURES = [
+    ('vc v1', 'test_integration_verify_credential_vc_v1.py', 'credential_example'),
+    ('vc v2', 'test_integration_verify_credential_vc_v2.py', 'credential_example'),
+    ('presentation', 'test_integration_verify_presentation.py', 'presentation_example')
+]
+
+
+def load_fixture(file_name, name):
+    spec = importlib.util.spec_from_file_location(os.path.splitext(file_name)[0],
+                                                  os.path.join(FIXTURES_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return without_schema(copy.deepcopy(getattr(module, name)))
+
+
+def without_schema(certificate):
+    certificate.pop('credentialSchema', None)
+    for credential in certificate.get('verifiableCredential', []):
+        credential.pop('credentialSchema', None)
+    return certificate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--certificates', type=int, default=20000)
+    args = parser.parse_args()
+
+    handler = CertificateV3Handler(argparse.Namespace())
+    print('{:>14} {:>10} {:>16}'.format('fixture', 'time (s)', 'certificates/s'))
+    for label, file_name, name in FIXTURES:
+        certificate = load_fixture(file_name, name)
+        # warm up
+        handler.validate_certificate(certificate)
+        start = time.perf_counter()
+        for _ in range(args.certificates):
+            handler.validate_certificate(certificate)
+        elapsed = time.perf_counter() - start
+        print('{:>14} {:>10.3f} {:>16.0f}'.format(label, elapsed, args.certificates / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import io
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+from email.message import Message
+from urllib.error import HTTPError, URLError
+
+import mock
+from jsonschema.exceptions import ValidationError
+
+from cert_issuer.models import verifiable_credential
+from cert_issuer.models.schema_resolver import SchemaResolver
+
+SCHEMA_URL = 'https://example.com/schema.json'
+SCHEMA = {
+    '$schema': 'http://json-schema.org/draft-07/schema#',
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string'}
+    },
+    'required': ['name']
+}
+
+
+class MockResponse(io.BytesIO):
+    def __init__(self, content, etag=None):
+        super().__init__(json.dumps(content).encode('utf-8'))
+        self.headers = Message()
+        if etag:
+            self.headers['ETag'] = etag
+
+
+class TestSchemaResolver(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_downloads_and_compiles_once(self, mock_urlopen):
+        mock_urlopen.return_value = MockResponse(SCHEMA)
+        resolver = SchemaResolver()
+        for i in range(10):
+            resolver.validate({'name': 'John {}'.format(i)}, SCHEMA_URL)
+        self.assertEqual(mock_urlopen.call_count, 1)
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_invalid_subject(self, mock_urlopen):
+        mock_urlopen.return_value = MockResponse(SCHEMA)
+        resolver = SchemaResolver()
+        with self.assertRaises(ValidationError):
+            resolver.validate({'name': 1}, SCHEMA_URL)
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_local_mirror(self, mock_urlopen):
+        mirror_path = os.path.join(self.tmp_dir, 'schema.json')
+        with open(mirror_path, 'w') as mirror_file:
+            json.dump(SCHEMA, mirror_file)
+        resolver = SchemaResolver(mirrors={SCHEMA_URL: mirror_path})
+        resolver.validate({'name': 'John'}, SCHEMA_URL)
+        mock_urlopen.assert_not_called()
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_disk_cache_revalidated_with_etag(self, mock_urlopen):
+        mock_urlopen.return_value = MockResponse(SCHEMA, etag='"v1"')
+        SchemaResolver(cache_dir=self.tmp_dir).validate({'name': 'John'}, SCHEMA_URL)
+
+        mock_urlopen.side_effect = HTTPError(SCHEMA_URL, 304, 'Not Modified', Message(), None)
+        SchemaResolver(cache_dir=self.tmp_dir).validate({'name': 'John'}, SCHEMA_URL)
+        request = mock_urlopen.call_args[0][0]
+        self.assertEqual(request.get_header('If-none-match'), '"v1"')
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_disk_cache_used_offline(self, mock_urlopen):
+        mock_urlopen.return_value = MockResponse(SCHEMA)
+        SchemaResolver(cache_dir=self.tmp_dir).validate({'name': 'John'}, SCHEMA_URL)
+
+        mock_urlopen.side_effect = URLError('offline')
+        with self.assertRaises(ValidationError):
+            SchemaResolver(cache_dir=self.tmp_dir).validate({}, SCHEMA_URL)
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_timeout(self, mock_urlopen):
+        mock_urlopen.return_value = MockResponse(SCHEMA)
+        SchemaResolver(timeout=7).validate({'name': 'John'}, SCHEMA_URL)
+        self.assertEqual(mock_urlopen.call_args[1]['timeout'], 7)
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_disk_cache_used_on_timeout(self, mock_urlopen):
+        mock_urlopen.return_value = MockResponse(SCHEMA)
+        SchemaResolver(cache_dir=self.tmp_dir).validate({'name': 'John'}, SCHEMA_URL)
+
+        mock_urlopen.side_effect = socket.timeout('timed out')
+        with self.assertRaises(ValidationError):
+            SchemaResolver(cache_dir=self.tmp_dir).validate({}, SCHEMA_URL)
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_offline_without_cache(self, mock_urlopen):
+        mock_urlopen.side_effect = URLError('offline')
+        with self.assertRaises(URLError):
+            SchemaResolver().validate({'name': 'John'}, SCHEMA_URL)
+
+    @mock.patch('cert_issuer.models.schema_resolver.urlopen')
+    def test_lru_bound(self, mock_urlopen):
+        mock_urlopen.side_effect = lambda request, timeout: MockResponse(SCHEMA)
+        resolver = SchemaResolver(max_schemas=2)
+        for url in ['https://example.com/1', 'https://example.com/2', 'https://example.com/3']:
+            resolver.get_validator(url)
+        self.assertEqual(list(resolver.validators), ['https://example.com/2', 'https://example.com/3'])
+
+    def test_resolver_follows_config(self):
+        first_config = mock.Mock(schema_cache_dir=None, schema_urls=None, http_read_timeout=10)
+        with mock.patch('cert_issuer.config.CONFIG', first_config):
+            resolver = verifiable_credential.get_schema_resolver()
+            self.assertIs(verifiable_credential.get_schema_resolver(), resolver)
+            self.assertEqual(resolver.timeout, 10)
+
+        # a config loaded later is used
+        second_config = mock.Mock(schema_cache_dir=self.tmp_dir, schema_urls=None, http_read_timeout=None)
+        with mock.patch('cert_issuer.config.CONFIG', second_config):
+            resolver = verifiable_credential.get_schema_resolver()
+            self.assertEqual(resolver.cache_dir, self.tmp_dir)
+            self.assertEqual(resolver.timeout, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import unittest
+
+import mock
+from mock import patch
+
+from cert_issuer import asgi
+from cert_issuer.asgi import BatchCoalescer, IssuanceApp
+
+
+def call_app(app, method, path, body):
+    messages = [{'type': 'http.request', 'body': body[:1], 'more_body': True},
+                {'type': 'http.request', 'body': body[1:], 'more_body': False}]
+    response = {}
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'] = json.loads(message['body'].decode('utf-8'))
+
+    async def run():
+        await app({'type': 'http', 'method': method, 'path': path}, receive, send)
+        return response['status'], response['body']
+
+    return run()
+
+
+class TestBatchCoalescer(unittest.TestCase):
+    def test_coalesces_requests_in_window(self):
+        batches = []
+
+        def issue_batch(certificates):
+            batches.append(certificates)
+            return [certificate + '-issued' for certificate in certificates]
+
+        async def run():
+            coalescer = BatchCoalescer(issue_batch, window=0.05)
+            return await asyncio.gather(coalescer.issue(['a', 'b']), coalescer.issue(['c']))
+
+        self.assertEqual(asyncio.run(run()), [['a-issued', 'b-issued'], ['c-issued']])
+        self.assertEqual(batches, [['a', 'b', 'c']])
+
+    def test_flushes_at_max_batch_size(self):
+        batches = []
+
+        def issue_batch(certificates):
+            batches.append(certificates)
+            return certificates
+
+        async def run():
+            coalescer = BatchCoalescer(issue_batch, window=60, max_batch_size=2)
+            return await asyncio.wait_for(asyncio.gather(coalescer.issue(['a']), coalescer.issue(['b'])), 5)
+
+        self.assertEqual(asyncio.run(run()), [['a'], ['b']])
+        self.assertEqual(batches, [['a', 'b']])
+
+    def test_failure_reaches_every_caller(self):
+        def issue_batch(certificates):
+            raise Exception('broadcast failed')
+
+        async def run():
+            coalescer = BatchCoalescer(issue_batch, window=0.01)
+            return await asyncio.gather(coalescer.issue(['a']), coalescer.issue(['b']), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertEqual([str(result) for result in results], ['broadcast failed', 'broadcast failed'])
+
+
+class TestIssuanceApp(unittest.TestCase):
+    def setUp(self):
+        self.certificate_batch_handler = mock.Mock()
+        self.config = mock.Mock(web_batch_window=0.05, web_max_batch_size=100)
+        self.app = IssuanceApp(self.config, self.certificate_batch_handler, mock.Mock())
+
+    def mock_issue(self, app_config, certificate_batch_handler, transaction_handler):
+        self.assertIsNone(app_config.batch_size)
+        certificates = certificate_batch_handler.set_certificates_in_batch.call_args[0][0]
+        certificate_batch_handler.proof = [dict(certificate, proof='proof') for certificate in certificates]
+        return 'txid'
+
+    def test_concurrent_requests_share_a_transaction(self):
+        async def run():
+            return await asyncio.gather(
+                call_app(self.app, 'POST', '/issue', json.dumps([{'id': 1}, {'id': 2}]).encode('utf-8')),
+                call_app(self.app, 'POST', '/issue', json.dumps([{'id': 3}]).encode('utf-8')))
+
+        with patch.object(asgi.issue_certificates, 'issue', side_effect=self.mock_issue) as mock_issue:
+            responses = asyncio.run(run())
+        self.assertEqual(mock_issue.call_count, 1)
+        self.assertEqual(responses, [(200, [{'id': 1, 'proof': 'proof'}, {'id': 2, 'proof': 'proof'}]),
+                                     (200, [{'id': 3, 'proof': 'proof'}])])
+
+    def test_invalid_certificate_refused_alone(self):
+        self.certificate_batch_handler.certificate_handler.validate_certificate.side_effect = \
+            ValueError('`type` property must be an array')
+        status, body = asyncio.run(call_app(self.app, 'POST', '/issue', b'[{"id": 1}]'))
+        self.assertEqual(status, 400)
+        self.assertEqual(body, {'error': '`type` property must be an array'})
+
+    def test_metrics(self):
+        with patch.object(asgi.issue_certificates, 'issue', side_effect=self.mock_issue):
+            asyncio.run(call_app(self.app, 'POST', '/issue', b'[{"id": 1}]'))
+        status, body = asyncio.run(call_app(self.app, 'GET', '/metrics', b''))
+        self.assertEqual(status, 200)
+        self.assertEqual(body['batches']['batches'], 1)
+        self.assertEqual(body['batches']['certificates'], 1)
+        self.assertIn('providers', body)
+
+    def test_bad_requests(self):
+        self.assertEqual(asyncio.run(call_app(self.app, 'POST', '/issue', b'{"id": 1}'))[0], 400)
+        self.assertEqual(asyncio.run(call_app(self.app, 'POST', '/issue', b'not json'))[0], 400)
+        self.assertEqual(asyncio.run(call_app(self.app, 'GET', '/issue', b''))[0], 405)
+        self.assertEqual(asyncio.run(call_app(self.app, 'POST', '/other', b'[]'))[0], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from cert_issuer.certificate_cache import ParsedCertificateCache
+
+
+def get_metadata(uid):
+    metadata = mock.Mock()
+    metadata.uid = uid
+    return metadata
+
+
+class TestParsedCertificateCache(unittest.TestCase):
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp()
+        self.loader = mock.Mock(side_effect=lambda metadata: {'id': metadata.uid})
+
+    def tearDown(self):
+        shutil.rmtree(self.spill_dir)
+
+    def test_parses_each_certificate_once(self):
+        cache = ParsedCertificateCache(self.loader)
+        metadatas = [get_metadata(str(i)) for i in range(3)]
+        for _ in range(3):
+            for metadata in metadatas:
+                self.assertEqual(cache.get(metadata), {'id': metadata.uid})
+        self.assertEqual(self.loader.call_count, 3)
+        self.assertEqual(cache.loads, 3)
+
+    def test_spills_past_max_in_memory(self):
+        cache = ParsedCertificateCache(self.loader, max_in_memory=2, spill_dir=self.spill_dir)
+        metadatas = [get_metadata(str(i)) for i in range(5)]
+        for _ in range(2):
+            for metadata in metadatas:
+                self.assertEqual(cache.get(metadata), {'id': metadata.uid})
+        self.assertEqual(self.loader.call_count, 5)
+        self.assertEqual(len(cache.records), 2)
+        self.assertEqual(sorted(os.listdir(self.spill_dir)), ['2.pickle', '3.pickle', '4.pickle'])
+
+    def test_without_spill_dir_reloads(self):
+        cache = ParsedCertificateCache(self.loader, max_in_memory=1)
+        metadatas = [get_metadata(str(i)) for i in range(2)]
+        for _ in range(2):
+            for metadata in metadatas:
+                cache.get(metadata)
+        self.assertEqual(self.loader.call_count, 3)
+
+    def test_discard(self):
+        cache = ParsedCertificateCache(self.loader, max_in_memory=1, spill_dir=self.spill_dir)
+        first = get_metadata('1')
+        second = get_metadata('2')
+        cache.get(first)
+        cache.get(second)
+        cache.discard(first)
+        cache.discard(second)
+        self.assertEqual(cache.records, {})
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+        cache.get(first)
+        self.assertEqual(self.loader.call_count, 3)
+
+    def test_clear(self):
+        cache = ParsedCertificateCache(self.loader, max_in_memory=1, spill_dir=self.spill_dir)
+        cache.get(get_metadata('1'))
+        cache.get(get_metadata('2'))
+        cache.clear()
+        self.assertEqual(cache.records, {})
+        self.assertEqual(cache.loads, 0)
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,8 @@
+import collections
+import json
+import os
+import shutil
+import tempfile
 import unittest
 
 import mock
@@ -5,9 +10,14 @@ import builtins
 from pycoin.encoding.hexbytes import b2h
 from mock import patch
 
-from cert_issuer.certificate_handlers import CertificateWebV3Handler, CertificateV3Handler, CertificateBatchHandler, CertificateHandler, CertificateBatchWebHandler
+from cert_issuer.certificate_handlers import CertificateWebV3Handler, CertificateV3Handler, CertificateBatchHandler, CertificateHandler, CertificateBatchWebHandler, CertificateBatchJSONLHandler
+from cert_issuer.issuer import Issuer
+from cert_issuer.proof_handler import ProofHandler
+from cert_issuer import jsonl
+from cert_issuer.models import MockTransactionHandler
 from cert_issuer.merkle_tree_generator import MerkleTreeGenerator
 from cert_issuer import helpers
+from cert_issuer import issue_certificates
 from cert_core import Chain
 from mock import ANY
 
@@ -34,7 +44,7 @@ class TestCertificateHandler(unittest.TestCase):
 
         return Mock_App_Config()
 
-    def _helper_mock_call(self, *args):
+    def _helper_mock_call(self, *args, **kwargs):
         helper_mock = mock.MagicMock()
         helper_mock.__len__.return_value = self.directory_count
 
@@ -143,11 +153,8 @@ class TestCertificateHandler(unittest.TestCase):
         config.blockchain_certificates_dir = '/blockchain_certificates_dir'
         config.work_dir = '/work_dir'
 
-        helpers.prepare_issuance_batch = mock.MagicMock()
-
-        helpers.prepare_issuance_batch.side_effect = self._helper_mock_call
-
-        with patch.object(CertificateBatchHandler, 'set_certificates_in_batch') as mock_method:
+        with patch.object(helpers, 'prepare_issuance_batch', side_effect=self._helper_mock_call), \
+                patch.object(CertificateBatchHandler, 'set_certificates_in_batch') as mock_method:
             certificate_batch_handler, _ = self._get_certificate_batch_handler()
             certificate_batch_handler.pre_batch_actions(config)
 
@@ -162,16 +169,160 @@ class TestCertificateHandler(unittest.TestCase):
         config.blockchain_certificates_dir = '/blockchain_certificates_dir'
         config.work_dir = '/work_dir'
 
-        helpers.prepare_issuance_batch = mock.MagicMock()
-
-        helpers.prepare_issuance_batch.side_effect = self._helper_mock_call
-
-        with patch.object(CertificateBatchHandler, 'set_certificates_in_batch') as mock_method:
+        with patch.object(helpers, 'prepare_issuance_batch', side_effect=self._helper_mock_call), \
+                patch.object(CertificateBatchHandler, 'set_certificates_in_batch') as mock_method:
             certificate_batch_handler, _ = self._get_certificate_batch_handler()
             certificate_batch_handler.pre_batch_actions(config)
 
         assert not mock_method.called
 
+    def test_get_sub_batches(self):
+        certificate_batch_handler, certificates_to_issue = self._get_certificate_batch_handler()
+        certificate_batch_handler.set_certificates_in_batch(collections.OrderedDict(sorted(certificates_to_issue.items())))
+
+        sub_batches = list(certificate_batch_handler.get_sub_batches(2))
+
+        self.assertEqual([list(sub_batch.certificates_to_issue) for sub_batch in sub_batches], [['1', '2'], ['3']])
+        self.assertIsNot(sub_batches[0].merkle_tree, sub_batches[1].merkle_tree)
+        self.assertIsNot(sub_batches[0].merkle_tree, certificate_batch_handler.merkle_tree)
+        self.assertTrue(all(sub_batch.is_sub_batch for sub_batch in sub_batches))
+        self.assertEqual(len(certificate_batch_handler.certificates_to_issue), 3)
+
+    def test_sub_batches_own_parsed_certificates(self):
+        certificate_batch_handler, certificates_to_issue = self._get_certificate_batch_handler()
+        certificate_batch_handler.certificate_handler = CertificateV3Handler(self._mock_app_config())
+        certificate_batch_handler.set_certificates_in_batch(collections.OrderedDict(sorted(certificates_to_issue.items())))
+
+        sub_batches = list(certificate_batch_handler.get_sub_batches(2))
+
+        caches = [sub_batch.certificate_handler.parsed_certificates for sub_batch in sub_batches]
+        self.assertIsNot(caches[0], caches[1])
+        self.assertIsNot(caches[0], certificate_batch_handler.certificate_handler.parsed_certificates)
+
+    def test_resume_from_batch_checkpoint(self):
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+
+        certificates_metadata = collections.OrderedDict()
+        for uid in ['1', '2', '3']:
+            certificates_metadata[uid] = helpers.CertificateMetadata(
+                uid, work_dir, work_dir, work_dir, os.path.join(work_dir, 'final'))
+        os.makedirs(os.path.join(work_dir, 'final'))
+        with open(certificates_metadata['1'].final_blockchain_cert_file_name, 'w') as final_file:
+            final_file.write('{}')
+        # '2' was checkpointed but its output is missing, so it is issued again
+        helpers.append_batch_checkpoint(work_dir, 'tx1', ['1', '2'])
+
+        config = mock.Mock()
+        config.work_dir = work_dir
+
+        certificate_batch_handler, _ = self._get_certificate_batch_handler()
+        with patch.object(helpers, 'prepare_issuance_batch', return_value=certificates_metadata):
+            certificate_batch_handler.pre_batch_actions(config)
+        self.assertEqual(list(certificate_batch_handler.certificates_to_issue), ['2', '3'])
+
+        certificate_batch_handler.complete_batches(config)
+        self.assertEqual(helpers.read_batch_checkpoint(work_dir), {})
+
+    def test_resume_with_every_certificate_issued(self):
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+
+        certificates_metadata = collections.OrderedDict()
+        for uid in ['1', '2', '3']:
+            certificates_metadata[uid] = helpers.CertificateMetadata(
+                uid, work_dir, work_dir, work_dir, os.path.join(work_dir, 'final'))
+        os.makedirs(os.path.join(work_dir, 'final'))
+        for metadata in certificates_metadata.values():
+            with open(metadata.final_blockchain_cert_file_name, 'w') as final_file:
+                final_file.write('{}')
+        # stopped after the last batch was checkpointed
+        helpers.append_batch_checkpoint(work_dir, 'tx1', ['1', '2'])
+        helpers.append_batch_checkpoint(work_dir, 'tx2', ['3'])
+
+        config = mock.Mock()
+        config.work_dir = work_dir
+        config.batch_size = 2
+        transaction_handler = mock.Mock()
+
+        certificate_batch_handler, _ = self._get_certificate_batch_handler()
+        with patch.object(helpers, 'prepare_issuance_batch', return_value=certificates_metadata):
+            tx_ids = issue_certificates.issue(config, certificate_batch_handler, transaction_handler)
+        self.assertEqual(tx_ids, ['tx1', 'tx2'])
+        transaction_handler.issue_transaction.assert_not_called()
+        self.assertEqual(helpers.read_batch_checkpoint(work_dir), {})
+
+    def _issue_jsonl(self, batch_size=None):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        unsigned_certificates_file = os.path.join(tmp_dir, 'certificates.jsonl.gz')
+        writer = jsonl.JSONLWriter(unsigned_certificates_file)
+        for num in range(1, 4):
+            writer.write({'id': str(num)})
+        writer.commit()
+
+        config = mock.Mock()
+        config.unsigned_certificates_file = unsigned_certificates_file
+        config.blockchain_certificates_file = None
+        config.blockchain_certificates_dir = os.path.join(tmp_dir, 'blockchain_certificates')
+
+        handler = CertificateBatchJSONLHandler(
+            secret_manager=mock.Mock(),
+            certificate_handler=DummyJSONCertificateHandler(),
+            merkle_tree=MerkleTreeGenerator(),
+            config=config)
+        handler.pre_batch_actions(config)
+        issuer = Issuer(certificate_batch_handler=handler, transaction_handler=MockTransactionHandler())
+        if batch_size:
+            issuer.issue_batches(handler.get_sub_batches(batch_size), Chain.bitcoin_mainnet)
+            handler.complete_batches(config)
+        else:
+            issuer.issue(Chain.bitcoin_mainnet)
+            handler.post_batch_actions(config)
+        return list(jsonl.read_jsonl(os.path.join(tmp_dir, 'blockchain_certificates', 'certificates.jsonl.gz')))
+
+    def test_jsonl_failed_batch_discarded(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        unsigned_certificates_file = os.path.join(tmp_dir, 'certificates.jsonl')
+        writer = jsonl.JSONLWriter(unsigned_certificates_file)
+        for num in range(1, 4):
+            writer.write({'id': str(num)})
+        writer.commit()
+
+        config = mock.Mock()
+        config.unsigned_certificates_file = unsigned_certificates_file
+        config.blockchain_certificates_file = None
+        config.blockchain_certificates_dir = os.path.join(tmp_dir, 'blockchain_certificates')
+        config.batch_size = 2
+        config.max_retry = 1
+        config.chain = Chain.bitcoin_mainnet
+        transaction_handler = mock.Mock()
+        # the first sub-batch is anchored, the second fails
+        transaction_handler.issue_transaction.side_effect = ['tx1', Exception('broadcast failed')]
+
+        handler = CertificateBatchJSONLHandler(
+            secret_manager=mock.Mock(),
+            certificate_handler=DummyJSONCertificateHandler(),
+            merkle_tree=MerkleTreeGenerator(),
+            config=config)
+        with self.assertRaises(Exception):
+            issue_certificates.issue(config, handler, transaction_handler)
+        self.assertEqual(os.listdir(config.blockchain_certificates_dir), [])
+        self.assertIsNone(handler.certificate_reader.jsonl_file)
+        self.assertIsNone(handler.proof_reader.jsonl_file)
+
+    def test_jsonl_batch(self):
+        with patch.object(MockTransactionHandler, 'issue_transaction', return_value='5604f0c442922b5db54b69f8f363b3eac67835d36a006b98e8727f83b6a830c0'):
+            blockchain_certificates = self._issue_jsonl()
+        self.assertEqual([certificate['id'] for certificate in blockchain_certificates], ['1', '2', '3'])
+        self.assertIn(self._proof_value_helper().decode('utf8'), [certificate['proof'] for certificate in blockchain_certificates])
+
+    def test_jsonl_sub_batches(self):
+        blockchain_certificates = self._issue_jsonl(batch_size=2)
+        self.assertEqual([certificate['id'] for certificate in blockchain_certificates], ['1', '2', '3'])
+        self.assertTrue(all('proof' in certificate for certificate in blockchain_certificates))
+
     # disable test until we can figure out how to verify content was written to file
     # see https://stackoverflow.com/questions/72706297/python-mock-open-patch-with-wraps-how-to-access-write-calls
     @mock.patch("builtins.open", create=True, wraps=builtins.open)
@@ -201,6 +352,27 @@ class TestCertificateHandler(unittest.TestCase):
         print(mock_open.return_value.__enter__().write.mock_calls)
         assert file_call in call_strings
 
+    def test_add_proof_keeps_context(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        context = '["https://www.w3.org/2018/credentials/v1", "https://w3id.org/blockcerts/v3.1"]'
+        metadata = helpers.CertificateMetadata('1', tmp_dir, None, tmp_dir, os.path.join(tmp_dir, 'final'))
+        os.makedirs(os.path.join(tmp_dir, 'final'))
+        with open(metadata.unsigned_cert_file_name, 'w') as unsigned_file:
+            unsigned_file.write('{"@context": ' + context + ', "type": ["VerifiableCredential"]}')
+
+        handler = CertificateV3Handler(self._mock_app_config())
+        handler.get_byte_array_to_issue(metadata)
+        handler.add_proof(metadata, self._proof_value_helper())
+
+        # as the input's, with only the context of the proof added
+        expected = {'@context': json.loads(context)}
+        ProofHandler().update_context_for_proof(expected)
+        with open(metadata.final_blockchain_cert_file_name) as final_file:
+            written = final_file.read()
+        self.assertTrue(written.startswith('{"@context": ' + json.dumps(expected['@context']) + ', '))
+        self.assertNotIn('fallback.org', written)
+
     def test_web_add_proof(self):
         handler = CertificateWebV3Handler(self._mock_app_config())
         proof_value = self._proof_value_helper()
@@ -244,5 +416,17 @@ class DummyCertificateHandler(CertificateHandler):
         pass
 
 
+class DummyJSONCertificateHandler(CertificateHandler):
+    def validate_certificate(self, certificate_json):
+        pass
+
+    def get_byte_array_to_issue(self, certificate_json):
+        return certificate_json['id'].encode('utf-8')
+
+    def add_proof(self, certificate_json, merkle_proof):
+        certificate_json['proof'] = merkle_proof.decode('utf8')
+        return certificate_json
+
+
 if __name__ == '__main__':
     unittest.main()
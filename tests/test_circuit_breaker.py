@@ -0,0 +1,90 @@
+import unittest
+
+import mock
+
+from cert_issuer.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakers, provider_name
+
+
+class Provider(object):
+    def __init__(self, base_url, fail=False):
+        self.base_url = base_url
+        self.fail = fail
+
+    def broadcast_tx(self, tx):
+        if self.fail:
+            raise Exception('unavailable')
+        return 'txid'
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_failure_threshold(self):
+        breakers = CircuitBreakers(failure_threshold=2, reset_timeout=60)
+        provider = Provider('https://api.example.com/api', fail=True)
+        for _ in range(2):
+            self.assertEqual(breakers.get_breaker(provider).state, CLOSED)
+            with self.assertRaises(Exception):
+                breakers.call(provider.broadcast_tx, 'tx')
+        self.assertEqual(breakers.get_breaker(provider).state, OPEN)
+        self.assertFalse(breakers.get_breaker(provider).is_available())
+
+    def test_half_open_probe(self):
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+        provider = Provider('https://api.example.com/api', fail=True)
+        breaker = breakers.get_breaker(provider)
+        with mock.patch('time.monotonic', return_value=1000):
+            with self.assertRaises(Exception):
+                breakers.call(provider.broadcast_tx, 'tx')
+        with mock.patch('time.monotonic', return_value=1061):
+            self.assertTrue(breaker.is_available())
+            self.assertEqual(breaker.state, HALF_OPEN)
+            # a failed probe opens the circuit again
+            with self.assertRaises(Exception):
+                breakers.call(provider.broadcast_tx, 'tx')
+            self.assertEqual(breaker.state, OPEN)
+        with mock.patch('time.monotonic', return_value=1122):
+            self.assertTrue(breaker.is_available())
+            provider.fail = False
+            self.assertEqual(breakers.call(provider.broadcast_tx, 'tx'), 'txid')
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.consecutive_failures, 0)
+
+    def test_order_by_health(self):
+        breakers = CircuitBreakers(failure_threshold=3)
+        flaky = Provider('https://flaky.example.com', fail=True)
+        down = Provider('https://down.example.com', fail=True)
+        healthy = Provider('https://healthy.example.com')
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                breakers.call(down.broadcast_tx, 'tx')
+        with self.assertRaises(Exception):
+            breakers.call(flaky.broadcast_tx, 'tx')
+        # methods are ordered too, on the health of their provider
+        self.assertEqual(breakers.order([down.broadcast_tx, flaky.broadcast_tx, healthy.broadcast_tx]),
+                         [healthy.broadcast_tx, flaky.broadcast_tx])
+
+    def test_order_all_open(self):
+        breakers = CircuitBreakers(failure_threshold=1)
+        providers = [Provider('https://a.example.com', fail=True), Provider('https://b.example.com', fail=True)]
+        for provider in providers:
+            with self.assertRaises(Exception):
+                breakers.call(provider.broadcast_tx, 'tx')
+        self.assertEqual(breakers.order(providers), providers)
+
+    def test_metrics(self):
+        breakers = CircuitBreakers(failure_threshold=1)
+        provider = Provider('https://api.etherscan.io/api?apikey=secret', fail=True)
+        with self.assertRaises(Exception):
+            breakers.call(provider.broadcast_tx, 'tx')
+        breakers.call(Provider('https://api-sepolia.etherscan.io/api').broadcast_tx, 'tx')
+        metrics = breakers.get_metrics()
+        self.assertEqual(metrics['Provider api.etherscan.io']['state'], OPEN)
+        self.assertEqual(metrics['Provider api-sepolia.etherscan.io']['state'], CLOSED)
+        self.assertGreater(metrics['Provider api-sepolia.etherscan.io']['health_score'], 0)
+
+    def test_provider_name(self):
+        self.assertEqual(provider_name(Provider('https://blockstream.info/testnet/api')), 'Provider blockstream.info')
+        self.assertEqual(provider_name(object()), 'object')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import random
+import unittest
+
+from bitcoin import SelectParams
+from pycoin.coins.bitcoin.Spendable import Spendable
+
+from cert_issuer.blockchain_handlers.bitcoin import BitcoinTransactionCostConstants, tx_utils
+from cert_issuer.blockchain_handlers.bitcoin.coin_selection import CoinSelector
+from cert_issuer.blockchain_handlers.bitcoin.transaction_handlers import TransactionV2Creator
+
+ADDRESS = 'mgAqW5ZCnEp7fjvpj8RUL3WxsBy8rcDcCi'
+SCRIPT = b'\x76\xa9\x14' + b'\x01' * 20 + b'\x88\xac'
+
+
+def spendables(values):
+    return [Spendable(value, SCRIPT, index.to_bytes(32, 'big'), 0) for index, value in enumerate(values)]
+
+
+def values(selected):
+    return sorted(s.coin_value for s in selected)
+
+
+class TestCoinSelector(unittest.TestCase):
+    def setUp(self):
+        # 10 satoshis per byte, no minimum fee: an input costs 1490, a transaction without change 530 + 1490 per input
+        self.cost_constants = BitcoinTransactionCostConstants(recommended_tx_fee=0, satoshi_per_byte=10)
+        self.selector = CoinSelector(self.cost_constants)
+
+    def test_without_change_when_cheaper(self):
+        # 2100 without change pays less than 100000 with change pays in fees (2360)
+        self.assertEqual(values(self.selector.select(spendables([100000, 2100]))), [2100])
+        self.assertEqual(values(self.selector.select(spendables([100000, 3000]))), [100000])
+
+    def test_without_change(self):
+        selected = self.selector.select(spendables([4000, 1510]))
+        self.assertEqual(values(selected), [4000])
+        selected = self.selector.select(spendables([2000, 1510]))
+        self.assertEqual(values(selected), [1510, 2000])
+
+    def test_smallest_change(self):
+        selected = self.selector.select(spendables([100000, 50000]))
+        self.assertEqual(values(selected), [50000])
+
+    def test_knapsack_combines_small_coins(self):
+        # no single coin pays for a transaction with change
+        selected = self.selector.knapsack(spendables([4000, 3000, 2500, 2000]))
+        total = sum(values(selected))
+        self.assertGreaterEqual(total, self.selector.fee(len(selected)) + self.cost_constants.get_minimum_output_coin())
+
+    def test_uneconomic_outputs_ignored(self):
+        self.assertIsNone(self.selector.select(spendables([1000, 1400])))
+        self.assertEqual(values(self.selector.select(spendables([1000, 100000]))), [100000])
+
+    def test_insufficient_funds(self):
+        self.assertIsNone(self.selector.select(spendables([1500, 1600])))
+        self.assertIsNone(self.selector.select([]))
+
+    def test_pays_minimum_fee(self):
+        cost_constants = BitcoinTransactionCostConstants(recommended_tx_fee=0.0001, satoshi_per_byte=10)
+        selector = CoinSelector(cost_constants)
+        selected = selector.select(spendables([5000, 6000, 9000, 12000]))
+        self.assertGreaterEqual(sum(values(selected)), cost_constants.get_recommended_fee_coin())
+
+    def test_deterministic(self):
+        rng = random.Random(1)
+        utxos = spendables([rng.randint(2000, 20000) for _ in range(200)])
+        cost_constants = BitcoinTransactionCostConstants(recommended_tx_fee=0, satoshi_per_byte=100)
+        selected = CoinSelector(cost_constants, seed=7).select(utxos)
+        rng.shuffle(utxos)
+        self.assertEqual(CoinSelector(cost_constants, seed=7).select(utxos), selected)
+
+    def test_consolidation(self):
+        selector = CoinSelector(self.cost_constants, consolidation_satoshi_per_byte=10, max_consolidation_inputs=3)
+        selected = selector.select(spendables([100000, 50000, 3000, 2000, 1000]))
+        # 1000 costs more than it is worth
+        self.assertEqual(values(selected), [2000, 3000, 50000])
+
+    def test_no_consolidation_above_fee_rate(self):
+        selector = CoinSelector(self.cost_constants, consolidation_satoshi_per_byte=5, max_consolidation_inputs=3)
+        self.assertEqual(values(selector.select(spendables([100000, 50000, 3000, 2000]))), [50000])
+
+
+class TestTransactionV2Creator(unittest.TestCase):
+    def setUp(self):
+        SelectParams('testnet')
+        self.cost_constants = BitcoinTransactionCostConstants(recommended_tx_fee=0, satoshi_per_byte=10)
+
+    def create_transaction(self, coin_values):
+        tx = TransactionV2Creator().create_transaction(self.cost_constants, ADDRESS, spendables(coin_values), b'\x00' * 32)
+        return [tx_out.nValue for tx_out in tx.vout]
+
+    def test_fee_for_vsize(self):
+        # 235 vbytes once signed, over the 236 bytes calculate_tx_fee estimates
+        self.assertEqual(self.create_transaction([100000]), [100000 - 2350, 0])
+
+    def test_dust_change_left_as_fee(self):
+        self.assertEqual(self.create_transaction([4000]), [0])
+
+    def test_fee_rate_around_dust_threshold(self):
+        # below, at and above the values leaving a change just over the dust threshold
+        for satoshi_per_byte, coin_values in [(10, range(4800, 5400)), (1, range(2800, 3100))]:
+            cost_constants = BitcoinTransactionCostConstants(recommended_tx_fee=0, satoshi_per_byte=satoshi_per_byte)
+            for coin_value in coin_values:
+                tx = TransactionV2Creator().create_transaction(cost_constants, ADDRESS, spendables([coin_value]),
+                                                               b'\x00' * 32)
+                fee = coin_value - sum(tx_out.nValue for tx_out in tx.vout)
+                self.assertGreaterEqual(fee / tx_utils.estimate_signed_vsize(tx), satoshi_per_byte,
+                                        'fee of {} satoshis for {} outputs'.format(fee, len(tx.vout)))
+
+
+if __name__ == '__main__':
+    unittest.main()
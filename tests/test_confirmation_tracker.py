@@ -0,0 +1,111 @@
+import unittest
+
+import mock
+from bitcoin import SelectParams
+from bitcoin.wallet import CBitcoinAddress
+from pycoin.coins.bitcoin.Spendable import Spendable
+
+from cert_issuer.blockchain_handlers.bitcoin import BitcoinTransactionCostConstants
+from cert_issuer.blockchain_handlers.bitcoin.confirmation_tracker import ConfirmationTracker
+from cert_issuer.blockchain_handlers.bitcoin.transaction_handlers import BitcoinTransactionHandler
+from cert_issuer.errors import BroadcastError
+
+ADDRESS = 'mgAqW5ZCnEp7fjvpj8RUL3WxsBy8rcDcCi'
+MERKLE_ROOT = b'\x01' * 32
+
+
+class TestConfirmationTracker(unittest.TestCase):
+    def setUp(self):
+        SelectParams('testnet')
+        script = CBitcoinAddress(ADDRESS).to_scriptPubKey()
+        self.connector = mock.Mock()
+        self.connector.get_unspent_outputs.return_value = [Spendable(100000, bytes(script), b'\x07' * 32, 0)]
+        self.connector.broadcast_tx.side_effect = lambda tx: tx.id()
+        self.connector.get_block_height.return_value = 100
+        self.connector.get_confirmations.return_value = 0
+
+    def create_handler(self):
+        cost_constants = BitcoinTransactionCostConstants(recommended_tx_fee=0, satoshi_per_byte=10)
+        handler = BitcoinTransactionHandler(self.connector, cost_constants, None, ADDRESS)
+        # left unsigned, the tracker only needs the transactions' outputs and sizes
+        handler.sign_transaction = lambda prepared_tx: prepared_tx
+        handler.confirmation_tracker = ConfirmationTracker(handler, poll_interval=3600)
+        self.addCleanup(handler.confirmation_tracker.close)
+        return handler
+
+    def get_package_rate(self, tracker, tx_ids):
+        transactions = [tracker.tracked[tx_id] for tx_id in tx_ids]
+        return sum(t.fee for t in transactions) / sum(t.vsize for t in transactions)
+
+    def test_confirmed_forgotten(self):
+        handler = self.create_handler()
+        tx_id = handler.issue_transaction(MERKLE_ROOT)
+        self.assertEqual(handler.confirmation_tracker.check(), [tx_id])
+        self.connector.get_confirmations.return_value = 1
+        self.assertEqual(handler.confirmation_tracker.check(), [])
+
+    def test_not_bumped_before_bump_after_blocks(self):
+        handler = self.create_handler()
+        tx_id = handler.issue_transaction(MERKLE_ROOT)
+        self.connector.get_block_height.return_value = 102
+        self.assertEqual(handler.confirmation_tracker.check(), [tx_id])
+        self.assertEqual(self.connector.broadcast_tx.call_count, 1)
+
+    def test_child_pays_for_parent(self):
+        handler = self.create_handler()
+        tracker = handler.confirmation_tracker
+        tx_id = handler.issue_transaction(MERKLE_ROOT)
+        parent = tracker.tracked[tx_id]
+        self.connector.get_block_height.return_value = 103
+
+        unconfirmed = tracker.check()
+        self.assertEqual(len(unconfirmed), 2)
+        child_tx_id = unconfirmed[1]
+        child = tracker.tracked[child_tx_id].signed_tx
+        self.assertEqual([(tx_in.previous_hash, tx_in.previous_index) for tx_in in child.txs_in],
+                         [(parent.signed_tx.hash(), 0)])
+        self.assertGreaterEqual(self.get_package_rate(tracker, unconfirmed), 15)
+        # the parent is unchanged, as are the proofs naming it
+        self.assertEqual(parent.tx_id, tx_id)
+        self.assertEqual([s.tx_hash for s in handler.utxo_cache.get_spendables(ADDRESS)], [child.hash()])
+
+        # bumped again bump_after_blocks later, through the child
+        self.connector.get_block_height.return_value = 106
+        self.assertEqual(len(tracker.check()), 3)
+        self.connector.get_block_height.return_value = 107
+        self.assertEqual(len(tracker.check()), 3)
+
+    def test_only_last_of_chain_bumped(self):
+        handler = self.create_handler()
+        tracker = handler.confirmation_tracker
+        first_tx_id = handler.issue_transaction(MERKLE_ROOT)
+        self.connector.get_block_height.return_value = 102
+        second_tx_id = handler.issue_transaction(b'\x02' * 32)
+        self.connector.get_block_height.return_value = 103
+
+        # the first transaction is stuck, but its change is spent by the second
+        self.assertEqual(tracker.check(), [first_tx_id, second_tx_id])
+
+        self.connector.get_block_height.return_value = 105
+        unconfirmed = tracker.check()
+        self.assertEqual(unconfirmed[:2], [first_tx_id, second_tx_id])
+        child = tracker.tracked[unconfirmed[2]].signed_tx
+        self.assertEqual(child.txs_in[0].previous_hash, tracker.tracked[second_tx_id].signed_tx.hash())
+        # the child pays for the first transaction too
+        self.assertGreaterEqual(self.get_package_rate(tracker, unconfirmed), 15)
+
+    def test_dropped_transaction(self):
+        handler = self.create_handler()
+        tracker = handler.confirmation_tracker
+        tx_id = handler.issue_transaction(MERKLE_ROOT)
+        self.connector.get_confirmations.return_value = None
+        self.assertEqual(tracker.check(), [tx_id])
+        self.assertEqual(self.connector.broadcast_tx.call_count, 2)
+
+        self.connector.broadcast_tx.side_effect = BroadcastError('bad-txns-inputs-missingorspent')
+        self.assertEqual(tracker.check(), [])
+        self.assertNotIn(ADDRESS, handler.utxo_cache.utxos)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,18 @@
+import threading
 import unittest
 
 from bitcoin import SelectParams
 from bitcoin.core import COutPoint, lx, x, CScript
 from bitcoin.core.script import OP_EQUALVERIFY, OP_CHECKSIG, OP_DUP, OP_HASH160
 from bitcoin.wallet import P2PKHBitcoinAddress
+from cert_core import Chain
+import mock
 from mock import patch
 from pycoin.encoding.hexbytes import b2h
 
-from cert_issuer.blockchain_handlers.bitcoin.connectors import BitcoindConnector
+from cert_issuer.blockchain_handlers.bitcoin import connectors
+from cert_issuer.blockchain_handlers.bitcoin.connectors import BitcoindConnector, BitcoinServiceProviderConnector
+from cert_issuer.errors import BroadcastError
 
 TESTNET_TX = '010000000137e6a590428144e64cf008beb6e3193efee5a1a4ddfbbd48d10a12025b88c23c00000000fd5d0100473044022024959a1439e7e364c32f012a7e46dfa2d8cfa036ccdf230e9b3642fb9cdd4341022048292d0dbed226fadeae36b20627b50a3351456f164cae2923dba897995843c701483045022100e6dbcfb4ae35322e5c05688a6afcb144ab347654c217c9a3b2e963c2447418e702205cb639b549c7a9eace7d59ff2ce7c23167d60a214e6c9c011ce93317063850de014cc95241048aa0d470b7a9328889c84ef0291ed30346986e22558e80c3ae06199391eae21308a00cdcfb34febc0ea9c80dfd16b01f26c7ec67593cb8ab474aca8fa1d7029d4104cf54956634c4d0bdaf00e6b1871c089b7a892d0fecc077f03b91e8d4d146861b0a4fdd237891a9819c878984d4b123f6fe92d9bbc05873a1bb4fe510145bf369410471843c33b2971e4944c73d4500abd6f61f7edf9ec919c408cbe12a6c9132d2cb8ebed8253322760d5ec6081165e0ab68900683de503f1544f03816d47fec699a53aeffffffff09d29e91010000000017a9145629021f7668d4ec310ac5e99701a6d6cf95eb8f8727ed19190000000017a9145629021f7668d4ec310ac5e99701a6d6cf95eb8f874eda33320000000017a9145629021f7668d4ec310ac5e99701a6d6cf95eb8f879db467640000000017a9145629021f7668d4ec310ac5e99701a6d6cf95eb8f87a43d23030000000017a9145629021f7668d4ec310ac5e99701a6d6cf95eb8f87497b46060000000017a9145629021f7668d4ec310ac5e99701a6d6cf95eb8f87d29e91010000000017a9145629021f7668d4ec310ac5e99701a6d6cf95eb8f8793f68c0c0000000017a9145629021f7668d4ec310ac5e99701a6d6cf95eb8f8716400e00000000001976a9146efcf883b4b6f9997be9a0600f6c095fe2bd2d9288ac00000000'
 MAINNET_TX = '0100000001ce379123234bc9662f3f00f2a9c59d5420fc9f9d5e1fd8881b8666e8c9def133000000006a473044022032d2d9c2a67d90eb5ea32d9a5e935b46080d4c62a1d53265555c78775e8f6f2102205c3469593995b9b76f8d24aa4285a50b72ca71661ca021cd219883f1a8f14abe012103704cf7aa5e4152639617d0b3f8bcd302e231bbda13b468cba1b12aa7be14f3b3ffffffff07be0a0000000000001976a91464799d48941b0fbfdb4a7ee6340840fb2eb5c2c388acbe0a0000000000001976a914c615ecb52f6e877df0621f4b36bdb25410ec22c388acbe0a0000000000001976a9144e9862ff1c4041b7d083fe30cf5f68f7bedb321b88acbe0a0000000000001976a914413df7bf4a41f2e8a1366fcf7352885e6c88964b88acbe0a0000000000001976a914fabc1ff527531581b4a4c58f13bd088e274122bc88acbb810000000000001976a914fcbe34aa288a91eab1f0fe93353997ec6aa3594088ac0000000000000000226a2068f3ede17fdb67ffd4a5164b5687a71f9fbb68da803b803935720f2aa38f772800000000'
@@ -76,5 +81,84 @@ class TestConnectors(unittest.TestCase):
         #    self.assertEqual(balance, 49005500)
 
 
+class TestProviderRegistry(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(connectors.connectors, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_builds_only_used_chain_once(self):
+        factory = mock.Mock(return_value=['provider'])
+        other_factory = mock.Mock()
+        with patch.dict(connectors.provider_factories, {'chain': factory, 'other_chain': other_factory}), \
+                patch('cert_issuer.config.CONFIG', mock.Mock(blockcypher_api_token='token')):
+            self.assertEqual(connectors.get_providers_for_chain('chain'), ['provider'])
+            self.assertIs(connectors.get_providers_for_chain('chain'), connectors.get_providers_for_chain('chain'))
+        factory.assert_called_once_with('token')
+        self.assertFalse(other_factory.called)
+
+    def test_bitcoind_connector_cached(self):
+        providers = connectors.get_providers_for_chain(Chain.bitcoin_testnet, bitcoind=True)
+        self.assertIsInstance(providers[0], BitcoindConnector)
+        self.assertIs(connectors.get_providers_for_chain(Chain.bitcoin_testnet, bitcoind=True), providers)
+
+
+class TestBroadcast(unittest.TestCase):
+    def setUp(self):
+        self.tx = mock.Mock()
+        self.tx.as_hex.return_value = 'hextx'
+
+    def broadcast(self, *method_providers):
+        with patch.object(connectors, 'service_provider_methods', return_value=list(method_providers)), \
+                patch.object(connectors, 'get_providers_for_chain'):
+            return BitcoinServiceProviderConnector.broadcast_tx_with_chain(self.tx, 'chain')
+
+    def test_returns_first_accepted_tx_id(self):
+        release_slow_provider = threading.Event()
+        self.addCleanup(release_slow_provider.set)
+
+        def slow_provider(tx):
+            release_slow_provider.wait(10)
+            return 'slow'
+
+        def failing_provider(tx):
+            raise Exception('rejected')
+
+        self.assertEqual(self.broadcast(slow_provider, failing_provider, lambda tx: 'txid'), 'txid')
+
+    @patch('time.sleep')
+    def test_retries_with_backoff(self, mock_sleep):
+        attempts = []
+
+        def flaky_provider(tx):
+            attempts.append(tx)
+            if len(attempts) < 3:
+                raise Exception('unavailable')
+            return 'txid'
+
+        self.assertEqual(self.broadcast(flaky_provider), 'txid')
+        self.assertEqual(mock_sleep.call_count, 2)
+        for call, attempt_number in zip(mock_sleep.call_args_list, range(2)):
+            self.assertLessEqual(call[0][0], connectors.BROADCAST_BACKOFF_BASE * 2 ** attempt_number)
+
+    @patch('time.sleep')
+    def test_all_providers_fail(self, mock_sleep):
+        def failing_provider(tx):
+            raise Exception('rejected')
+
+        with self.assertRaises(BroadcastError):
+            self.broadcast(failing_provider, failing_provider)
+        self.assertEqual(mock_sleep.call_count, connectors.MAX_BROADCAST_ATTEMPTS - 1)
+
+    def test_conflicting_tx_id_logged(self):
+        future = mock.Mock()
+        future.cancelled.return_value = False
+        future.exception.return_value = None
+        future.result.return_value = 'other'
+        with patch('logging.error') as mock_error:
+            connectors.check_broadcast_tx_id(self.tx, 'txid', 'provider', future)
+        self.assertTrue(mock_error.called)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+from mock import patch
+
+from cert_issuer import daemon
+from cert_issuer.daemon import IssuanceDaemon
+
+
+class TestIssuanceDaemon(unittest.TestCase):
+    def setUp(self):
+        self.inbox_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.inbox_dir)
+        self.config = mock.Mock(unsigned_certificates_dir=self.inbox_dir, unsigned_certificates_file=None,
+                                serve_batch_size=3, serve_max_age=60, serve_poll_interval=0.01)
+        self.daemon = IssuanceDaemon(self.config, mock.Mock(), mock.Mock())
+        self.issued = []
+
+    def mock_issue(self, app_config, certificate_batch_handler, transaction_handler):
+        self.issued.append(sorted(os.listdir(app_config.unsigned_certificates_dir)))
+        return 'txid'
+
+    def test_enqueue(self):
+        self.daemon.enqueue('1', {'id': 'urn:uuid:1'})
+        with open(os.path.join(self.inbox_dir, '1.json')) as certificate_file:
+            self.assertEqual(json.load(certificate_file), {'id': 'urn:uuid:1'})
+        self.assertEqual(os.listdir(self.inbox_dir), ['1.json'])
+
+    def test_batch_ready_on_size(self):
+        for uid in ['1', '2']:
+            self.daemon.enqueue(uid, {})
+        self.assertFalse(self.daemon.is_batch_ready(self.daemon.get_inbox()))
+        self.daemon.enqueue('3', {})
+        self.assertTrue(self.daemon.is_batch_ready(self.daemon.get_inbox()))
+
+    def test_batch_ready_on_age(self):
+        self.daemon.enqueue('1', {})
+        self.assertFalse(self.daemon.is_batch_ready(self.daemon.get_inbox()))
+        old = time.time() - 61
+        os.utime(os.path.join(self.inbox_dir, '1.json'), (old, old))
+        self.assertTrue(self.daemon.is_batch_ready(self.daemon.get_inbox()))
+
+    def test_issues_oldest_first_in_batches(self):
+        for index, uid in enumerate(['4', '3', '2', '1']):
+            self.daemon.enqueue(uid, {})
+            os.utime(os.path.join(self.inbox_dir, uid + '.json'), (1000 + index, 1000 + index))
+        with patch.object(daemon.issue_certificates, 'issue', side_effect=self.mock_issue):
+            self.assertEqual(self.daemon.issue_batch(self.daemon.get_inbox()[:3]), 'txid')
+        self.assertEqual(self.issued, [['2.json', '3.json', '4.json']])
+        self.assertEqual(os.listdir(self.inbox_dir), ['1.json'])
+
+    def test_failed_batch_returns_to_inbox(self):
+        for uid in ['1', '2']:
+            self.daemon.enqueue(uid, {})
+        with patch.object(daemon.issue_certificates, 'issue', side_effect=Exception('broadcast failed')):
+            self.assertIsNone(self.daemon.issue_batch(self.daemon.get_inbox()))
+        self.assertEqual(sorted(self.daemon.get_inbox()),
+                         [os.path.join(self.inbox_dir, uid + '.json') for uid in ['1', '2']])
+        self.assertEqual(self.daemon.failed_batches, 1)
+
+    def test_run_until_stopped(self):
+        for uid in ['1', '2', '3']:
+            self.daemon.enqueue(uid, {})
+
+        def issue_and_stop(*args):
+            self.daemon.stop()
+            return self.mock_issue(*args)
+
+        with patch.object(daemon.issue_certificates, 'issue', side_effect=issue_and_stop):
+            self.daemon.run()
+        self.assertEqual(self.issued, [['1.json', '2.json', '3.json']])
+        self.assertEqual(os.listdir(self.inbox_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+
+import mock
+from mock import patch
+
+from cert_issuer.blockchain_handlers.bitcoin import BitcoinTransactionCostConstants
+from cert_issuer.blockchain_handlers.bitcoin import fee_estimation
+from cert_issuer.blockchain_handlers.bitcoin.fee_estimation import BitcoindFeeProvider, EsploraFeeProvider, \
+    FeeEstimator
+from cert_issuer.circuit_breaker import CircuitBreakers
+from cert_issuer.errors import FeeEstimationError
+
+
+class LocalFeeProvider(object):
+    """
+    Stands in for bitcoind or a block explorer
+    """
+    def __init__(self, satoshi_per_byte=None, error=None):
+        self.satoshi_per_byte = satoshi_per_byte
+        self.error = error
+        self.calls = []
+
+    def get_satoshi_per_byte(self, target_blocks):
+        self.calls.append(target_blocks)
+        if self.error is not None:
+            raise self.error
+        return self.satoshi_per_byte
+
+
+class TestFeeEstimator(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(fee_estimation, 'get_circuit_breakers', return_value=CircuitBreakers())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_estimate_cached(self):
+        provider = LocalFeeProvider(12.5)
+        estimator = FeeEstimator([provider], 250, target_blocks=3, ttl=60)
+        self.assertEqual(estimator.get_satoshi_per_byte(), 12.5)
+        provider.satoshi_per_byte = 20
+        self.assertEqual(estimator.get_satoshi_per_byte(), 12.5)
+        self.assertEqual(provider.calls, [3])
+
+    def test_estimate_expires(self):
+        provider = LocalFeeProvider(12.5)
+        estimator = FeeEstimator([provider], 250, ttl=0)
+        estimator.get_satoshi_per_byte()
+        provider.satoshi_per_byte = 20
+        self.assertEqual(estimator.get_satoshi_per_byte(), 20)
+
+    def test_next_provider_on_failure(self):
+        failing = LocalFeeProvider(error=FeeEstimationError('no estimate'))
+        estimator = FeeEstimator([failing, LocalFeeProvider(8)], 250)
+        self.assertEqual(estimator.get_satoshi_per_byte(), 8)
+
+    def test_fallback(self):
+        estimator = FeeEstimator([LocalFeeProvider(error=Exception('unreachable'))], 250)
+        self.assertEqual(estimator.get_satoshi_per_byte(), 250)
+
+    def test_bounds(self):
+        self.assertEqual(FeeEstimator([LocalFeeProvider(0.2)], 250).get_satoshi_per_byte(), 1)
+        self.assertEqual(FeeEstimator([LocalFeeProvider(900)], 250, max_satoshi_per_byte=100).get_satoshi_per_byte(),
+                         100)
+
+
+class TestFeeProviders(unittest.TestCase):
+    def test_esplora_target(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'1': 30.1, '2': 25.0, '3': 20.2, '6': 12.0, '144': 1.5}
+        with patch.object(fee_estimation, 'get_http_client') as get_http_client:
+            get_http_client.return_value.get.return_value = response
+            provider = EsploraFeeProvider('https://blockstream.info/api')
+            self.assertEqual(provider.get_satoshi_per_byte(6), 12.0)
+            self.assertEqual(provider.get_satoshi_per_byte(5), 20.2)
+            self.assertEqual(provider.get_satoshi_per_byte(1000), 1.5)
+            get_http_client.return_value.get.assert_called_with('https://blockstream.info/api/fee-estimates')
+
+    def test_esplora_error(self):
+        with patch.object(fee_estimation, 'get_http_client') as get_http_client:
+            get_http_client.return_value.get.return_value = mock.Mock(status_code=503, text='unavailable')
+            with self.assertRaises(FeeEstimationError):
+                EsploraFeeProvider('https://blockstream.info/api').get_satoshi_per_byte(6)
+
+    def test_bitcoind(self):
+        with patch('bitcoin.rpc.Proxy') as proxy:
+            proxy.return_value.call.return_value = {'feerate': 0.0002, 'blocks': 6}
+            self.assertAlmostEqual(BitcoindFeeProvider().get_satoshi_per_byte(6), 20)
+            proxy.return_value.call.assert_called_with('estimatesmartfee', 6)
+
+            proxy.return_value.call.return_value = {'errors': ['Insufficient data or no feerate found'], 'blocks': 0}
+            with self.assertRaises(FeeEstimationError):
+                BitcoindFeeProvider().get_satoshi_per_byte(6)
+
+
+class TestCostConstants(unittest.TestCase):
+    def test_estimated_fee_rate(self):
+        fee_estimator = mock.Mock()
+        fee_estimator.get_satoshi_per_byte.return_value = 15
+        cost_constants = BitcoinTransactionCostConstants(satoshi_per_byte=250, fee_estimator=fee_estimator)
+        cost_constants.update_fee_rate()
+        self.assertEqual(cost_constants.satoshi_per_byte, 15)
+        self.assertEqual(cost_constants.get_recommended_fee_coin(), 0)
+
+    def test_fixed_fee_rate(self):
+        cost_constants = BitcoinTransactionCostConstants(satoshi_per_byte=250)
+        cost_constants.update_fee_rate()
+        self.assertEqual(cost_constants.satoshi_per_byte, 250)
+        self.assertAlmostEqual(cost_constants.get_recommended_fee_coin(), 60000)
+
+
+if __name__ == '__main__':
+    unittest.main()
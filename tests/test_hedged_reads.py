@@ -0,0 +1,84 @@
+import threading
+import time
+import unittest
+
+from cert_issuer.hedged_reads import HedgedReader
+
+
+class Provider(object):
+    def __init__(self, balance=None, delay=0, error=None):
+        self.balance = balance
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def get_balance(self, address):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.balance
+
+
+class TestHedgedReader(unittest.TestCase):
+    def test_primary_answers(self):
+        primary, backup = Provider(1), Provider(2)
+        self.assertEqual(HedgedReader(hedge_delay=1).read([primary, backup], 'get_balance', 'address'), 1)
+        self.assertEqual(backup.calls, 0)
+
+    def test_hedges_slow_primary(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        slow = Provider(1)
+        slow.get_balance = lambda address: release.wait(10) and 1
+        fast = Provider(2)
+
+        start = time.monotonic()
+        self.assertEqual(HedgedReader(hedge_delay=0.05).read([slow, fast], 'get_balance', 'address'), 2)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_failed_provider_replaced_immediately(self):
+        failing, backup = Provider(error=Exception('down')), Provider(2)
+        start = time.monotonic()
+        self.assertEqual(HedgedReader(hedge_delay=10).read([failing, backup], 'get_balance', 'address'), 2)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_all_fail(self):
+        providers = [Provider(error=Exception('down')), Provider(None)]
+        self.assertIsNone(HedgedReader(hedge_delay=0.01).read(providers, 'get_balance', 'address'))
+
+    def test_fastest_becomes_primary(self):
+        slow, fast = Provider(1, delay=0.05), Provider(2)
+        reader = HedgedReader(hedge_delay=10)
+        reader.read([slow], 'get_balance', 'address')
+        reader.read([fast], 'get_balance', 'address')
+        self.assertEqual(reader.rank([slow, fast]), [fast, slow])
+        self.assertEqual(reader.read([slow, fast], 'get_balance', 'address'), 2)
+
+    def test_failing_provider_ranked_last(self):
+        failing, backup = Provider(error=Exception('down')), Provider(2)
+        reader = HedgedReader(hedge_delay=10)
+        self.assertEqual(reader.read([failing, backup], 'get_balance', 'address'), 2)
+        self.assertEqual(reader.rank([failing, backup]), [backup, failing])
+        reader.read([failing, backup], 'get_balance', 'address')
+        self.assertEqual(failing.calls, 1)
+
+    def test_concurrent_histograms(self):
+        reader = HedgedReader()
+        provider = Provider(1)
+        start = threading.Barrier(8)
+        histograms = []
+
+        def get_histogram():
+            start.wait()
+            histograms.append(reader.get_histogram(provider))
+        threads = [threading.Thread(target=get_histogram) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(map(id, histograms))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from cert_issuer import helpers
+
+
+class TestHelpers(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.unsigned_certs_dir = os.path.join(self.tmp_dir, 'unsigned')
+        os.makedirs(self.unsigned_certs_dir)
+        for uid in ['a', 'b']:
+            with open(os.path.join(self.unsigned_certs_dir, uid + '.json'), 'w') as cert_file:
+                cert_file.write('{"id": "%s"}' % uid)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_stage_file_links(self):
+        src = os.path.join(self.unsigned_certs_dir, 'a.json')
+        dst = os.path.join(self.tmp_dir, 'a.json')
+        helpers.stage_file(src, dst)
+        self.assertEqual(os.stat(dst).st_ino, os.stat(src).st_ino)
+
+    def test_stage_directory(self):
+        work_dir = os.path.join(self.tmp_dir, 'work')
+        shutil.copytree(self.unsigned_certs_dir, work_dir, copy_function=helpers.stage_file)
+        self.assertEqual(sorted(os.listdir(work_dir)), ['a.json', 'b.json'])
+
+    @mock.patch('cert_issuer.helpers.reflink_file', return_value=False)
+    @mock.patch('os.link', side_effect=OSError('cross-device link'))
+    def test_stage_file_falls_back_to_copy(self, mock_link, mock_reflink):
+        src = os.path.join(self.unsigned_certs_dir, 'a.json')
+        dst = os.path.join(self.tmp_dir, 'a.json')
+        helpers.stage_file(src, dst)
+        mock_reflink.assert_called_once_with(src, dst)
+        with open(dst) as staged_file:
+            self.assertEqual(staged_file.read(), '{"id": "a"}')
+
+    def test_reflink_unsupported_leaves_no_file(self):
+        src = os.path.join(self.unsigned_certs_dir, 'a.json')
+        dst = os.path.join(self.tmp_dir, 'a.json')
+        if helpers.reflink_file(src, dst):
+            self.assertTrue(os.path.exists(dst))
+        else:
+            self.assertFalse(os.path.exists(dst))
+
+    def test_write_file_atomically(self):
+        file_name = os.path.join(self.tmp_dir, 'out.json')
+        helpers.write_file_atomically(file_name, '{}')
+        helpers.write_file_atomically(file_name, '{"a": 1}')
+        with open(file_name) as out_file:
+            self.assertEqual(out_file.read(), '{"a": 1}')
+        self.assertFalse(os.path.exists(file_name + helpers.TMP_EXT))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+import mock
+import requests
+
+from cert_issuer.http_client import HTTPClient
+
+
+def get_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+class TestHTTPClient(unittest.TestCase):
+    def test_reuses_session_with_timeouts(self):
+        client = HTTPClient(connect_timeout=2, read_timeout=7)
+        with mock.patch.object(client.session, 'request', return_value=get_response(200)) as request:
+            client.get('https://api.blockcypher.com/v1/btc/main', params={'a': 1})
+            client.post('https://api.blockcypher.com/v1/btc/main/txs/push', json={'tx': '00'})
+        request.assert_has_calls([
+            mock.call('GET', 'https://api.blockcypher.com/v1/btc/main', params={'a': 1}, timeout=(2, 7)),
+            mock.call('POST', 'https://api.blockcypher.com/v1/btc/main/txs/push', json={'tx': '00'}, timeout=(2, 7))
+        ])
+
+    def test_explicit_timeout(self):
+        client = HTTPClient()
+        with mock.patch.object(client.session, 'request', return_value=get_response(200)) as request:
+            client.request('GET', 'https://blockstream.info/api', timeout=1)
+        self.assertEqual(request.call_args[1]['timeout'], 1)
+
+    def test_pool_size(self):
+        client = HTTPClient(pool_size=3)
+        adapter = client.session.get_adapter('https://api.etherscan.io/api')
+        self.assertIs(adapter, client.session.get_adapter('http://api.etherscan.io/api'))
+        self.assertEqual(adapter._pool_maxsize, 3)
+
+    def test_metrics_per_host(self):
+        client = HTTPClient()
+        responses = [get_response(200), get_response(503), requests.ConnectionError(), get_response(404)]
+        with mock.patch.object(client.session, 'request', side_effect=responses):
+            client.get('https://api.etherscan.io/api?apikey=secret')
+            client.get('https://api.etherscan.io/api')
+            with self.assertRaises(requests.ConnectionError):
+                client.get('https://api.etherscan.io/api')
+            client.get('https://blockstream.info/api/tx')
+
+        metrics = client.get_metrics()
+        self.assertEqual(set(metrics), {'api.etherscan.io', 'blockstream.info'})
+        self.assertEqual(metrics['api.etherscan.io']['requests'], 3)
+        self.assertEqual(metrics['api.etherscan.io']['errors'], 2)
+        self.assertEqual(metrics['blockstream.info']['requests'], 1)
+        self.assertEqual(metrics['blockstream.info']['errors'], 0)
+        self.assertIsNotNone(metrics['blockstream.info']['latency_p50'])
+
+
+if __name__ == '__main__':
+    unittest.main()
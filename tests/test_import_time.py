@@ -0,0 +1,25 @@
+import json
+import subprocess
+import sys
+import unittest
+
+# what cert-issuer imports before issuing on the mock chain
+MOCKCHAIN_MODULES = [
+    'cert_issuer.config',
+    'cert_issuer.issue_certificates',
+    'cert_issuer.blockchain_handlers.bitcoin'
+]
+
+
+class TestImportTime(unittest.TestCase):
+    def test_mockchain_skips_blockchain_libraries(self):
+        code = '; '.join(['import json, sys'] + ['import ' + module for module in MOCKCHAIN_MODULES] +
+                         ['print(json.dumps(sorted(sys.modules)))'])
+        output = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True).stdout
+        imported = set(json.loads(output.decode('utf-8')))
+        for module in ['web3', 'bitcoin.rpc', 'bitcoin.wallet', 'pycoin.coins.bitcoin.Tx', 'pycoin.services.providers']:
+            self.assertNotIn(module, imported)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import threading
+import unittest
+
+import mock
+
+from cert_issuer.errors import BroadcastError
+from cert_issuer.issuer import Issuer
+
+
+def get_batch_handler(blockchain_bytes):
+    batch_handler = mock.Mock()
+    batch_handler.prepare_batch.return_value = blockchain_bytes
+    return batch_handler
+
+
+class TestIssuer(unittest.TestCase):
+    def test_issue_batches_in_order(self):
+        batch_handlers = [get_batch_handler(b'1'), get_batch_handler(b'2'), get_batch_handler(b'3')]
+        transaction_handler = mock.Mock()
+        transaction_handler.issue_transaction.side_effect = lambda blockchain_bytes: 'tx' + blockchain_bytes.decode()
+
+        issuer = Issuer(certificate_batch_handler=None, transaction_handler=transaction_handler)
+        tx_ids = issuer.issue_batches(iter(batch_handlers), 'chain')
+
+        self.assertEqual(tx_ids, ['tx1', 'tx2', 'tx3'])
+        for batch_handler, tx_id in zip(batch_handlers, tx_ids):
+            batch_handler.finish_batch.assert_called_once_with(tx_id, 'chain')
+            batch_handler.post_batch_actions.assert_called_once_with(batch_handler.config)
+
+    def test_next_batch_prepared_while_issuing(self):
+        next_batch_prepared = threading.Event()
+        first_batch = get_batch_handler(b'1')
+        next_batch = get_batch_handler(b'2')
+        next_batch.prepare_batch.side_effect = lambda: next_batch_prepared.set() or b'2'
+
+        overlapped = []
+
+        def issue_transaction(blockchain_bytes):
+            if blockchain_bytes == b'1':
+                overlapped.append(next_batch_prepared.wait(5))
+            return 'tx'
+
+        transaction_handler = mock.Mock()
+        transaction_handler.issue_transaction.side_effect = issue_transaction
+
+        issuer = Issuer(certificate_batch_handler=None, transaction_handler=transaction_handler)
+        issuer.issue_batches([first_batch, next_batch], 'chain')
+        self.assertEqual(overlapped, [True])
+
+    def test_issue_batches_stops_on_failed_batch(self):
+        batch_handlers = [get_batch_handler(b'1'), get_batch_handler(b'2'), get_batch_handler(b'3')]
+        transaction_handler = mock.Mock()
+        transaction_handler.issue_transaction.side_effect = BroadcastError('failed')
+
+        issuer = Issuer(certificate_batch_handler=None, transaction_handler=transaction_handler, max_retry=1)
+        with self.assertRaises(BroadcastError):
+            issuer.issue_batches(batch_handlers, 'chain')
+        batch_handlers[0].post_batch_actions.assert_not_called()
+        batch_handlers[2].prepare_batch.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from cert_issuer import jsonl
+
+
+class TestJSONL(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_and_read(self):
+        for file_name in ['certs.jsonl', 'certs.jsonl.gz']:
+            file_name = os.path.join(self.tmp_dir, file_name)
+            writer = jsonl.JSONLWriter(file_name)
+            for i in range(5):
+                writer.write({'id': i})
+            self.assertFalse(os.path.exists(file_name))
+            writer.commit()
+
+            self.assertEqual(list(jsonl.read_jsonl(file_name)), [{'id': i} for i in range(5)])
+            self.assertEqual(list(jsonl.read_jsonl(file_name, 1, 3)), [{'id': 1}, {'id': 2}])
+            self.assertEqual(jsonl.count_documents(file_name), 5)
+            self.assertFalse(os.path.exists(file_name + jsonl.TMP_EXT))
+
+    def test_reader_keeps_position(self):
+        file_name = os.path.join(self.tmp_dir, 'certs.jsonl.gz')
+        writer = jsonl.JSONLWriter(file_name)
+        for i in range(10):
+            writer.write({'id': i})
+        writer.commit()
+
+        reader = jsonl.JSONLReader(file_name)
+        self.assertEqual([list(reader.read(start, start + 3)) for start in range(0, 10, 3)],
+                         [[{'id': i} for i in range(start, min(start + 3, 10))] for start in range(0, 10, 3)])
+        self.assertEqual(reader.opened, 1)
+        # an earlier range is read again from the start
+        self.assertEqual(list(reader.read(2, 4)), [{'id': 2}, {'id': 3}])
+        self.assertEqual(list(reader.read(5, 6)), [{'id': 5}])
+        self.assertEqual(reader.opened, 2)
+        reader.close()
+
+    def test_abort(self):
+        file_name = os.path.join(self.tmp_dir, 'certs.jsonl')
+        writer = jsonl.JSONLWriter(file_name)
+        writer.write({'id': 0})
+        writer.abort()
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_gzip_is_compressed(self):
+        file_name = os.path.join(self.tmp_dir, 'certs.jsonl.gz')
+        writer = jsonl.JSONLWriter(file_name)
+        writer.write({'id': 1})
+        writer.commit()
+        with gzip.open(file_name) as gzip_file:
+            self.assertEqual(gzip_file.read(), b'{"id": 1}\n')
+
+    def test_blank_lines_skipped(self):
+        file_name = os.path.join(self.tmp_dir, 'certs.jsonl')
+        with open(file_name, 'w') as jsonl_file:
+            jsonl_file.write('{"id": 0}\n\n{"id": 1}\n\n')
+        self.assertEqual(list(jsonl.read_jsonl(file_name, 1)), [{'id': 1}])
+        self.assertEqual(jsonl.count_documents(file_name), 2)
+
+    @unittest.skipIf(jsonl.zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        file_name = os.path.join(self.tmp_dir, 'certs.jsonl.zst')
+        writer = jsonl.JSONLWriter(file_name)
+        for i in range(3):
+            writer.write({'id': i})
+        writer.commit()
+        self.assertEqual(list(jsonl.read_jsonl(file_name)), [{'id': i} for i in range(3)])
+
+    @unittest.skipIf(jsonl.zstandard is not None, 'zstandard is installed')
+    def test_zstd_requires_zstandard(self):
+        with self.assertRaises(ImportError):
+            jsonl.open_jsonl(os.path.join(self.tmp_dir, 'certs.jsonl.zst'))
+
+
+if __name__ == '__main__':
+    unittest.main()
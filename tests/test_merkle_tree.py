@@ -0,0 +1,88 @@
+import hashlib
+import unittest
+
+from pycoin.encoding.hexbytes import b2h
+
+from cert_issuer.merkle_tree import MerkleTree, validate_proof
+
+try:
+    from blockcerts_merkletools import MerkleTools
+except ImportError:
+    MerkleTools = None
+
+
+def get_digests(count):
+    return [hashlib.sha256(str(i).encode('utf-8')).digest() for i in range(count)]
+
+
+def build_tree(digests):
+    tree = MerkleTree()
+    for digest in digests:
+        tree.add_leaf(digest)
+    tree.make_tree()
+    return tree
+
+
+class TestMerkleTree(unittest.TestCase):
+    def test_single_leaf(self):
+        digest = get_digests(1)[0]
+        tree = build_tree([digest])
+        self.assertEqual(tree.get_root(), digest)
+        self.assertEqual(tree.get_proof(0), [])
+
+    def test_empty_tree(self):
+        tree = MerkleTree()
+        tree.make_tree()
+        self.assertIsNone(tree.get_root())
+
+    def test_rejects_non_digest_leaf(self):
+        with self.assertRaises(ValueError):
+            MerkleTree().add_leaf(b'1')
+
+    def test_proofs_validate(self):
+        for count in range(1, 18):
+            digests = get_digests(count)
+            tree = build_tree(digests)
+            for index, digest in enumerate(digests):
+                self.assertEqual(tree.get_leaf(index), digest)
+                self.assertTrue(validate_proof(tree.get_proof(index), digest, tree.get_root()))
+
+    def test_get_proofs_same_as_get_proof(self):
+        for count in range(1, 18):
+            tree = build_tree(get_digests(count))
+            proofs = list(tree.get_proofs())
+            self.assertEqual(proofs, [tree.get_proof(index) for index in range(count)])
+
+    def test_get_proofs_shares_entries(self):
+        tree = build_tree(get_digests(4))
+        proofs = list(tree.get_proofs(lambda position, sibling: {position: b2h(sibling)}))
+        self.assertEqual(proofs[0][0], {'right': b2h(tree.get_leaf(1))})
+        self.assertIs(proofs[0][1], proofs[1][1])
+
+    def test_add_leaf_after_make_tree(self):
+        digests = get_digests(3)
+        tree = build_tree(digests[:2])
+        tree.add_leaf(digests[2])
+        self.assertFalse(tree.is_ready())
+        tree.make_tree()
+        self.assertEqual(tree.get_root(), build_tree(digests).get_root())
+
+    @unittest.skipIf(MerkleTools is None, 'blockcerts-merkletools is not installed')
+    def test_same_as_merkletools(self):
+        for count in list(range(1, 34)) + [100, 257]:
+            digests = get_digests(count)
+            tree = build_tree(digests)
+
+            merkle_tools = MerkleTools(hash_type='sha256')
+            for digest in digests:
+                merkle_tools.add_leaf(b2h(digest))
+            merkle_tools.make_tree()
+
+            self.assertEqual(b2h(tree.get_root()), merkle_tools.get_merkle_root())
+            for index in range(count):
+                proof = [{position: b2h(sibling)} for position, sibling in tree.get_proof(index)]
+                self.assertEqual(proof, merkle_tools.get_proof(index))
+
+
+if __name__ == '__main__':
+    unittest.main()
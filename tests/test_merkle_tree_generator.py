@@ -1,11 +1,17 @@
+import os
 import unittest
 
 from cert_core import Chain
 from pycoin.encoding.hexbytes import b2h
 
-from cert_issuer.merkle_tree_generator import MerkleTreeGenerator
+import mock
+
+from cert_issuer.errors import InvalidMerkleTreeStateError
+from cert_issuer.merkle_tree_generator import MerkleTreeGenerator, ProofEncoder, POPULATING, FINALIZED, ANCHORED, \
+    b2a_base58
 from cert_issuer import helpers
 from lds_merkle_proof_2019.merkle_proof_2019 import MerkleProof2019
+from multibase import encode as multibase_encode
 
 
 def get_test_data_generator():
@@ -24,6 +30,37 @@ class TestMerkleTreeGenerator(unittest.TestCase):
         byte_array = merkle_tree_generator.get_blockchain_data()
         self.assertEqual(b2h(byte_array), '0932f1d2e98219f7d7452801e2b64ebd9e5c005539db12d9b1ddabe7834d9044')
 
+    def test_tree_is_built_once(self):
+        merkle_tree_generator = MerkleTreeGenerator()
+        merkle_tree_generator.populate(get_test_data_generator())
+        self.assertEqual(merkle_tree_generator.state, POPULATING)
+        with mock.patch.object(merkle_tree_generator.tree, 'make_tree',
+                               wraps=merkle_tree_generator.tree.make_tree) as make_tree:
+            first = merkle_tree_generator.get_blockchain_data()
+            second = merkle_tree_generator.get_blockchain_data()
+        self.assertEqual(make_tree.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(merkle_tree_generator.state, FINALIZED)
+
+    def test_state_transitions(self):
+        merkle_tree_generator = MerkleTreeGenerator()
+        merkle_tree_generator.populate(get_test_data_generator())
+        with self.assertRaises(InvalidMerkleTreeStateError):
+            next(merkle_tree_generator.get_proof_generator('txid', Chain.bitcoin_mainnet))
+
+        merkle_tree_generator.get_blockchain_data()
+        with self.assertRaises(InvalidMerkleTreeStateError):
+            merkle_tree_generator.populate(get_test_data_generator())
+
+        next(merkle_tree_generator.get_proof_generator('txid', Chain.bitcoin_mainnet))
+        self.assertEqual(merkle_tree_generator.state, ANCHORED)
+
+        merkle_tree_generator.reset()
+        self.assertEqual(merkle_tree_generator.state, POPULATING)
+        merkle_tree_generator.populate(get_test_data_generator())
+        self.assertEqual(b2h(merkle_tree_generator.get_blockchain_data()),
+                         '0932f1d2e98219f7d7452801e2b64ebd9e5c005539db12d9b1ddabe7834d9044')
+
     def test_proofs_bitcoin_mainnet(self):
         self.do_test_signature(Chain.bitcoin_mainnet, 'bitcoinMainnet', 'BTCOpReturn')
 
@@ -36,6 +73,39 @@ class TestMerkleTreeGenerator(unittest.TestCase):
     def test_proofs_mock(self):
         self.do_test_signature(Chain.mockchain, 'mockchain', 'Mock')
 
+    def test_b2a_base58_same_as_multibase(self):
+        for data in [b'', b'\x00', b'\x00\x00\x01', b'\x01\x00'] + [os.urandom(size) for size in range(0, 400, 7)]:
+            self.assertEqual(b'z' + b2a_base58(data), multibase_encode('base58btc', data))
+
+    def test_proofs_same_as_merkle_proof_2019(self):
+        tx_id = '8087c03e7b7bc9ca7b355de9d9d8165cc5c76307f337f0deb8a204d002c8e582'
+        for chain in [Chain.bitcoin_mainnet, Chain.bitcoin_testnet, Chain.bitcoin_regtest, Chain.ethereum_mainnet,
+                      Chain.ethereum_sepolia]:
+            merkle_tree_generator = MerkleTreeGenerator()
+            merkle_tree_generator.populate(str(num).encode('utf-8') for num in range(37))
+            merkle_root = b2h(merkle_tree_generator.get_blockchain_data())
+            proofs = list(merkle_tree_generator.get_proof_generator(tx_id, chain))
+
+            tree = merkle_tree_generator.tree
+            for index, proof in enumerate(proofs):
+                expected = MerkleProof2019().encode({
+                    'path': [{position: b2h(sibling)} for position, sibling in tree.get_proof(index)],
+                    'merkleRoot': merkle_root,
+                    'targetHash': b2h(tree.get_leaf(index)),
+                    'anchors': [helpers.tx_to_blink(chain, tx_id)]
+                })
+                self.assertEqual(proof, expected)
+
+    def test_proof_encoder_same_as_merkle_proof_2019(self):
+        proof_json = {
+            'path': [{'left': 'ab' * 32}, {'right': 'cd' * 32}],
+            'merkleRoot': 'ef' * 32,
+            'targetHash': '01' * 32,
+            'anchors': ['blink:mocknet:This has not been issued on a blockchain and is for testing only',
+                        'blink:eth:goerli:0x' + '23' * 32]
+        }
+        self.assertEqual(ProofEncoder().encode(proof_json), MerkleProof2019().encode(proof_json))
+
     def do_test_signature(self, chain, display_chain, type):
         merkle_tree_generator = MerkleTreeGenerator()
         merkle_tree_generator.populate(get_test_data_generator())
@@ -0,0 +1,17 @@
+import unittest
+
+from cert_issuer.metrics import LatencyHistogram
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_quantile(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.quantile(0.5))
+        for seconds in [0.01] * 9 + [5]:
+            histogram.observe(seconds)
+        self.assertLess(histogram.quantile(0.5), 0.02)
+        self.assertGreaterEqual(histogram.quantile(0.99), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
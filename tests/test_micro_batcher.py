@@ -0,0 +1,108 @@
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+
+import mock
+from mock import patch
+
+from cert_issuer import micro_batcher
+from cert_issuer.micro_batcher import BatchMetrics, MicroBatcher, get_web_batch_issuer, issue_requests, \
+    resolve_requests
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def issue_concurrently(self, batcher, requests):
+        results = [None] * len(requests)
+
+        def issue(index):
+            try:
+                results[index] = batcher.issue(requests[index], timeout=5)
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=issue, args=(index,)) for index in range(len(requests))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesces_requests_in_window(self):
+        batches = []
+
+        def issue_batch(certificates):
+            batches.append(certificates)
+            return [certificate + '-issued' for certificate in certificates]
+
+        batcher = MicroBatcher(issue_batch, window=0.2)
+        self.addCleanup(batcher.close)
+        results = self.issue_concurrently(batcher, [['a', 'b'], ['c'], ['d']])
+        self.assertEqual(results, [['a-issued', 'b-issued'], ['c-issued'], ['d-issued']])
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(sorted(batches[0]), ['a', 'b', 'c', 'd'])
+
+        metrics = batcher.metrics.to_dict()
+        self.assertEqual(metrics['batches'], 1)
+        self.assertEqual(metrics['requests'], 3)
+        self.assertEqual(metrics['certificates_per_batch'], 4)
+        self.assertIsNotNone(metrics['wait_latency_p50'])
+
+    def test_issues_at_max_batch_size_without_waiting(self):
+        batcher = MicroBatcher(lambda certificates: certificates, window=60, max_batch_size=2)
+        self.addCleanup(batcher.close)
+        start = time.monotonic()
+        self.assertEqual(batcher.issue(['a', 'b'], timeout=5), ['a', 'b'])
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_failure_reaches_every_caller(self):
+        def issue_batch(certificates):
+            raise Exception('broadcast failed')
+
+        batcher = MicroBatcher(issue_batch, window=0.2)
+        self.addCleanup(batcher.close)
+        results = self.issue_concurrently(batcher, [['a'], ['b']])
+        self.assertEqual([str(result) for result in results], ['broadcast failed', 'broadcast failed'])
+        self.assertEqual(batcher.metrics.to_dict()['failed_batches'], 1)
+
+    def test_close_issues_pending(self):
+        batcher = MicroBatcher(lambda certificates: certificates, window=60)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(batcher.issue(['a'], timeout=5)))
+        thread.start()
+        while not batcher.pending:
+            time.sleep(0.01)
+        batcher.close()
+        thread.join()
+        self.assertEqual(results, [['a']])
+        with self.assertRaises(RuntimeError):
+            batcher.issue(['b'])
+
+    def test_caller_gone_away(self):
+        gone, waiting = Future(), Future()
+        gone.cancel()
+        metrics = BatchMetrics()
+        resolve_requests(issue_requests(lambda certificates: certificates, metrics,
+                                        [(['a'], gone, time.monotonic()), (['b', 'c'], waiting, time.monotonic())]))
+        self.assertEqual(waiting.result(0), ['b', 'c'])
+        self.assertEqual(metrics.to_dict()['certificates'], 3)
+
+    def test_web_batch_issuer(self):
+        certificate_batch_handler = mock.Mock(proof=['proven'])
+        issue_batch = get_web_batch_issuer(mock.Mock(batch_size=10), certificate_batch_handler, mock.Mock())
+        with patch.object(micro_batcher.issue_certificates, 'issue') as mock_issue:
+            self.assertEqual(issue_batch(['certificate']), ['proven'])
+        certificate_batch_handler.set_certificates_in_batch.assert_called_once_with(['certificate'])
+        self.assertIsNone(mock_issue.call_args[0][0].batch_size)
+
+
+class TestBatchMetrics(unittest.TestCase):
+    def test_empty(self):
+        metrics = BatchMetrics().to_dict()
+        self.assertEqual(metrics['batches'], 0)
+        self.assertIsNone(metrics['certificates_per_batch'])
+        self.assertIsNone(metrics['issue_latency_p99'])
+
+
+if __name__ == '__main__':
+    unittest.main()
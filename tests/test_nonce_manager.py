@@ -0,0 +1,103 @@
+import threading
+import unittest
+
+import mock
+
+from cert_issuer.blockchain_handlers.ethereum.nonce_manager import NonceManager
+from cert_issuer.blockchain_handlers.layer2.transaction_handlers import Layer2TransactionHandler
+from cert_issuer.errors import BroadcastError
+
+ADDRESS = '0x3d995ef85a8d1bcbed78182ab225b9f88dc8937c'
+
+
+class TestNonceManager(unittest.TestCase):
+    def setUp(self):
+        self.connector = mock.Mock()
+        self.connector.get_address_nonce.return_value = 5
+
+    def test_sequential_from_pending_count(self):
+        nonce_manager = NonceManager(self.connector, ADDRESS)
+        self.assertEqual([nonce_manager.allocate() for _ in range(3)], [5, 6, 7])
+        self.connector.get_address_nonce.assert_called_once_with(ADDRESS)
+
+    def test_configured_nonce(self):
+        nonce_manager = NonceManager(self.connector, ADDRESS, 42)
+        self.assertEqual(nonce_manager.allocate(), 42)
+        self.connector.get_address_nonce.assert_not_called()
+
+    def test_last_nonce_reused(self):
+        nonce_manager = NonceManager(self.connector, ADDRESS)
+        nonce_manager.confirm(nonce_manager.allocate())
+        nonce_manager.release(nonce_manager.allocate())
+        # synced again: the node counts the first transaction
+        self.connector.get_address_nonce.return_value = 6
+        self.assertEqual(nonce_manager.allocate(), 6)
+
+    def test_gap_filled_first(self):
+        nonce_manager = NonceManager(self.connector, ADDRESS)
+        first, second, third = [nonce_manager.allocate() for _ in range(3)]
+        nonce_manager.release(second)
+        nonce_manager.confirm(first)
+        # not synced while a transaction is in flight
+        self.assertEqual(nonce_manager.allocate(), 6)
+        nonce_manager.confirm(third)
+        self.assertEqual(nonce_manager.allocate(), 8)
+        self.assertEqual(self.connector.get_address_nonce.call_count, 1)
+
+    def test_gap_detected_on_sync(self):
+        nonce_manager = NonceManager(self.connector, ADDRESS)
+        nonces = [nonce_manager.allocate() for _ in range(4)]
+        for nonce in nonces[:3]:
+            nonce_manager.confirm(nonce)
+        nonce_manager.release(nonces[3])
+        # the node dropped the transaction with nonce 6, 7 is queued behind it
+        self.connector.get_address_nonce.return_value = 6
+        self.assertEqual(nonce_manager.allocate(), 6)
+        nonce_manager.confirm(6)
+        self.connector.get_address_nonce.return_value = 8
+        self.assertEqual(nonce_manager.allocate(), 8)
+
+    def test_used_elsewhere(self):
+        nonce_manager = NonceManager(self.connector, ADDRESS)
+        nonce_manager.release(nonce_manager.allocate())
+        self.connector.get_address_nonce.return_value = 9
+        self.assertEqual(nonce_manager.allocate(), 9)
+
+    def test_concurrent_allocation(self):
+        nonce_manager = NonceManager(self.connector, ADDRESS)
+        nonces = []
+
+        def allocate():
+            for _ in range(100):
+                nonces.append(nonce_manager.allocate())
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(nonces), list(range(5, 805)))
+
+
+class TestLayer2TransactionHandler(unittest.TestCase):
+    def setUp(self):
+        self.connector = mock.Mock()
+        self.connector.get_address_nonce.return_value = 3
+        tx_cost_constants = mock.Mock()
+        tx_cost_constants.get_max_priority_fee_per_gas.return_value = None
+        self.handler = Layer2TransactionHandler(self.connector, 0, tx_cost_constants, None, ADDRESS)
+        self.handler.sign_transaction = lambda prepared_tx: prepared_tx
+
+    def test_nonces_of_batches(self):
+        self.connector.broadcast_tx.side_effect = lambda tx: 'tx{}'.format(tx['nonce'])
+        self.assertEqual([self.handler.issue_transaction(b'\x01' * 32) for _ in range(3)], ['tx3', 'tx4', 'tx5'])
+
+    def test_nonce_released_on_failure(self):
+        self.connector.broadcast_tx.side_effect = BroadcastError('unavailable')
+        with self.assertRaises(BroadcastError):
+            self.handler.issue_transaction(b'\x01' * 32)
+        self.connector.broadcast_tx.side_effect = lambda tx: 'tx{}'.format(tx['nonce'])
+        self.assertEqual(self.handler.issue_transaction(b'\x01' * 32), 'tx3')
+
+
+if __name__ == '__main__':
+    unittest.main()
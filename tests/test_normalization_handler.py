@@ -0,0 +1,89 @@
+import copy
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cert_issuer.normalization_handler import JSONLDHandler, ContextRegistry
+
+credential_example = {
+    '@context': [
+        'https://www.w3.org/2018/credentials/v1',
+        'https://w3id.org/blockcerts/v3'
+    ],
+    'id': 'urn:uuid:bbba8553-8ec1-445f-82c9-a57251dd731c',
+    'type': [
+        'VerifiableCredential',
+        'BlockcertsCredential'
+    ],
+    'issuer': 'https://www.blockcerts.org/samples/3.0/issuer-blockcerts.json',
+    'issuanceDate': '2022-08-18T14:04:24Z',
+    'credentialSubject': {
+        'id': 'did:example:ebfeb1f712ebc6f1c276e12ec21',
+        'name': 'Julien Fraichot'
+    }
+}
+
+
+def get_certificates(count):
+    for i in range(count):
+        certificate = copy.deepcopy(credential_example)
+        certificate['credentialSubject']['name'] = 'Recipient {}'.format(i)
+        yield certificate
+
+
+class TestJSONLDHandler(unittest.TestCase):
+    def test_normalize_batch_serial(self):
+        normalized = list(JSONLDHandler.normalize_batch_to_utf8(get_certificates(3), 1))
+        expected = [JSONLDHandler.normalize_to_utf8(c) for c in get_certificates(3)]
+        self.assertEqual(normalized, expected)
+
+    def test_normalize_batch_keeps_order_across_workers(self):
+        count = 100
+        normalized = list(JSONLDHandler.normalize_batch_to_utf8(get_certificates(count), 2))
+        expected = [JSONLDHandler.normalize_to_utf8(c) for c in get_certificates(count)]
+        self.assertEqual(len(normalized), count)
+        self.assertEqual(normalized, expected)
+
+
+class TestContextRegistry(unittest.TestCase):
+    def setUp(self):
+        self.context_dir = tempfile.mkdtemp()
+        self.context_path = os.path.join(self.context_dir, 'context.json')
+        self._write_context({'@context': {'kek': 'https://example.com/kek'}})
+
+    def tearDown(self):
+        shutil.rmtree(self.context_dir)
+
+    def _write_context(self, context):
+        with open(self.context_path, 'w') as context_file:
+            json.dump(context, context_file)
+
+    def test_loads_context_files_once(self):
+        registry = ContextRegistry()
+        registry.load(['https://example.com/context'], [self.context_path])
+        self._write_context({'@context': {'other': 'https://example.com/other'}})
+        registry.load(['https://example.com/context'], [self.context_path])
+
+        response = registry.document_loader('https://example.com/context')
+        self.assertEqual(response['document'], {'@context': {'kek': 'https://example.com/kek'}})
+        self.assertEqual(response['documentUrl'], 'https://example.com/context')
+
+    def test_hits_and_misses(self):
+        registry = ContextRegistry()
+        registry.load(['https://example.com/context'], [self.context_path])
+        registry.document_loader('https://example.com/context')
+        registry.document_loader('https://www.w3.org/2018/credentials/v1')
+        registry.document_loader('https://www.w3.org/2018/credentials/v1')
+        self.assertEqual(registry.hits, 2)
+        self.assertEqual(registry.misses, 1)
+
+    def test_no_configured_contexts(self):
+        registry = ContextRegistry()
+        registry.load(None, None)
+        self.assertEqual(registry.contexts, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
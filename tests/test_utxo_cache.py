@@ -0,0 +1,102 @@
+import unittest
+
+import mock
+from pycoin.coins.bitcoin.Spendable import Spendable
+from pycoin.coins.bitcoin.Tx import Tx
+
+from cert_issuer.blockchain_handlers.bitcoin.transaction_handlers import BitcoinTransactionHandler
+from cert_issuer.blockchain_handlers.bitcoin.utxo_cache import UTXOCache
+from cert_issuer.errors import BroadcastError
+
+ADDRESS = 'mgAqW5ZCnEp7fjvpj8RUL3WxsBy8rcDcCi'
+SCRIPT = b'\x76\xa9\x14' + b'\x01' * 20 + b'\x88\xac'
+
+
+def spendable(index, coin_value):
+    return Spendable(coin_value, SCRIPT, bytes([index]) * 32, 0)
+
+
+def spending_tx(inputs, change):
+    txs_in = [Tx.TxIn(s.tx_hash, s.tx_out_index) for s in inputs]
+    txs_out = [Tx.TxOut(change, SCRIPT), Tx.TxOut(0, b'\x6a\x20' + b'\x00' * 32)]
+    return Tx(1, txs_in, txs_out)
+
+
+class TestUTXOCache(unittest.TestCase):
+    def setUp(self):
+        self.utxos = [spendable(1, 1000), spendable(2, 2000)]
+        self.connector = mock.Mock()
+        self.connector.get_unspent_outputs.return_value = self.utxos
+        self.cache = UTXOCache(self.connector)
+
+    def test_fetched_once(self):
+        self.assertEqual(self.cache.get_balance(ADDRESS), 3000)
+        self.assertEqual(self.cache.get_spendables(ADDRESS), self.utxos)
+        self.assertEqual(self.connector.get_unspent_outputs.call_count, 1)
+
+    def test_no_spendables(self):
+        self.connector.get_unspent_outputs.return_value = None
+        self.assertEqual(self.cache.get_spendables(ADDRESS), [])
+        self.assertEqual(self.cache.get_balance(ADDRESS), 0)
+
+    def test_spend_removes_inputs_and_adds_change(self):
+        self.cache.get_spendables(ADDRESS)
+        tx = spending_tx([self.utxos[0]], 400)
+        self.cache.spend(ADDRESS, tx)
+
+        spendables = self.cache.get_spendables(ADDRESS)
+        self.assertEqual([s.coin_value for s in spendables], [2000, 400])
+        self.assertEqual((spendables[1].tx_hash, spendables[1].tx_out_index), (tx.hash(), 0))
+        self.assertEqual(self.connector.get_unspent_outputs.call_count, 1)
+
+    def test_change_can_be_spent(self):
+        self.cache.get_spendables(ADDRESS)
+        tx = spending_tx(self.utxos, 2500)
+        self.cache.spend(ADDRESS, tx)
+        change = self.cache.get_spendables(ADDRESS)
+        self.cache.spend(ADDRESS, spending_tx(change, 2000))
+        self.assertEqual(self.cache.get_balance(ADDRESS), 2000)
+
+    def test_invalidate(self):
+        self.cache.get_spendables(ADDRESS)
+        self.cache.invalidate(ADDRESS)
+        self.cache.get_spendables(ADDRESS)
+        self.assertEqual(self.connector.get_unspent_outputs.call_count, 2)
+
+
+class TestBitcoinTransactionHandlerUTXOs(unittest.TestCase):
+    def setUp(self):
+        self.connector = mock.Mock()
+        self.connector.get_unspent_outputs.return_value = [spendable(1, 100000)]
+        self.transaction_creator = mock.Mock()
+        self.transaction_creator.estimate_cost_for_certificate_batch.return_value = 50000
+        self.handler = BitcoinTransactionHandler(self.connector, mock.Mock(), mock.Mock(), ADDRESS,
+                                                 transaction_creator=self.transaction_creator)
+
+    def test_ensure_balance_fetches_again_when_short(self):
+        self.handler.ensure_balance()
+        self.transaction_creator.estimate_cost_for_certificate_batch.return_value = 150000
+        self.connector.get_unspent_outputs.return_value = [spendable(1, 100000), spendable(2, 100000)]
+        self.handler.ensure_balance()
+        self.assertEqual(self.connector.get_unspent_outputs.call_count, 2)
+
+    def test_broadcast_updates_cache(self):
+        self.handler.ensure_balance()
+        self.connector.broadcast_tx.return_value = 'txid'
+        tx = spending_tx(self.connector.get_unspent_outputs.return_value, 40000)
+        self.assertEqual(self.handler.broadcast_transaction(tx), 'txid')
+        self.assertEqual(self.handler.utxo_cache.get_balance(ADDRESS), 40000)
+        self.assertEqual(self.connector.get_unspent_outputs.call_count, 1)
+
+    def test_failed_broadcast_fetches_again(self):
+        self.handler.ensure_balance()
+        self.connector.broadcast_tx.side_effect = BroadcastError('rejected')
+        tx = spending_tx(self.connector.get_unspent_outputs.return_value, 40000)
+        with self.assertRaises(BroadcastError):
+            self.handler.broadcast_transaction(tx)
+        self.assertEqual(self.handler.utxo_cache.get_balance(ADDRESS), 100000)
+        self.assertEqual(self.connector.get_unspent_outputs.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from cert_issuer.models.verifiable_credential import validate_date_set_after_other_date, parse_RFC3339_date
+
+class UnitValidationV3 (unittest.TestCase):
+    def test_validate_date_set_after_other_date (self):
+        try:
+            validate_date_set_after_other_date('2020-02-02T00:00:00Z', '2020-02-01T00:00:00Z', 'validUntil', 'validFrom')
+        except:
+            assert False
+            return
+
+        assert True
+
+    def test_validate_date_set_before_other_date (self):
+        try:
+            validate_date_set_after_other_date('2020-02-01T00:00:00Z', '2020-02-02T00:00:00Z', 'validUntil', 'validFrom')
+        except ValueError as e:
+            self.assertEqual(str(e), '`validUntil` property must be a date set after `validFrom`')
+            return
+
+        assert False
+
+    def test_validate_date_set_after_other_date_with_offset (self):
+        # 01:00+02:00 is 23:00Z of the day before, though it sorts after it as a string
+        try:
+            validate_date_set_after_other_date('2020-02-02T01:00:00+02:00', '2020-02-01T23:30:00Z', 'validUntil', 'validFrom')
+        except ValueError:
+            assert True
+            return
+
+        assert False
+
+    def test_validate_date_set_after_other_date_with_fractional_seconds (self):
+        try:
+            validate_date_set_after_other_date('2020-02-02T00:00:00.5Z', '2020-02-02T00:00:00Z', 'validUntil', 'validFrom')
+        except:
+            assert False
+            return
+
+        assert True
+
+    def test_parse_RFC3339_date (self):
+        self.assertEqual(parse_RFC3339_date('2020-02-01T24:00:00Z'), parse_RFC3339_date('2020-02-02T00:00:00Z'))
+        self.assertEqual(parse_RFC3339_date('2020-02-02T00:00:00.1234567+00:00'),
+                         parse_RFC3339_date('2020-02-02T00:00:00.123456Z'))
+        self.assertIsNone(parse_RFC3339_date('12020-02-02T00:00:00Z'))
+
+if __name__ == '__main__':
+    unittest.main()